@@ -0,0 +1,269 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import math
+import time
+
+from aiohttp import web
+
+from auth import LoginThrottled, check_password
+from config import setting
+from db import (
+    db_get_credentials, db_get_user, db_update_user,
+    db_get_medicines, db_add_medicine, db_update_medicine, db_delete_medicine,
+    db_get_contacts, db_save_family_numbers,
+    db_add_history, db_get_history, db_get_history_range, KEEP,
+)
+from dispatch import valid_address
+from interactions import get_interactions
+from models import HistoryEntry
+from resilience import BackendUnavailable
+from schedule import parse_rule, parse_time
+
+# ══════════════════════════════════════════════════════════════════════════════
+# JSON API — headless access to the same db_* operations the Streamlit app
+# uses, for mobile apps and pill boxes that only need to post a dose
+#   python api.py --port 8000
+# Blocking Supabase calls run in worker threads so the event loop never stalls.
+# ══════════════════════════════════════════════════════════════════════════════
+API_SECRET = setting("API_SECRET")
+TOKEN_TTL  = int(setting("API_TOKEN_TTL", 30 * 24 * 3600))
+SESSIONS   = ["Morning", "Afternoon", "Night"]
+STATUSES   = ["Taken", "Missed"]
+
+def _sign(payload):
+    return hmac.new(API_SECRET.encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+def make_token(email, ttl=TOKEN_TTL):
+    payload = base64.urlsafe_b64encode(f"{email}|{int(time.time()) + ttl}".encode()).decode()
+    return f"{payload}.{_sign(payload)}"
+
+def read_token(token):
+    payload, _, sig = token.rpartition(".")
+    if not payload or not hmac.compare_digest(_sign(payload), sig):
+        return None
+    try:
+        email, _, expires = base64.urlsafe_b64decode(payload).decode().rpartition("|")
+        return email if int(expires) > time.time() else None
+    except ValueError:
+        return None
+
+def fail(status, message):
+    return web.json_response({"error": message}, status=status)
+
+async def run(fn, *args):
+    return await asyncio.to_thread(fn, *args)
+
+async def body(request, *required):
+    try:
+        data = await request.json()
+    except json.JSONDecodeError:
+        data = None
+    if not isinstance(data, dict):
+        raise web.HTTPBadRequest(text='{"error": "body must be a JSON object"}', content_type="application/json")
+    missing = [k for k in required if not str(data.get(k, "")).strip()]
+    if missing:
+        raise web.HTTPBadRequest(text=json.dumps({"error": f"missing: {', '.join(missing)}"}),
+                                 content_type="application/json")
+    for k in required:
+        text(data, k)
+    return data
+
+def text(data, key, default=None, blank=True):
+    # An optional string field: 400 if it is present but not text (or blank, with blank=False).
+    value = data.get(key, default)
+    if value is not None and (not isinstance(value, str) or not (blank or value.strip())):
+        raise web.HTTPBadRequest(text=json.dumps({"error": f"{key} must be {'' if blank else 'non-empty '}text"}),
+                                 content_type="application/json")
+    return value
+
+@web.middleware
+async def auth_middleware(request, handler):
+    if request.path in ("/login", "/health"):
+        return await handler(request)
+    token = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    email = read_token(token) if token else None
+    if not email:
+        return fail(401, "missing or expired token")
+    request["email"] = email
+    try:
+        return await handler(request)
+    except BackendUnavailable as e:
+        return fail(503, str(e))
+
+def unavailable(value):
+    if value is None:
+        raise BackendUnavailable("The server is not responding. Please try again shortly.")
+    return value
+
+# ── AUTH ───────────────────────────────────────────────────────────────────────
+async def health(request):
+    return web.json_response({"ok": True})
+
+async def login(request):
+    data  = await body(request, "email", "password")
+    email = data["email"].strip().lower()
+    try:
+        creds = await run(db_get_credentials, email)
+    except BackendUnavailable as e:
+        return fail(503, str(e))
+    try:
+        ok, upgraded = await run(check_password, email, data["password"], creds and creds.password)
+    except LoginThrottled as e:
+        return web.json_response({"error": str(e)}, status=429,
+                                 headers={"Retry-After": str(math.ceil(e.retry_after))})
+    if not ok:
+        return fail(401, "wrong email or password")
+    if upgraded:
+        await run(db_update_user, email, {"password": upgraded})
+    try:
+        user = await run(db_get_user, email)
+    except BackendUnavailable as e:
+        return fail(503, str(e))
+    return web.json_response({"token": make_token(email), "user": user and user.to_dict()})
+
+# ── MEDICINES ──────────────────────────────────────────────────────────────────
+async def own_medicine(request):
+    # (the medicine, the user's other medicines)
+    med_id = int(request.match_info["med_id"])
+    meds   = unavailable(await run(db_get_medicines, request["email"]))
+    med    = next((m for m in meds if m.id == med_id), None)
+    if med is None:
+        raise web.HTTPNotFound(text='{"error": "no such medicine"}', content_type="application/json")
+    return med, [m for m in meds if m.id != med_id]
+
+async def list_medicines(request):
+    return web.json_response([m.to_dict() for m in unavailable(await run(db_get_medicines, request["email"]))])
+
+def valid_rule(rule):
+    try:
+        return parse_rule(rule)
+    except (ValueError, TypeError) as e:
+        raise web.HTTPBadRequest(text=json.dumps({"error": f"rule: {e}"}), content_type="application/json")
+
+def valid_slot(time_val, session):
+    try:
+        time_val = parse_time(time_val)
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=json.dumps({"error": f"time: {e}"}), content_type="application/json")
+    if session not in SESSIONS:
+        raise web.HTTPBadRequest(text=json.dumps({"error": f"session must be one of {SESSIONS}"}),
+                                 content_type="application/json")
+    return time_val, session
+
+def valid_stock(stock, dose_qty):
+    # KEEP (a field left out of an update) passes through.
+    try:
+        stock    = stock if stock is None or stock is KEEP else float(stock)
+        dose_qty = dose_qty if dose_qty is KEEP else float(dose_qty)
+    except (TypeError, ValueError):
+        stock = dose_qty = -1.0
+    if (isinstance(stock, float) and stock < 0) or (isinstance(dose_qty, float) and dose_qty <= 0):
+        raise web.HTTPBadRequest(text='{"error": "stock must be >= 0 and dose_qty > 0"}',
+                                 content_type="application/json")
+    return stock, dose_qty
+
+async def add_medicine(request):
+    data   = await body(request, "name", "time", "session")
+    slot   = valid_slot(data["time"], data["session"])
+    others = await run(db_get_medicines, request["email"]) or []
+    ok     = await run(db_add_medicine, request["email"], data["name"].strip(), *slot,
+                       valid_rule(data.get("rule")), *valid_stock(data.get("stock"), data.get("dose_qty", 1)))
+    return web.json_response({"ok": ok, "interactions": get_interactions().check(data["name"].strip(),
+                                                                                 [m.name for m in others])},
+                             status=201 if ok else 502)
+
+async def update_medicine(request):
+    med, others = await own_medicine(request)
+    data        = await body(request)
+    name        = text(data, "name", med.name, blank=False).strip()
+    ok          = await run(db_update_medicine, med.id, name,
+                            *valid_slot(data.get("time", med.time), data.get("session", med.session)),
+                            valid_rule(data.get("rule", med.rule)),
+                            *valid_stock(data.get("stock", KEEP), data.get("dose_qty", KEEP)))
+    return web.json_response({"ok": ok, "interactions": get_interactions().check(name, [m.name for m in others])},
+                             status=200 if ok else 502)
+
+async def delete_medicine(request):
+    med, _ = await own_medicine(request)
+    ok     = await run(db_delete_medicine, med.id)
+    return web.json_response({"ok": ok}, status=200 if ok else 502)
+
+# ── HISTORY ────────────────────────────────────────────────────────────────────
+async def list_history(request):
+    start, end = request.query.get("start"), request.query.get("end")
+    if start or end:
+        rows = await run(db_get_history_range, request["email"],
+                         f"{start or '0000-00-00'} 00:00:00", f"{end or '9999-12-31'} 23:59:59")
+    else:
+        rows = await run(db_get_history, request["email"], HistoryEntry.DISPLAY)
+    return web.json_response([h.to_dict() for h in unavailable(rows)])
+
+async def add_history(request):
+    data   = await body(request, "session", "status")
+    status = data["status"]
+    if status not in STATUSES:
+        return fail(400, f"status must be one of {STATUSES}")
+    if data["session"] not in SESSIONS:
+        return fail(400, f"session must be one of {SESSIONS}")
+    meds = text(data, "medicines")
+    if not meds:
+        meds = ", ".join(m.name for m in unavailable(await run(db_get_medicines, request["email"]))
+                         if m.session == data["session"])
+    notes = text(data, "notes") or ("Taken on time" if status == "Taken" else "Missed dose")
+    ok    = await run(db_add_history, request["email"], data["session"], meds, status, notes)
+    return web.json_response({"ok": ok}, status=201 if ok else 502)
+
+# ── CONTACTS ───────────────────────────────────────────────────────────────────
+async def list_contacts(request):
+    return web.json_response([c.number for c in unavailable(await run(db_get_contacts, request["email"]))])
+
+async def add_contact(request):
+    number = (await body(request, "number"))["number"].strip()
+    if not valid_address(number):
+        return fail(400, "number must start with + and country code (sms: in front to text it), or be an email address")
+    numbers = [c.number for c in unavailable(await run(db_get_contacts, request["email"]))]
+    if number not in numbers:
+        numbers.append(number)
+        if not await run(db_save_family_numbers, request["email"], numbers):
+            return fail(502, "could not save contacts")
+    return web.json_response(numbers, status=201)
+
+async def delete_contact(request):
+    number  = request.match_info["number"]
+    numbers = [c.number for c in unavailable(await run(db_get_contacts, request["email"]))]
+    if number not in numbers:
+        return fail(404, "no such contact")
+    numbers.remove(number)
+    if not await run(db_save_family_numbers, request["email"], numbers):
+        return fail(502, "could not save contacts")
+    return web.json_response(numbers)
+
+def make_app():
+    if not API_SECRET:
+        raise SystemExit("Set API_SECRET (environment or Streamlit Secrets) to sign API tokens.")
+    app = web.Application(middlewares=[auth_middleware])
+    app.add_routes([
+        web.get("/health", health),
+        web.post("/login", login),
+        web.get("/medicines", list_medicines),
+        web.post("/medicines", add_medicine),
+        web.put("/medicines/{med_id:\\d+}", update_medicine),
+        web.delete("/medicines/{med_id:\\d+}", delete_medicine),
+        web.get("/history", list_history),
+        web.post("/history", add_history),
+        web.get("/contacts", list_contacts),
+        web.post("/contacts", add_contact),
+        web.delete("/contacts/{number}", delete_contact),
+    ])
+    return app
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Serve the MediCare JSON API.")
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=8000)
+    args = ap.parse_args()
+    web.run_app(make_app(), host=args.host, port=args.port)
@@ -0,0 +1,106 @@
+import argparse
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from urllib.parse import unquote
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+
+from config import setting
+from db import get_supabase
+
+# ══════════════════════════════════════════════════════════════════════════════
+# HISTORY ARCHIVE — rows older than the retention window move out of the hot
+# history table into monthly, per-user Parquet partitions:
+#   <root>/user_email=<email>/month=YYYY-MM/part-*.parquet
+# <root> is a local directory or an object-store URI (s3://bucket/prefix).
+#   python archive.py --days 90
+# ══════════════════════════════════════════════════════════════════════════════
+RETENTION_DAYS = int(setting("HISTORY_RETENTION_DAYS", 90))
+ARCHIVE_ROOT   = setting("HISTORY_ARCHIVE", "history_archive")
+PAGE_SIZE      = 1000
+HISTORY_COLS   = ["id", "user_email", "date_time", "session", "medicines", "status", "notes"]
+SCHEMA         = pa.schema([
+    ("id", pa.int64()), ("user_email", pa.string()), ("date_time", pa.string()),
+    ("session", pa.string()), ("medicines", pa.string()), ("status", pa.string()),
+    ("notes", pa.string()), ("month", pa.string()),
+])
+PARTITIONING   = ds.partitioning(pa.schema([("user_email", pa.string()), ("month", pa.string())]),
+                                 flavor="hive")
+
+def _fs(root=None):
+    root = root or ARCHIVE_ROOT
+    if "://" not in root:
+        root = str(Path(root).resolve())
+    return pafs.FileSystem.from_uri(root)
+
+class ArchiveUnavailable(Exception):
+    pass
+
+def archive_cutoff(days=None):
+    return date.today() - timedelta(days=RETENTION_DAYS if days is None else days)
+
+def archive_history(days=None, root=None):
+    # Copy-then-delete in pages; a crash between the two leaves a row in both
+    # tiers, which history_store.combine drops by id. Deletes go through the
+    # archive_history_rows RPC so adherence summaries are left untouched. If it
+    # deletes nothing the same page would come back forever, so stop there.
+    fs, base = _fs(root)
+    cutoff   = f"{archive_cutoff(days)} 00:00:00"
+    moved    = 0
+    while True:
+        res = (get_supabase().table("history").select(",".join(HISTORY_COLS))
+               .lt("date_time", cutoff).order("id").limit(PAGE_SIZE).execute())
+        rows = res.data or []
+        if not rows: break
+        for r in rows: r["month"] = r["date_time"][:7]
+        ds.write_dataset(pa.Table.from_pylist(rows, schema=SCHEMA), base, filesystem=fs,
+                         format="parquet", partitioning=PARTITIONING,
+                         basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+                         existing_data_behavior="overwrite_or_ignore")
+        deleted = get_supabase().rpc("archive_history_rows", {"ids": [r["id"] for r in rows]}).execute().data
+        if not deleted:
+            raise ArchiveUnavailable(f"archive_history_rows deleted nothing after {moved} row(s); check that "
+                                     "sql/history_archive.sql is applied and the key may delete history")
+        moved += deleted
+    return moved
+
+def read_archive(email, start=None, end=None, root=None):
+    # Partition pruning on user/month, then row-group statistics on date_time.
+    try:
+        fs, base = _fs(root)
+        if fs.get_file_info(base).type == pafs.FileType.NotFound:
+            return SCHEMA.empty_table().select(HISTORY_COLS)
+        expr = ds.field("user_email") == email
+        if start:
+            expr &= (ds.field("month") >= f"{start:%Y-%m}") & (ds.field("date_time") >= f"{start} 00:00:00")
+        if end:
+            expr &= (ds.field("month") <= f"{end:%Y-%m}") & (ds.field("date_time") <= f"{end} 23:59:59")
+        dataset = ds.dataset(base, schema=SCHEMA, format="parquet", partitioning=PARTITIONING, filesystem=fs)
+        return dataset.to_table(columns=HISTORY_COLS, filter=expr)
+    except (OSError, pa.ArrowException) as e:
+        raise ArchiveUnavailable(str(e)) from e
+
+def clear_archive(email, root=None):
+    # Partition directory names are URI-encoded by pyarrow, so match decoded.
+    fs, base = _fs(root)
+    if fs.get_file_info(base).type == pafs.FileType.NotFound:
+        return
+    for info in fs.get_file_info(pafs.FileSelector(base)):
+        if unquote(info.base_name) == f"user_email={email}":
+            fs.delete_dir(info.path)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Move old history rows into Parquet partitions.")
+    ap.add_argument("--days", type=int, default=RETENTION_DAYS, help="keep this many days in the hot table")
+    ap.add_argument("--root", default=ARCHIVE_ROOT, help="local directory or object-store URI")
+    args = ap.parse_args()
+    t0    = datetime.now()
+    try:
+        moved = archive_history(args.days, args.root)
+    except ArchiveUnavailable as e:
+        raise SystemExit(f"Stopped: {e}")
+    print(f"Archived {moved} row(s) older than {archive_cutoff(args.days)} "
+          f"to {args.root} in {(datetime.now() - t0).total_seconds():.1f}s")
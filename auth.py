@@ -0,0 +1,164 @@
+import base64
+import hashlib
+import hmac
+import math
+import os
+import logging
+import string
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from config import setting
+
+log = logging.getLogger(__name__)
+
+# ══════════════════════════════════════════════════════════════════════════════
+# PASSWORDS — salted scrypt, stored as scrypt$N$r$p$salt$hash. Old unsalted
+# SHA-256 hashes still verify and are replaced with scrypt on the next
+# successful login, as are scrypt hashes made with older cost settings.
+# Each hash takes 128·N·r bytes (16 MiB by default), so hashing runs on a
+# fixed pool of KDF_WORKERS threads (hashlib.scrypt releases the GIL) behind an
+# admission limit of KDF_QUEUE calls. Past that, callers wait KDF_ADMIT_WAIT s
+# and are then turned away, so a burst costs at most workers × 16 MiB. Each
+# account also gets LOGIN_ATTEMPTS tries per LOGIN_WINDOW s before any KDF work.
+# ══════════════════════════════════════════════════════════════════════════════
+KDF_N          = int(setting("KDF_N", 2 ** 14))
+KDF_R          = int(setting("KDF_R", 8))
+KDF_P          = int(setting("KDF_P", 1))
+KDF_WORKERS    = int(setting("KDF_WORKERS", min(4, os.cpu_count() or 1)))
+KDF_QUEUE      = int(setting("KDF_QUEUE", 32))
+ADMIT_WAIT     = float(setting("KDF_ADMIT_WAIT", 3.0))
+LOGIN_ATTEMPTS = int(setting("LOGIN_ATTEMPTS", 5))
+LOGIN_WINDOW   = float(setting("LOGIN_WINDOW", 300))
+MAX_N, MAX_R, MAX_P = 2 ** 20, 32, 16
+
+class LoginThrottled(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def _b64(raw):
+    return base64.b64encode(raw).decode().rstrip("=")
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=32, maxmem=132 * n * r * p)
+
+def legacy_hash(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def make_hash(password, n=KDF_N, r=KDF_R, p=KDF_P):
+    salt = os.urandom(16)
+    return f"scrypt${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}"
+
+def well_formed(stored):
+    # Something verify_hash can check: scrypt$N$r$p$salt$hash with N a power of
+    # two up to MAX_N and r, p within MAX_R, MAX_P (so a tampered row can't make
+    # one login allocate gigabytes), or a 64-digit SHA-256 hex digest.
+    parts = stored.split("$")
+    if parts[0] != "scrypt":
+        return len(stored) == 64 and set(stored) <= set(string.hexdigits)
+    try:
+        n, r, p = map(int, parts[1:4])
+        _unb64(parts[4]), _unb64(parts[5])
+    except (ValueError, IndexError):
+        return False
+    return len(parts) == 6 and 1 < n <= MAX_N and n & (n - 1) == 0 and 0 < r <= MAX_R and 0 < p <= MAX_P
+
+def verify_hash(password, stored, n=KDF_N, r=KDF_R, p=KDF_P):
+    # (matches, should be rehashed with the current settings)
+    if stored.startswith("scrypt$"):
+        _, sn, sr, sp, salt, digest = stored.split("$")
+        cost = (int(sn), int(sr), int(sp))
+        ok   = hmac.compare_digest(_scrypt(password, _unb64(salt), *cost), _unb64(digest))
+        return ok, ok and cost != (n, r, p)
+    ok = hmac.compare_digest(legacy_hash(password), stored)
+    return ok, ok
+
+class SlidingWindow:
+    # Attempt timestamps per key; a key past `limit` in the last `window` seconds
+    # waits until its oldest attempt ages out.
+    def __init__(self, limit=LOGIN_ATTEMPTS, window=LOGIN_WINDOW, clock=time.monotonic):
+        self.limit  = limit
+        self.window = window
+        self.clock  = clock
+        self.hits   = {}
+        self.lock   = threading.Lock()
+
+    def hit(self, key):
+        # Records an attempt and returns 0, or returns seconds to wait.
+        now = self.clock()
+        with self.lock:
+            q = self.hits.setdefault(key, deque())
+            while q and q[0] <= now - self.window:
+                q.popleft()
+            if len(q) >= self.limit:
+                return q[0] + self.window - now
+            q.append(now)
+            if len(self.hits) > 10_000:   # drop accounts with nothing recent
+                self.hits = {k: v for k, v in self.hits.items() if v and v[-1] > now - self.window}
+            return 0
+
+    def clear(self, key):
+        with self.lock:
+            self.hits.pop(key, None)
+
+class PasswordHasher:
+    def __init__(self, workers=KDF_WORKERS, queue=KDF_QUEUE, admit_wait=ADMIT_WAIT,
+                 n=KDF_N, r=KDF_R, p=KDF_P, window=None):
+        self.cost       = (n, r, p)
+        self.admit_wait = admit_wait
+        self.admit      = threading.BoundedSemaphore(queue)
+        self.pool       = ThreadPoolExecutor(workers, thread_name_prefix="kdf")
+        self.window     = window or SlidingWindow()
+        self.dummy      = None   # verified against for unknown emails, so they take as long
+
+    def _run(self, fn, *args):
+        if not self.admit.acquire(timeout=self.admit_wait):
+            raise LoginThrottled("Too many people are signing in right now. Please try again in a moment.", 1)
+        try:
+            future = self.pool.submit(fn, *args, *self.cost)
+        except BaseException:
+            self.admit.release(); raise
+        future.add_done_callback(lambda _: self.admit.release())
+        return future.result()
+
+    def hash_password(self, password):
+        return self._run(make_hash, password)
+
+    def check_password(self, email, password, stored):
+        # Returns (ok, new hash to store or None); raises LoginThrottled.
+        wait = self.window.hit(email)
+        if wait:
+            raise LoginThrottled(f"Too many attempts. Try again in {math.ceil(wait / 60)} min.", wait)
+        if stored and not well_formed(stored):
+            # A damaged row fails like a wrong password, taking as long.
+            log.warning("stored password hash is malformed; login refused")
+            stored = None
+        if not stored and self.dummy is None:
+            self.dummy = self.hash_password("")
+        ok, upgrade = self._run(verify_hash, password, stored or self.dummy)
+        if not (ok and stored):
+            return False, None
+        self.window.clear(email)
+        return True, self.hash_password(password) if upgrade else None
+
+_hasher = None
+_lock   = threading.Lock()
+
+def get_hasher():
+    global _hasher
+    with _lock:
+        if _hasher is None:
+            _hasher = PasswordHasher()
+        return _hasher
+
+def hash_password(password):
+    return get_hasher().hash_password(password)
+
+def check_password(email, password, stored):
+    return get_hasher().check_password(email, password, stored)
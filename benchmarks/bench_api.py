@@ -0,0 +1,61 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+import aiohttp
+
+# ══════════════════════════════════════════════════════════════════════════════
+# API LOAD TEST — concurrent clients hammering the JSON API with the pill-box
+# workload: mostly "Taken" posts, some schedule reads
+#   python benchmarks/bench_api.py --url http://localhost:8000 \
+#       --email you@example.com --password ... --clients 50 --requests 5000
+# ══════════════════════════════════════════════════════════════════════════════
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+async def client(session, url, headers, n, latencies, errors, write_ratio):
+    for i in range(n):
+        t = time.perf_counter()
+        if (i % 100) < write_ratio * 100:
+            req = session.post(f"{url}/history", headers=headers,
+                               json={"session": "Morning", "status": "Taken", "medicines": "Bench"})
+        else:
+            req = session.get(f"{url}/medicines", headers=headers)
+        async with req as resp:
+            await resp.read()
+            if resp.status >= 400: errors.append(resp.status)
+        latencies.append(time.perf_counter() - t)
+
+async def main(args):
+    conn = aiohttp.TCPConnector(limit=args.clients)
+    async with aiohttp.ClientSession(connector=conn) as session:
+        async with session.post(f"{args.url}/login",
+                                json={"email": args.email, "password": args.password}) as resp:
+            resp.raise_for_status()
+            token = (await resp.json())["token"]
+        headers   = {"Authorization": f"Bearer {token}"}
+        latencies, errors = [], []
+        per       = args.requests // args.clients
+        t0        = time.perf_counter()
+        await asyncio.gather(*(client(session, args.url, headers, per, latencies, errors, args.write_ratio)
+                               for _ in range(args.clients)))
+        wall = time.perf_counter() - t0
+    print(f"clients       {args.clients}")
+    print(f"requests      {len(latencies)}  ({len(errors)} errors)")
+    print(f"throughput    {len(latencies) / wall:8.1f} req/s")
+    print(f"latency p50   {pct(latencies, 0.50) * 1000:8.2f} ms")
+    print(f"latency p95   {pct(latencies, 0.95) * 1000:8.2f} ms")
+    print(f"latency p99   {pct(latencies, 0.99) * 1000:8.2f} ms")
+    print(f"latency mean  {statistics.fmean(latencies) * 1000:8.2f} ms")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Load-test the MediCare JSON API.")
+    ap.add_argument("--url",         default="http://localhost:8000")
+    ap.add_argument("--email",       required=True)
+    ap.add_argument("--password",    required=True)
+    ap.add_argument("--clients",     type=int,   default=50)
+    ap.add_argument("--requests",    type=int,   default=5000)
+    ap.add_argument("--write-ratio", type=float, default=0.8, help="share of requests that post a dose")
+    asyncio.run(main(ap.parse_args()))
@@ -0,0 +1,69 @@
+import argparse
+import difflib
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# ══════════════════════════════════════════════════════════════════════════════
+# CATALOG BENCHMARK — medicine-name suggestions from the mmap'd bisect index
+# versus a plain list scanned with startswith + difflib: time to open, and
+# per-lookup latency for prefixes (as typed, 1–6 letters) and misspellings.
+# --names pads the bundled catalog with synthetic names to show scaling.
+#   python benchmarks/bench_catalog.py --names 100000
+# ══════════════════════════════════════════════════════════════════════════════
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from catalog import CATALOG_PATH, DrugCatalog, build_index, normalize   # noqa: E402
+
+def names_from(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+def typo(name, rng):
+    i = rng.randrange(1, len(name) - 1)
+    return name[:i] + name[i + 1] + name[i] + name[i + 2:]   # swap two letters
+
+class ListScan:
+    def __init__(self, path):
+        self.names = names_from(path)
+        self.keys  = [normalize(n) for n in self.names]
+
+    def suggest(self, text, limit=8):
+        q    = normalize(text)
+        hits = [n for n, k in zip(self.names, self.keys) if k.startswith(q)][:limit]
+        return hits or [self.names[self.keys.index(k)] for k in difflib.get_close_matches(q, self.keys, limit, 0.75)]
+
+def timed(fn, queries):
+    t = time.perf_counter()
+    for q in queries: fn(q)
+    return (time.perf_counter() - t) * 1e6 / len(queries)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark medicine-name suggestions.")
+    ap.add_argument("--names",   type=int, default=0, help="pad the catalog to this many names")
+    ap.add_argument("--queries", type=int, default=2000)
+    args = ap.parse_args()
+
+    rng  = random.Random(0)
+    real = names_from(CATALOG_PATH)
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "drugs.txt")
+        pad = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(6, 14))).title()
+               for _ in range(max(0, args.names - len(real)))]
+        with open(src, "w", encoding="utf-8") as f: f.write("\n".join(real + pad))
+        t = time.perf_counter(); n = build_index(src, src + ".idx"); build = time.perf_counter() - t
+
+        t = time.perf_counter(); indexed = DrugCatalog(src + ".idx"); open_idx = time.perf_counter() - t
+        t = time.perf_counter(); scan = ListScan(src);                open_list = time.perf_counter() - t
+        prefixes = [normalize(rng.choice(real))[:rng.randint(1, 6)] for _ in range(args.queries)]
+        typos    = [typo(normalize(rng.choice(real)), rng) for _ in range(args.queries // 10)]
+        print(f"{n:,} names  index build {build * 1000:.1f} ms  ({os.path.getsize(src + '.idx') / 1024:.0f} KiB)")
+        print(f"{'':<12} {'open':>10} {'prefix':>12} {'misspelt':>12}")
+        for label, cat, opened in (("mmap+bisect", indexed, open_idx), ("list scan", scan, open_list)):
+            print(f"{label:<12} {opened * 1000:8.2f}ms {timed(cat.suggest, prefixes):10.1f}µs "
+                  f"{timed(cat.suggest, typos):10.1f}µs")
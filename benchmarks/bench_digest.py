@@ -0,0 +1,59 @@
+import argparse
+import random
+import resource
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+# ══════════════════════════════════════════════════════════════════════════════
+# DIGEST BENCHMARK — digest.build_digests over a synthetic day: N patients
+# with a few medicines each (some on weekday or course rules), one history row
+# per scheduled session, and one to three phone numbers. Reports build time
+# and peak RSS; the backend scans are not included.
+#   python benchmarks/bench_digest.py --users 100000
+# ══════════════════════════════════════════════════════════════════════════════
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from digest import build_digests   # noqa: E402
+
+SESSIONS = [("Morning", "08:00"), ("Afternoon", "13:00"), ("Night", "21:00")]
+RULES    = [None, None, None, {"days": [0, 2, 4]}, {"end": "2024-01-01"}, {"every_hours": 8}]
+
+def day_data(n, day, seed=0):
+    rng = random.Random(seed)
+    users, meds, hist = [], [], []
+    for i in range(n):
+        email = f"user{i}@bench.local"
+        users.append({"email": email, "name": f"User {i}",
+                      "phone": ",".join(f"+9198{i:08d}{k}" for k in range(rng.randint(1, 3)))})
+        by_session = {}
+        for k in range(rng.randint(1, 5)):
+            session, hm = rng.choice(SESSIONS)
+            name        = f"Med{rng.randint(0, 40)}"
+            meds.append({"id": len(meds) + 1, "user_email": email, "name": name, "time": hm,
+                         "session": session, "rule": rng.choice(RULES)})
+            by_session.setdefault(session, []).append(name)
+        for session, names in by_session.items():
+            if rng.random() < 0.9:
+                hist.append({"id": len(hist) + 1, "user_email": email, "session": session,
+                             "medicines": ", ".join(names), "status": "Taken" if rng.random() < 0.8 else "Missed"})
+    return users, meds, hist
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark building end-of-day digests for every user.")
+    ap.add_argument("--users", type=int, default=100_000)
+    ap.add_argument("--day",   type=date.fromisoformat, default=date(2024, 3, 4))
+    args = ap.parse_args()
+
+    t = time.perf_counter()
+    users, meds, hist = day_data(args.users, args.day)
+    print(f"{len(users):,} users, {len(meds):,} medicines, {len(hist):,} history rows "
+          f"(generated in {time.perf_counter() - t:.1f}s)")
+    t       = time.perf_counter()
+    digests = build_digests(users, meds, hist, args.day)
+    secs    = time.perf_counter() - t
+    print(f"build_digests: {secs:.2f}s  {len(digests):,} digests for {digests['user_email'].nunique():,} patients  "
+          f"{args.users / secs:,.0f} users/s  peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+    print(digests["body"].iloc[0] if len(digests) else "(no digests)")
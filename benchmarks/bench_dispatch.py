@@ -0,0 +1,104 @@
+import argparse
+import random
+import smtplib
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+from pathlib import Path
+
+# ══════════════════════════════════════════════════════════════════════════════
+# DISPATCH BENCHMARK — a mixed batch (mostly WhatsApp, some SMS and email) sent
+# through simulated providers where email has stalled, first on one shared
+# pool (how outbox.py sent before dispatch.py), then on dispatch.Dispatcher's
+# per-channel pools. Reports when the last WhatsApp message went out and
+# when the batch finished. Then the email channel against the local SMTP
+# stand-in: kept-open connections per worker versus a new connection for each
+# message.
+#   python benchmarks/bench_dispatch.py --whatsapp 400 --sms 50 --email 40 --email-latency-ms 500
+# ══════════════════════════════════════════════════════════════════════════════
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from dispatch import Channel, Dispatcher, EmailChannel, SmtpSink   # noqa: E402
+
+class Simulated(Channel):
+    def __init__(self, name, latency, workers):
+        self.name, self.latency = name, latency
+        super().__init__(0, workers)
+
+    def send(self, address, body):
+        time.sleep(self.latency)
+        return "SM" + address, address, "queued"
+
+def batch(args, seed=0):
+    # Interleaved, as outbox rows are: a patient's contacts sit side by side.
+    out = ([f"+9198{i:08d}" for i in range(args.whatsapp)] + [f"sms:+9197{i:08d}" for i in range(args.sms)]
+           + [f"user{i}@bench.local" for i in range(args.email)])
+    random.Random(seed).shuffle(out)
+    return out
+
+def shared_pool(args, addresses, latency):
+    # One pool; each message holds a worker for its provider's latency.
+    done, t = {}, time.perf_counter()
+    def one(address):
+        time.sleep(latency[address])
+        done[address] = time.perf_counter() - t
+    with ThreadPoolExecutor(args.workers) as pool:
+        list(pool.map(one, addresses))
+    return done
+
+def per_channel(args, addresses, channels):
+    d, done, t = Dispatcher(channels), {}, time.perf_counter()
+    def finished(address):
+        return lambda f: done.__setitem__(address, time.perf_counter() - t)
+    futures = [d.submit(a, "💊 Reminder") for a in addresses]
+    for a, f in zip(addresses, futures): f.add_done_callback(finished(a))
+    for f in futures: f.result()
+    d.close()
+    return done
+
+def report(label, done):
+    wa = max(v for a, v in done.items() if a.startswith("+"))
+    print(f"{label:<28} last WhatsApp {wa:6.2f}s   batch {max(done.values()):6.2f}s")
+
+def smtp_rate(port, n, workers, reuse):
+    channel = EmailChannel("localhost", port, "bench@bench.local", rate=0, workers=workers)
+    def fresh(address, body):
+        msg = EmailMessage(); msg["From"] = "bench@bench.local"; msg["To"] = address
+        msg["Subject"] = "Reminder"; msg.set_content(body)
+        with smtplib.SMTP("localhost", port) as smtp: smtp.send_message(msg)
+    send = channel.send if reuse else fresh
+    t = time.perf_counter()
+    list(channel.pool.map(lambda i: send(f"user{i}@bench.local", "💊 Reminder\nTake Metformin"), range(n)))
+    channel.pool.shutdown()
+    return n / (time.perf_counter() - t)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark per-channel dispatch against one shared pool.")
+    ap.add_argument("--whatsapp",            type=int,   default=400)
+    ap.add_argument("--sms",                 type=int,   default=50)
+    ap.add_argument("--email",               type=int,   default=40)
+    ap.add_argument("--workers",             type=int,   default=8, help="shared pool size; WhatsApp workers")
+    ap.add_argument("--whatsapp-latency-ms", type=float, default=20)
+    ap.add_argument("--sms-latency-ms",      type=float, default=60)
+    ap.add_argument("--email-latency-ms",    type=float, default=500, help="a stalled mail provider")
+    ap.add_argument("--smtp-messages",       type=int,   default=2000)
+    args = ap.parse_args()
+
+    addresses = batch(args)
+    wa, sms, em = args.whatsapp_latency_ms / 1000, args.sms_latency_ms / 1000, args.email_latency_ms / 1000
+    latency   = {a: em if "@" in a else sms if a.startswith("sms:") else wa for a in addresses}
+    print(f"{args.whatsapp} WhatsApp, {args.sms} SMS, {args.email} email messages")
+    report(f"shared pool ({args.workers} workers)", shared_pool(args, addresses, latency))
+    report(f"per channel ({args.workers}/4/4)", per_channel(args, addresses, [
+        Simulated("whatsapp", wa, args.workers), Simulated("sms", sms, 4), Simulated("email", em, 4)]))
+
+    sink = SmtpSink("localhost", 0)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    port = sink.server_address[1]
+    for workers in (1, 4):
+        print(f"SMTP stand-in, {workers} worker(s): kept-open {smtp_rate(port, args.smtp_messages, workers, True):7,.0f} msg/s   "
+              f"connect per message {smtp_rate(port, args.smtp_messages // 4, workers, False):7,.0f} msg/s")
+    sink.shutdown()
@@ -0,0 +1,62 @@
+import argparse
+import random
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# ══════════════════════════════════════════════════════════════════════════════
+# HISTORY BENCHMARK — the History page's work for N rows (build, filter by
+# status and session, CSV export) with the old pandas path versus the Arrow
+# history store. Each path runs in its own interpreter so peak RSS is its own.
+#   python benchmarks/bench_history.py --rows 200000
+# ══════════════════════════════════════════════════════════════════════════════
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+def rows(n, seed=0):
+    rng   = random.Random(seed)
+    meds  = ["Metformin", "Metformin, Atorvastatin", "Amlodipine", "Levothyroxine, Vitamin D"]
+    return [{"id": i, "user_email": "bench@x", "client_id": None,
+             "date_time": f"2024-{1 + i * 12 // n:02d}-{1 + i % 28:02d} {i % 24:02d}:00:00",
+             "session": rng.choice(["Morning", "Afternoon", "Night"]), "medicines": rng.choice(meds),
+             "status": "Taken" if rng.random() < 0.85 else "Missed",
+             "notes": "Taken on time"} for i in range(n)]
+
+def pandas_path(data):
+    import pandas as pd
+    df       = pd.DataFrame(data).drop_duplicates("id").sort_values("date_time")
+    df       = df[["date_time", "session", "medicines", "status", "notes"]]
+    filtered = df.copy()
+    filtered = filtered[filtered["status"] == "Taken"]
+    filtered = filtered[filtered["session"] == "Morning"]
+    return len(filtered), len(filtered.to_csv(index=False).encode("utf-8"))
+
+def arrow_path(data):
+    import history_store as hs
+    table    = hs.combine(hs.from_rows(data))
+    filtered = hs.display(hs.where(table, status="Taken", session="Morning"))
+    return filtered.num_rows, len(hs.to_csv(filtered))
+
+def child(mode, n):
+    data = rows(n)
+    __import__("pandas") if mode == "pandas" else __import__("history_store")
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t    = time.perf_counter()
+    kept, size = (pandas_path if mode == "pandas" else arrow_path)(data)
+    secs = time.perf_counter() - t
+    peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base) / 1024
+    print(f"{mode:<7} {n:>9,} rows  {secs * 1000:8.1f} ms  peak +{peak:7.1f} MB  kept {kept:,}  csv {size / 1e6:.1f} MB")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Compare pandas and Arrow history paths.")
+    ap.add_argument("--rows", type=int, nargs="+", default=[20_000, 200_000])
+    ap.add_argument("--mode", choices=["pandas", "arrow"])
+    args = ap.parse_args()
+    if args.mode:
+        child(args.mode, args.rows[0])
+    else:
+        for n in args.rows:
+            for mode in ("pandas", "arrow"):
+                subprocess.run([sys.executable, __file__, "--mode", mode, "--rows", str(n)], check=True)
@@ -0,0 +1,65 @@
+import argparse
+import csv
+import random
+import sys
+import time
+from pathlib import Path
+
+# ══════════════════════════════════════════════════════════════════════════════
+# INTERACTIONS BENCHMARK — checking one new medicine against a patient's k
+# others with the hashed pair index, versus scanning the dataset's rows and
+# comparing names; then a full rescreen of N synthetic patients.
+#   python benchmarks/bench_interactions.py --k 5 20 100 --patients 100000
+# ══════════════════════════════════════════════════════════════════════════════
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from catalog import CATALOG_PATH, normalize                        # noqa: E402
+from interactions import DATASET_PATH, InteractionIndex, rescreen  # noqa: E402
+
+def dataset_rows():
+    with open(DATASET_PATH, encoding="utf-8") as f:
+        rows = list(csv.reader(line for line in f if not line.startswith("#")))
+    return rows[1:]
+
+def scan_check(rows, name, others):
+    # The obvious version: every dataset row against every (new, other) pair.
+    out, n = [], normalize(name)
+    for other in others:
+        o = normalize(other)
+        for a, b, severity, note in rows:
+            a, b = a.casefold(), b.casefold()
+            if (a, b) in ((n, o), (o, n)):
+                out.append((other, severity, note))
+    return out
+
+def timed(fn, reps):
+    t = time.perf_counter()
+    for _ in range(reps): fn()
+    return (time.perf_counter() - t) * 1e6 / reps
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark drug-interaction screening.")
+    ap.add_argument("--k",        type=int, nargs="+", default=[5, 20, 100])
+    ap.add_argument("--patients", type=int, default=100_000)
+    ap.add_argument("--reps",     type=int, default=200)
+    args = ap.parse_args()
+
+    rng   = random.Random(0)
+    names = [l.strip() for l in open(CATALOG_PATH, encoding="utf-8") if l.strip() and not l.startswith("#")]
+    rows  = dataset_rows()
+    t     = time.perf_counter(); index = InteractionIndex.load()
+    print(f"{len(rows):,} dataset rows -> {len(index.pairs):,} pairs, compiled in {(time.perf_counter() - t) * 1000:.1f} ms")
+    for k in args.k:
+        others = [f"{rng.choice(names)} {rng.choice([250, 500, 5, 10])} mg" for _ in range(k)]
+        new    = rng.choice(["Warfarin", "Ibuprofen 400 mg", "Clarithromycin", "Sildenafil"])
+        print(f"check against k={k:<4} index {timed(lambda: index.check(new, others), args.reps):8.1f} µs   "
+              f"row scan {timed(lambda: scan_check(rows, new, others), max(1, args.reps // 20)):10.1f} µs")
+
+    meds = [{"user_email": f"user{i}@bench.local", "name": rng.choice(names)}
+            for i in range(args.patients) for _ in range(rng.randint(1, 6))]
+    t     = time.perf_counter()
+    flags = sum(1 for _ in rescreen(index, meds))
+    secs  = time.perf_counter() - t
+    print(f"rescreen {args.patients:,} patients / {len(meds):,} medicines: {secs:.2f}s, {flags:,} flags, "
+          f"{len(meds) / secs:,.0f} medicines/s")
@@ -0,0 +1,85 @@
+import argparse
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from pathlib import Path
+
+# ══════════════════════════════════════════════════════════════════════════════
+# LOGIN BENCHMARK — concurrent clients verifying passwords through
+# auth.PasswordHasher at the chosen scrypt cost. Reports logins per second,
+# p50/p99 latency (admission wait included), logins turned away as busy, and
+# the process's peak RSS, against the old unsalted SHA-256 check as a floor.
+#   python benchmarks/bench_login.py --clients 8 32 128 --logins 400
+#   python benchmarks/bench_login.py --n 32768 --workers 8 --queue 64
+# ══════════════════════════════════════════════════════════════════════════════
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from auth import (ADMIT_WAIT, KDF_N, KDF_P, KDF_QUEUE, KDF_R, KDF_WORKERS,  # noqa: E402
+                  LoginThrottled, PasswordHasher, SlidingWindow, legacy_hash, make_hash)
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+def peak_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def load(check, users, clients, logins, seed=0):
+    latencies, busy, wrong = [], [0], [0]
+    lock = threading.Lock()
+    def client(i):
+        rng = random.Random(seed + i)
+        for _ in range(logins // clients):
+            email, password, stored = rng.choice(users)
+            t = time.perf_counter()
+            try:
+                ok = check(email, password, stored)
+            except LoginThrottled:
+                with lock: busy[0] += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - t)
+                wrong[0] += not ok
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    t = time.perf_counter()
+    for th in threads: th.start()
+    for th in threads: th.join()
+    return latencies, busy[0], wrong[0], time.perf_counter() - t
+
+def report(label, latencies, busy, wrong, wall):
+    print(f"{label:<22} {len(latencies) / wall:8.1f} logins/s  p50 {pct(latencies, 0.5) * 1000:8.1f} ms  "
+          f"p99 {pct(latencies, 0.99) * 1000:8.1f} ms  busy {busy:>4}  wrong {wrong}  peak RSS {peak_mb():6.0f} MB")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark password verification under concurrent logins.")
+    ap.add_argument("--n",          type=int,   default=KDF_N)
+    ap.add_argument("--r",          type=int,   default=KDF_R)
+    ap.add_argument("--p",          type=int,   default=KDF_P)
+    ap.add_argument("--workers",    type=int,   default=KDF_WORKERS)
+    ap.add_argument("--queue",      type=int,   default=KDF_QUEUE)
+    ap.add_argument("--admit-wait", type=float, default=ADMIT_WAIT)
+    ap.add_argument("--clients",    type=int,   nargs="+", default=[8, 32, 128])
+    ap.add_argument("--logins",     type=int,   default=400)
+    ap.add_argument("--users",      type=int,   default=50)
+    args = ap.parse_args()
+
+    cost = (args.n, args.r, args.p)
+    print(f"scrypt N={args.n} r={args.r} p={args.p} ({128 * args.n * args.r / 2**20:.0f} MiB per hash), "
+          f"{args.workers} workers, queue {args.queue}, {os.cpu_count()} CPUs")
+    users  = [(f"user{i}@bench.local", f"pw-{i}") for i in range(args.users)]
+    hashed = [(e, p, make_hash(p, *cost)) for e, p in users]
+    legacy = [(e, p, legacy_hash(p)) for e, p in users]
+
+    t = time.perf_counter(); make_hash("x", *cost)
+    print(f"one hash, single thread: {(time.perf_counter() - t) * 1000:.1f} ms")
+    for clients in args.clients:
+        hasher = PasswordHasher(args.workers, args.queue, args.admit_wait, *cost,
+                                window=SlidingWindow(limit=10 ** 9))   # every login is a distinct attempt here
+        report(f"scrypt, {clients} clients", *load(lambda e, p, s: hasher.check_password(e, p, s)[0],
+                                                 hashed, clients, args.logins))
+        hasher.pool.shutdown()
+    report("legacy sha256", *load(lambda e, p, s: legacy_hash(p) == s, legacy, args.clients[0], args.logins))
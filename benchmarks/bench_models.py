@@ -0,0 +1,74 @@
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# ══════════════════════════════════════════════════════════════════════════════
+# MODELS BENCHMARK — what each read costs with select("*") dicts versus the
+# per-call-site projections and __slots__ models: JSON bytes on the wire, heap
+# per row (tracemalloc, strings included), and time to build the rows.
+#   python benchmarks/bench_models.py --history 100000
+# ══════════════════════════════════════════════════════════════════════════════
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from auth import make_hash                          # noqa: E402
+from models import HistoryEntry, Medicine, User     # noqa: E402
+
+def users(n):
+    pw = make_hash("bench-password", n=2 ** 10)     # same length as a real hash, cheaper to make
+    return [{"email": f"user{i}@bench.local", "name": f"User {i}", "phone": "+919800000000,+447700900000",
+             "age": "54", "sex": "Female", "condition": "Type 2 diabetes", "gp": "Dr Rao", "password": pw}
+            for i in range(n)]
+
+def medicines(n):
+    return [{"id": i, "user_email": "bench@x", "name": "Metformin 500 mg", "time": f"{i % 24:02d}:00",
+             "session": "Morning", "rule": {"days": [0, 2, 4]} if i % 3 else None} for i in range(n)]
+
+def history(n, seed=0):
+    rng = random.Random(seed)
+    return [{"id": i, "client_id": f"{rng.getrandbits(128):032x}", "user_email": "bench@x",
+             "date_time": f"2024-{1 + i * 12 // n:02d}-{1 + i % 28:02d} {i % 24:02d}:00:00",
+             "session": rng.choice(["Morning", "Afternoon", "Night"]), "medicines": "Metformin, Atorvastatin",
+             "status": "Taken" if rng.random() < 0.85 else "Missed", "notes": "Taken on time"} for i in range(n)]
+
+def payload(rows):
+    return json.dumps(rows, separators=(",", ":")).encode()
+
+def measure(build, body):
+    # Decodes the response body and builds the rows, as the client would.
+    tracemalloc.start()
+    t     = time.perf_counter()
+    rows  = build(json.loads(body))
+    secs  = time.perf_counter() - t
+    size  = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del rows
+    return size, secs
+
+def compare(label, data, model, columns):
+    full = payload(data)
+    proj = payload([{c: r[c] for c in columns} for r in data])
+    d_mem, d_secs = measure(lambda rows: rows, full)
+    m_mem, m_secs = measure(model.from_rows, proj)
+    n = len(data)
+    print(f"{label:<34} {n:>7,} rows  payload {len(full) / n:6.0f} → {len(proj) / n:4.0f} B/row  "
+          f"heap {d_mem / n:6.0f} → {m_mem / n:4.0f} B/row  build {d_secs * 1e6 / n:5.2f} → {m_secs * 1e6 / n:5.2f} µs/row")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Compare select('*') dict rows with projected slots models.")
+    ap.add_argument("--users",     type=int, default=1000)
+    ap.add_argument("--medicines", type=int, default=1000)
+    ap.add_argument("--history",   type=int, default=100_000)
+    args = ap.parse_args()
+
+    u, h = users(args.users), history(args.history)
+    compare("users → User.PROFILE",            u, User,         User.PROFILE)
+    compare("users → User.CREDENTIALS",        u, User,         User.CREDENTIALS)
+    compare("medicines → Medicine.SCHEDULE",   medicines(args.medicines), Medicine, Medicine.SCHEDULE)
+    compare("history → HistoryEntry.COUNTS",   h, HistoryEntry, HistoryEntry.COUNTS)
+    compare("history → HistoryEntry.DISPLAY",  h, HistoryEntry, HistoryEntry.DISPLAY)
+    compare("history → HistoryEntry.SESSIONS", h, HistoryEntry, HistoryEntry.SESSIONS)
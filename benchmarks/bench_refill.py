@@ -0,0 +1,73 @@
+import argparse
+import math
+import random
+import resource
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+# ══════════════════════════════════════════════════════════════════════════════
+# REFILL BENCHMARK — refill.build_alerts over N patients' tracked medicines
+# (mixed daily, weekday, every-N-hours and finite-course rules) against the
+# same job done one medicine at a time with stock.days_left. The backend
+# scan is not included.
+#   python benchmarks/bench_refill.py --users 100000
+# ══════════════════════════════════════════════════════════════════════════════
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from refill import build_alerts                                # noqa: E402
+from stock import REFILL_DAYS, _per_day, _rule_key, days_left   # noqa: E402
+
+RULES = [None, None, None, {"days": [0, 2, 4]}, {"every_hours": 8, "start": "2024-03-01"},
+         {"end": "2024-03-10"}, {"end": "2024-12-31"}]
+
+def tracked(n, seed=0):
+    rng = random.Random(seed)
+    users, meds = [], []
+    for i in range(n):
+        email = f"user{i}@bench.local"
+        users.append({"email": email, "name": f"User {i}",
+                      "phone": ",".join(f"+9198{i:08d}{k}" for k in range(rng.randint(1, 3)))})
+        for _ in range(rng.randint(1, 5)):
+            meds.append({"id": len(meds) + 1, "user_email": email, "name": f"Med{rng.randint(0, 40)}",
+                         "time": f"{rng.randint(6, 22):02d}:00", "rule": rng.choice(RULES),
+                         "stock": rng.choice([None, rng.randint(0, 90)]), "dose_qty": rng.choice([1, 1, 2, 0.5])})
+    return users, meds
+
+def per_row(users, meds, today, days=REFILL_DAYS):
+    # The obvious version: days_left and the course end per medicine, then a
+    # message per contact. Same output as build_alerts, row by row.
+    lines = {}
+    for m in sorted((m for m in meds if m["stock"] is not None), key=lambda m: days_left(m)):
+        left = days_left(m)
+        last = _per_day(_rule_key(m["time"], m["rule"]))[1]
+        runout = today.toordinal() + math.floor(left) if left != math.inf else math.inf
+        if left < days and runout <= last and last >= today.toordinal():
+            when = "runs out today" if left < 1 else f"about {date.fromordinal(runout):%a %d %b}"
+            lines.setdefault(m["user_email"], []).append(f"{m['name']}: {m['stock']:g} left, {when}")
+    out = []
+    for u in users:
+        if u["email"] in lines:
+            for number in filter(None, (n.strip() for n in (u["phone"] or "").split(","))):
+                out.append((u["email"], number, f"💊 Refill reminder for {u['name']}\n" + "\n".join(lines[u["email"]])
+                            + "\nPlease reorder soon, then update the count on the Medicines page."))
+    return out
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark refill run-out prediction.")
+    ap.add_argument("--users", type=int, default=100_000)
+    ap.add_argument("--day",   type=date.fromisoformat, default=date(2024, 3, 4))
+    args = ap.parse_args()
+
+    users, meds = tracked(args.users)
+    print(f"{len(users):,} users, {len(meds):,} medicines, {sum(m['stock'] is not None for m in meds):,} tracked")
+    t      = time.perf_counter()
+    alerts = build_alerts(users, meds, args.day)
+    secs   = time.perf_counter() - t
+    print(f"build_alerts:       {secs:.2f}s  {alerts['user_email'].nunique():,} patients low, {len(alerts):,} reminders  "
+          f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+    t    = time.perf_counter()
+    rows = per_row(users, meds, args.day)
+    print(f"per-medicine loop:  {time.perf_counter() - t:.2f}s  {len(rows):,} reminders")
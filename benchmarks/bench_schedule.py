@@ -0,0 +1,77 @@
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# ══════════════════════════════════════════════════════════════════════════════
+# SCHEDULE BENCHMARK — compile N recurrence rules, time next_fire, and drain
+# the lazy Scheduler minute by minute over D days, against materializing every
+# occurrence up front into a sorted list
+#   python benchmarks/bench_schedule.py --rules 300000 --days 7
+# ══════════════════════════════════════════════════════════════════════════════
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from reminder_sim import TIME_OPTIONS, synthetic_rule          # noqa: E402
+from schedule import DAY, Rule, Scheduler, to_minute           # noqa: E402
+
+START = datetime(2024, 1, 1)
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+def measure(fn):
+    # Wall time and resident memory still held once fn has returned.
+    rss0, t = rss_mb(), time.perf_counter()
+    out     = fn()
+    return out, time.perf_counter() - t, rss_mb() - rss0
+
+def materialize(rules, t0, t1):
+    occurrences = []
+    for key, rule in rules:
+        f = rule.next_fire(t0)
+        while f is not None and f < t1:
+            occurrences.append((f, key))
+            f = rule.next_fire(f + 1)
+    occurrences.sort()
+    return occurrences
+
+def drain(sched, t0, t1):
+    fired = 0
+    for minute in range(t0, t1):
+        fired += len(sched.pop_due(minute))
+    return fired
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark schedule rule evaluation and the lazy scheduler.")
+    ap.add_argument("--rules", type=int, default=300_000)
+    ap.add_argument("--days",  type=int, default=7)
+    ap.add_argument("--seed",  type=int, default=0)
+    args = ap.parse_args()
+
+    rng   = random.Random(args.seed)
+    specs = [(rng.choice(TIME_OPTIONS), synthetic_rule(rng, START)) for _ in range(args.rules)]
+    t0    = to_minute(START)
+    t1    = t0 + args.days * DAY
+
+    rules, secs, mb = measure(lambda: [(i, Rule(hm, r)) for i, (hm, r) in enumerate(specs)])
+    print(f"compile            {len(rules):>10,} rules  {secs:7.2f} s  {mb:8.1f} MB")
+
+    probes = [rng.randrange(t0, t1) for _ in range(200_000)]
+    picks  = [rules[rng.randrange(len(rules))][1] for _ in probes]
+    t = time.perf_counter()
+    for rule, probe in zip(picks, probes): rule.next_fire(probe)
+    print(f"next_fire          {(time.perf_counter() - t) / len(probes) * 1e9:>10.0f} ns/call")
+
+    sched, secs, mb = measure(lambda: Scheduler(rules, t0))
+    print(f"scheduler build    {len(sched):>10,} armed  {secs:7.2f} s  {mb:8.1f} MB")
+    fired, secs, mb = measure(lambda: drain(sched, t0, t1))
+    print(f"lazy drain         {fired:>10,} fires  {secs:7.2f} s  {mb:8.1f} MB  "
+          f"({fired / secs:,.0f} fires/s, heap stays at {len(sched.heap):,})")
+
+    occ, secs, mb = measure(lambda: materialize(rules, t0, t1))
+    print(f"materialized       {len(occ):>10,} fires  {secs:7.2f} s  {mb:8.1f} MB  (all {args.days} days up front)")
@@ -0,0 +1,129 @@
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import threading
+import time
+from pathlib import Path
+
+# ══════════════════════════════════════════════════════════════════════════════
+# SESSION LOAD TEST — N concurrent headless sessions drive the real script via
+# Streamlit's AppTest against the in-memory stub backend: log in, visit Home,
+# Medicines and History, record doses. Reports rerun latency percentiles,
+# memory per session and thread count as N grows.
+#   python benchmarks/bench_sessions.py --sessions 1 5 10 25 --rounds 3
+#
+# AppTest swaps process-global runtime state on every run, so in the default
+# thread mode sessions share one process and take turns per rerun. With the
+# stub backend reruns are CPU-bound, which is also how one Streamlit process
+# behaves under the GIL, so latency includes that queueing. --mode process
+# gives every session its own interpreter instead (true parallelism; memory
+# is then each process's growth from its first run, imports included).
+# ══════════════════════════════════════════════════════════════════════════════
+ROOT = Path(__file__).resolve().parent.parent
+APP  = str(ROOT / "medicine_reminder.py")
+os.environ.setdefault("MEDICARE_BACKEND", "stub")
+sys.path.insert(0, str(ROOT))
+
+from streamlit.testing.v1 import AppTest          # noqa: E402
+from db import db_create_user, db_add_medicine     # noqa: E402
+
+PAGES    = ["🏠 Home", "💊 Medicines", "📋 History"]
+RUN_LOCK = threading.Lock()
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:   # not Linux: peak RSS is the best available
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+def seed_one(i):
+    email = f"load{i}@bench.local"
+    db_create_user(f"Load {i}", email, "+10000000000", 40, "Other", "bench-pass", "Bench", "Dr Bench")
+    db_add_medicine(email, "Metformin", "08:00", "Morning")
+    db_add_medicine(email, "Atorvastatin", "21:00", "Night")
+
+def run(at):
+    with RUN_LOCK:
+        at.run()
+
+def session(i, rounds, latencies, errors, apps):
+    def timed(at):
+        t = time.perf_counter(); run(at); latencies.append(time.perf_counter() - t)
+        if at.exception: errors.append(at.exception[0].message)
+    try:
+        at = AppTest.from_file(APP, default_timeout=120)
+        apps.append(at)
+        run(at)
+        at.text_input(key="le").input(f"load{i}@bench.local")
+        at.text_input(key="lp").input("bench-pass")
+        at.button[0].click(); run(at)       # login sleeps 1s before its rerun; not counted
+        for _ in range(rounds):
+            for page in PAGES:
+                at.sidebar.radio[0].set_value(page); timed(at)
+                if page == "🏠 Home":
+                    at.button(key="t_Morning").click(); timed(at)
+    except Exception as e:
+        errors.append(repr(e))
+
+def _process_session(job):
+    i, rounds, start = job
+    seed_one(i)
+    latencies, errors, apps = [], [], []
+    rss0 = rss_mb()
+    while time.time() < start: time.sleep(0.01)   # start all sessions together
+    session(i, rounds, latencies, errors, apps)
+    return latencies, errors, rss_mb() - rss0, threading.active_count()
+
+def run_level_processes(n, rounds):
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(n) as pool:
+        t0      = time.perf_counter()
+        results = pool.map(_process_session, [(i, rounds, time.time() + 5) for i in range(n)])
+        wall    = time.perf_counter() - t0 - 5
+    latencies = [l for r in results for l in r[0]]
+    errors    = [e for r in results for e in r[1]]
+    report(n, latencies, sum(r[2] for r in results) / n, sum(r[3] for r in results), wall, errors)
+
+def report(n, latencies, mb_per_session, threads, wall, errors):
+    print(f"{n:>8} {len(latencies):>7} {pct(latencies, .5) * 1000:>8.1f} {pct(latencies, .95) * 1000:>8.1f} "
+          f"{pct(latencies, .99) * 1000:>8.1f} {mb_per_session:>9.2f} {threads:>7} {wall:>7.1f} {len(errors):>6}")
+    if errors: print("         first error:", errors[0])
+
+def run_level(n, rounds):
+    latencies, errors, apps, peak = [], [], [], [threading.active_count()]
+    stop = threading.Event()
+    def watch():
+        while not stop.wait(0.05): peak[0] = max(peak[0], threading.active_count())
+    threading.Thread(target=watch, daemon=True).start()
+    rss0    = rss_mb()
+    t0      = time.perf_counter()
+    workers = [threading.Thread(target=session, args=(i, rounds, latencies, errors, apps)) for i in range(n)]
+    for w in workers: w.start()
+    for w in workers: w.join()
+    wall = time.perf_counter() - t0
+    rss1 = rss_mb()
+    stop.set()
+    report(n, latencies, (rss1 - rss0) / n, peak[0], wall, errors)
+    return apps   # keep sessions alive until the level is measured
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Concurrent-session load test for the Streamlit app.")
+    ap.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 25])
+    ap.add_argument("--rounds",   type=int, default=3, help="page-visit rounds per session")
+    ap.add_argument("--mode",     choices=["thread", "process"], default="thread")
+    args = ap.parse_args()
+
+    if args.mode == "thread":
+        for i in range(max(args.sessions)): seed_one(i)
+        session(0, 1, [], [], [])   # warm-up: imports and first-run caches are not per-session cost
+    print(f"{'sessions':>8} {'reruns':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'MB/sess':>9} "
+          f"{'threads':>7} {'wall s':>7} {'errors':>6}")
+    for n in args.sessions:
+        run_level(n, args.rounds) if args.mode == "thread" else run_level_processes(n, args.rounds)
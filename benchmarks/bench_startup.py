@@ -0,0 +1,61 @@
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# ══════════════════════════════════════════════════════════════════════════════
+# STARTUP BENCHMARK — cold-start import cost and per-rerun client overhead of
+# the old eager module header versus the lazy db/notify modules
+#   python benchmarks/bench_startup.py [--runs 7]
+# ══════════════════════════════════════════════════════════════════════════════
+ROOT  = Path(__file__).resolve().parent.parent
+URL   = "https://bench.supabase.co"
+KEY   = "sb_publishable_bench"
+RUNS  = int(sys.argv[sys.argv.index("--runs") + 1]) if "--runs" in sys.argv else 7
+
+COLD = {
+    "eager (before)": f"""
+import streamlit, pandas, twilio.rest
+from supabase import create_client
+create_client({URL!r}, {KEY!r})
+""",
+    "lazy (after)": """
+import streamlit, db, notify
+""",
+}
+
+RERUN = f"""
+import time, logging, streamlit as st
+logging.disable(logging.WARNING)
+from supabase import create_client
+N = 200
+t = time.perf_counter()
+for _ in range(N): create_client({URL!r}, {KEY!r})
+eager = (time.perf_counter() - t) / N
+
+@st.cache_resource(show_spinner=False)
+def get_client(): return create_client({URL!r}, {KEY!r})
+get_client()
+t = time.perf_counter()
+for _ in range(N): get_client()
+cached = (time.perf_counter() - t) / N
+print(eager, cached)
+"""
+
+def timed(code):
+    t = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - t
+
+if __name__ == "__main__":
+    baseline = statistics.median(timed("pass") for _ in range(RUNS))
+    print(f"interpreter startup      {baseline * 1000:8.1f} ms (subtracted below)")
+    for label, code in COLD.items():
+        ms = (statistics.median(timed(code) for _ in range(RUNS)) - baseline) * 1000
+        print(f"cold start {label:<14}{ms:8.1f} ms")
+    out = subprocess.run([sys.executable, "-c", RERUN], cwd=ROOT, check=True,
+                         capture_output=True, text=True).stdout.split()
+    print(f"per rerun  create_client  {float(out[0]) * 1000:8.3f} ms")
+    print(f"per rerun  cached client  {float(out[1]) * 1000:8.3f} ms")
@@ -0,0 +1,256 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import setting
+from db import get_supabase, split_numbers
+from delivery import bare_number, record_sent
+from dispatch import Dispatcher, configured_channels, is_email, unreachable
+from ratelimit import TokenBucket
+
+# ══════════════════════════════════════════════════════════════════════════════
+# BROADCAST — operator job that sends one message to every contact of every
+# user (e.g. a sandbox number change). Users are streamed from the users table
+# a page at a time in email order; addresses are deduplicated across the whole
+# run. Numbers WhatsApp has stopped delivering to go by their other channel
+# (dispatch.py), or are skipped if they have none. Sends run on a thread pool
+# behind a token bucket. After each page the checkpoint records the last email
+# done and every number already attempted is in its .log, so rerunning an
+# interrupted command picks up where it stopped: numbers that failed are tried
+# again first, and those already handled on the unfinished page are counted as
+# resumed rather than sent twice:
+#   python broadcast.py --message-file notice.txt --rate 20 --concurrency 8
+#   python broadcast.py --message "..." --dry-run --send-latency-ms 200
+# ══════════════════════════════════════════════════════════════════════════════
+PAGE_SIZE   = 1000   # PostgREST caps a single response at 1000 rows
+RATE        = float(setting("BROADCAST_RATE", 10))
+CONCURRENCY = int(setting("BROADCAST_CONCURRENCY", 8))
+RETRIES     = 3
+
+def normalize(number):
+    number = bare_number(number.strip())
+    return number if is_email(number) else number.replace(" ", "").replace("-", "")
+
+def stream_users(after="", page_size=PAGE_SIZE):
+    # Keyset pagination: stable while users sign up mid-run, and resumable.
+    while True:
+        rows = (get_supabase().table("users").select("email,phone").gt("email", after)
+                .order("email").limit(page_size).execute().data or [])
+        if not rows: return
+        yield rows
+        after = rows[-1]["email"]
+        if len(rows) < page_size: return
+
+def count_users():
+    try:
+        return get_supabase().table("users").select("email", count="exact").limit(1).execute().count
+    except Exception:
+        return None
+
+class Checkpoint:
+    # <path> holds the cursor and totals, replaced atomically after every page;
+    # <path>.log gets "ok" / "fail" / "dead" and the number as each one finishes
+    # (line-buffered, so each line is out of the process before the next send),
+    # and "page" and the cursor once a page is done, so a crash mid-page only
+    # repeats the sends that were in flight.
+    def __init__(self, path, message):
+        self.path    = path
+        self.digest  = hashlib.sha256(message.encode()).hexdigest()
+        self.state   = {"message": self.digest, "after": "", "users": 0, "sent": 0, "failed": 0,
+                        "duplicate": 0, "dead": 0, "resumed": 0, "retried": 0}
+        self.seen    = set()   # numbers handled on finished pages, or already this run
+        self.partial = {}      # number -> outcome, logged on the page the last run didn't finish
+        self.retry   = []      # numbers on finished pages whose last attempt failed
+        self.lock    = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f: state = json.load(f)
+            if state.get("message") != self.digest:
+                raise SystemExit(f"{path} belongs to a different message; pass --fresh to start over.")
+            self.state = {**self.state, **state}
+            if os.path.exists(path + ".log"):
+                self._replay(path + ".log")
+            self.log = open(path + ".log", "a", buffering=1)
+        else:
+            discard(path)   # a .log left without its checkpoint is from some other run
+            self._save()
+            self.log = open(path + ".log", "a", buffering=1)
+            self.log.write("page \n")   # so a crash on the first page replays as unfinished
+
+    def _replay(self, log):
+        with open(log) as f:
+            lines = [line.split(" ", 1) for line in f if " " in line]
+        marks = [i for i, (outcome, _) in enumerate(lines) if outcome == "page"]
+        end   = marks[-1] if marks else len(lines)   # logs from before page marks: all finished
+        last  = {}
+        for i, (outcome, number) in enumerate(lines):
+            if outcome != "page":
+                number = number.strip()
+                if i > end and number not in last:
+                    self.partial[number] = outcome
+                last[number] = outcome
+        self.seen = set(last) - set(self.partial)
+        for number in self.partial:
+            self.partial[number] = last[number]
+        self.retry = sorted(n for n in self.seen if last[n] == "fail")
+        # The log is the record of outcomes; totals saved with the cursor miss
+        # retries that landed after it.
+        done = [last[n] for n in self.seen]
+        self.state.update(sent=done.count("ok"), failed=done.count("fail"), dead=done.count("dead"))
+
+    def _save(self):
+        with open(self.path + ".tmp", "w") as f: json.dump(self.state, f)
+        os.replace(self.path + ".tmp", self.path)
+
+    def done(self, number, outcome):
+        with self.lock:
+            self.log.write(f"{outcome} {number}\n")
+
+    def page_done(self, after):
+        with self.lock:
+            self.log.write(f"page {after}\n")
+            self.log.flush(); os.fsync(self.log.fileno())
+        self.state["after"] = after
+        self._save()
+
+def discard(path):
+    for p in (path, path + ".log"):
+        if os.path.exists(p): os.remove(p)
+
+def dispatch_sender(message, dispatcher):
+    # Only WhatsApp results are returned for record_sent (see dispatch.record).
+    def send(number, skip=()):
+        channel, result = dispatcher.deliver(number, message, skip)
+        return result if channel == "whatsapp" else (None,) + tuple(result[1:])
+    return send
+
+def dry_sender(latency):
+    def send(number, skip=()):
+        time.sleep(latency)
+        return None, f"whatsapp:{number}", "dry-run"
+    return send
+
+class Broadcast:
+    def __init__(self, send, checkpoint, rate=RATE, burst=None, concurrency=CONCURRENCY,
+                 skip_dead=True, fallback=lambda number: False, record=record_sent, progress_every=5.0,
+                 out=sys.stderr):
+        self.send        = send
+        self.ckpt        = checkpoint
+        self.bucket      = TokenBucket(rate, burst) if rate > 0 else None
+        self.concurrency = concurrency
+        self.skip_dead   = skip_dead
+        self.fallback    = fallback   # number -> whether it has a channel besides WhatsApp
+        self.record      = record
+        self.every       = progress_every
+        self.out         = out
+        self.total       = None
+        self.started     = time.monotonic()
+        self.sent_now    = 0   # this run only, for throughput
+        self.last_report = 0.0
+        self.lock        = threading.Lock()
+
+    def _send(self, number, skip=()):
+        for attempt in range(RETRIES):
+            if self.bucket: self.bucket.acquire()
+            try:
+                result = self.send(number, skip)
+                with self.lock: self.sent_now += 1
+                self.ckpt.done(number, "ok")
+                return number, result
+            except Exception as e:
+                error = e
+                time.sleep(0.5 * 2 ** attempt)
+        print(f"failed {number}: {error}", file=self.out)
+        self.ckpt.done(number, "fail")
+        return number, None
+
+    def progress(self, final=False):
+        now = time.monotonic()
+        if not final and now - self.last_report < self.every: return
+        self.last_report = now
+        s    = self.ckpt.state
+        secs = now - self.started
+        pct  = f" ({s['users'] * 100 / self.total:.1f}%)" if self.total else ""
+        print(f"{'done' if final else 'progress'}: users {s['users']:,}{pct}  sent {s['sent']:,}  "
+              f"failed {s['failed']:,}  duplicate {s['duplicate']:,}  dead {s['dead']:,}  "
+              f"resumed {s['resumed']:,}  retried {s['retried']:,}  "
+              f"{self.sent_now / secs if secs else 0:.1f} msg/s  {secs:.0f}s", file=self.out, flush=True)
+
+    def _deliver(self, pool, numbers):
+        s        = self.ckpt.state
+        dead     = unreachable(numbers) if self.skip_dead and numbers else set()
+        rerouted = {n for n in dead if self.fallback(n)}
+        s["dead"] += len(dead) - len(rerouted)
+        for n in dead - rerouted: self.ckpt.done(n, "dead")
+        todo     = [n for n in numbers if n not in dead or n in rerouted]
+        results  = list(pool.map(self._send, todo, [("whatsapp",) if n in dead else () for n in todo]))
+        self.record([r for _, r in results if r and r[0]])
+        s["sent"]   += sum(1 for _, r in results if r)
+        s["failed"] += sum(1 for _, r in results if not r)
+
+    def run(self, pages):
+        s = self.ckpt.state
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="broadcast") as pool:
+            if self.ckpt.retry:
+                print(f"retrying {len(self.ckpt.retry):,} number(s) that failed last time", file=self.out)
+                s["failed"]  -= len(self.ckpt.retry)
+                s["retried"] += len(self.ckpt.retry)
+                self._deliver(pool, self.ckpt.retry)
+                self.ckpt.retry = []
+                self.ckpt.page_done(s["after"])
+            for users in pages:
+                numbers = []
+                for u in users:
+                    for n in map(normalize, split_numbers(u.get("phone"))):
+                        if n in self.ckpt.seen: s["duplicate"] += 1; continue
+                        self.ckpt.seen.add(n)
+                        outcome = self.ckpt.partial.pop(n, None)
+                        if outcome in ("ok", "dead"):   # handled before the last run stopped
+                            s["resumed"] += 1; s["sent" if outcome == "ok" else "dead"] += 1; continue
+                        numbers.append(n)
+                self._deliver(pool, numbers)
+                s["users"] += len(users)
+                self.ckpt.page_done(users[-1]["email"])
+                self.progress()
+        self.progress(final=True)
+        return s
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Send one message to every contact of every user.")
+    msg = ap.add_mutually_exclusive_group(required=True)
+    msg.add_argument("--message")
+    msg.add_argument("--message-file")
+    ap.add_argument("--rate",            type=float, default=RATE, help="messages per second (0 = unlimited)")
+    ap.add_argument("--burst",           type=float, default=None)
+    ap.add_argument("--concurrency",     type=int,   default=CONCURRENCY)
+    ap.add_argument("--checkpoint",      help="default broadcast.checkpoint.json (broadcast.dry-run.json with --dry-run)")
+    ap.add_argument("--fresh",           action="store_true", help="discard an existing checkpoint")
+    ap.add_argument("--include-dead",    action="store_true", help="also send to numbers that stopped receiving")
+    ap.add_argument("--page-size",       type=int,   default=PAGE_SIZE)
+    ap.add_argument("--dry-run",         action="store_true", help="stream and rate-limit, but don't send")
+    ap.add_argument("--send-latency-ms", type=float, default=150.0, help="simulated send time with --dry-run")
+    args = ap.parse_args()
+
+    text = args.message if args.message is not None else open(args.message_file).read().strip()
+    args.checkpoint = args.checkpoint or ("broadcast.dry-run.json" if args.dry_run else "broadcast.checkpoint.json")
+    if args.fresh:
+        discard(args.checkpoint)
+    ckpt       = Checkpoint(args.checkpoint, text)
+    dispatcher = Dispatcher(configured_channels())
+    job        = Broadcast(dry_sender(args.send_latency_ms / 1000) if args.dry_run else dispatch_sender(text, dispatcher), ckpt,
+                           rate=args.rate, burst=args.burst, concurrency=args.concurrency,
+                           skip_dead=not args.include_dead, fallback=lambda n: bool(dispatcher.route(n, ("whatsapp",))[1]),
+                           record=(lambda _: None) if args.dry_run else record_sent)
+    job.total = count_users()
+    if ckpt.state["after"]:
+        print(f"resuming after {ckpt.state['after']} ({ckpt.state['users']:,} users done)", file=sys.stderr)
+    try:
+        job.run(stream_users(ckpt.state["after"], args.page_size))
+    except KeyboardInterrupt:
+        job.progress(final=True)
+        print(f"interrupted; rerun the same command to resume from {args.checkpoint}", file=sys.stderr)
+        sys.exit(130)
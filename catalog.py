@@ -0,0 +1,160 @@
+import argparse
+import difflib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+import streamlit as st
+
+from config import setting
+
+# ══════════════════════════════════════════════════════════════════════════════
+# DRUG CATALOG — medicine-name suggestions from the bundled catalog/drugs.txt.
+# The text file is compiled once into a sorted binary index next to it
+# (drugs.idx; rebuilt when the text is newer, or kept in the temp dir when the
+# app directory is read-only) which each process memory-maps:
+#   "DRX1" · count · key-blob size · key offsets · display offsets · keys · names
+# Keys are the casefolded names, sorted, so a prefix is two bisects over the
+# mapped bytes and nothing is parsed or copied at startup. Typos fall back to
+# difflib against names sharing the first letter, compared at the typed length.
+#   python catalog.py metfromin
+# ══════════════════════════════════════════════════════════════════════════════
+CATALOG_PATH = setting("DRUG_CATALOG", str(Path(__file__).resolve().parent / "catalog" / "drugs.txt"))
+MAGIC        = b"DRX1"
+HEADER       = struct.Struct("<4sII")
+FUZZY_CUTOFF = 0.75
+
+def normalize(name):
+    return " ".join(str(name).casefold().split())
+
+def _blob(parts):
+    offsets = array("I", [0])
+    for p in parts:
+        offsets.append(offsets[-1] + len(p))
+    return offsets, b"".join(parts)
+
+def build_index(src, dst):
+    # Offsets are written in native byte order: the index is a local build product.
+    names = {}
+    with open(src, encoding="utf-8") as f:
+        for line in f:
+            line = " ".join(line.split())
+            if line and not line.startswith("#"):
+                names.setdefault(normalize(line), line)
+    keys = sorted(names)   # UTF-8 byte order is code point order, so the bytes bisect too
+    koff, kblob = _blob([k.encode() for k in keys])
+    doff, dblob = _blob([names[k].encode() for k in keys])
+    with open(dst + ".tmp", "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(keys), len(kblob)))
+        f.write(koff.tobytes() + doff.tobytes() + kblob + dblob)
+    os.replace(dst + ".tmp", dst)
+    return len(keys)
+
+class DrugCatalog:
+    # A read-only sequence of key bytes over the mapped index, so bisect runs on it directly.
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.n, ksize = HEADER.unpack_from(self.mm)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a drug catalog index")
+        view, at   = memoryview(self.mm), HEADER.size
+        width      = 4 * (self.n + 1)
+        self.koff  = view[at:at + width].cast("I")
+        self.doff  = view[at + width:at + 2 * width].cast("I")
+        self.kbase = at + 2 * width
+        self.dbase = self.kbase + ksize
+        self._keys = None
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        return self.mm[self.kbase + self.koff[i]:self.kbase + self.koff[i + 1]]
+
+    def name(self, i):
+        return self.mm[self.dbase + self.doff[i]:self.dbase + self.doff[i + 1]].decode()
+
+    def key(self, i):
+        return self[i].decode()
+
+    def span(self, prefix):
+        p  = prefix.encode()
+        lo = bisect_left(self, p)
+        return lo, bisect_left(self, p + b"\xff", lo)   # 0xff never occurs in UTF-8
+
+    def canonical(self, text):
+        # The catalog's spelling of `text` if it is a catalog name, else None.
+        q      = normalize(text)
+        lo, hi = self.span(q)
+        return self.name(lo) if lo < hi and self[lo] == q.encode() else None
+
+    def suggest(self, text, limit=8):
+        q = normalize(text)
+        if not q:
+            return []
+        lo, hi = self.span(q)
+        if lo < hi:
+            return [self.name(i) for i in range(lo, min(hi, lo + limit))]
+        return self.fuzzy(q, limit)
+
+    def fuzzy(self, q, limit=8):
+        if len(q) < 3:
+            return []
+        lo, hi = self.span(q[0])
+        hits   = self._close(q, range(lo, hi), limit)
+        if not hits:   # the first letter may be the typo
+            hits = self._close(q, range(self.n), limit)
+        return [self.name(i) for i in hits]
+
+    def _close(self, q, indices, limit):
+        if indices == range(self.n):
+            self._keys = self._keys or [self.key(i) for i in range(self.n)]
+            keys = self._keys
+        else:
+            keys = {i: self.key(i) for i in indices}
+        heads = {}
+        for i in indices:
+            heads.setdefault(keys[i][:len(q)], []).append(i)
+        out = []
+        for head in difflib.get_close_matches(q, heads, limit, FUZZY_CUTOFF):
+            out.extend(heads[head])
+        return out[:limit]
+
+def index_path(src=CATALOG_PATH):
+    # Next to the text file if it can be written there, else in the temp dir.
+    for path in (os.path.splitext(src)[0] + ".idx",
+                 os.path.join(tempfile.gettempdir(), f"medicare-{os.path.basename(src)}.idx")):
+        try:
+            if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(src):
+                build_index(src, path)
+            return path
+        except OSError:
+            continue
+    raise OSError(f"cannot write a catalog index for {src}")
+
+@st.cache_resource(show_spinner=False)
+def get_catalog():
+    return DrugCatalog(index_path())
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Look names up in the drug catalog, or rebuild its index.")
+    ap.add_argument("text",    nargs="*")
+    ap.add_argument("--build", action="store_true")
+    ap.add_argument("--limit", type=int, default=8)
+    args = ap.parse_args()
+
+    if args.build:
+        dst = os.path.splitext(CATALOG_PATH)[0] + ".idx"
+        print(f"{build_index(CATALOG_PATH, dst):,} names -> {dst}", file=sys.stderr)
+    catalog = DrugCatalog(index_path())
+    for text in args.text:
+        t    = time.perf_counter()
+        hits = catalog.suggest(text, args.limit)
+        print(f"{text!r}: {hits}  ({(time.perf_counter() - t) * 1e6:.0f} µs)")
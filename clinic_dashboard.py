@@ -0,0 +1,100 @@
+import hmac
+import streamlit as st
+import pandas as pd
+from db import scan_table
+
+# ══════════════════════════════════════════════════════════════════════════════
+# CLINIC DASHBOARD — adherence across all patients, served from the
+# adherence_summary view (see sql/adherence_summary.sql)
+#   streamlit run clinic_dashboard.py
+# ══════════════════════════════════════════════════════════════════════════════
+CLINIC_PASSWORD = st.secrets["CLINIC_PASSWORD"]
+
+st.set_page_config(page_title="MediCare Clinic", page_icon="🩺", layout="wide")
+
+# ══════════════════════════════════════════════════════════════════════════════
+# HELPERS
+# ══════════════════════════════════════════════════════════════════════════════
+@st.cache_data(ttl=300, show_spinner="Loading adherence summaries…")
+def load_summary():
+    # Keyset-paginated by email: the view is a GROUP BY with no stable order,
+    # so offset pages could overlap or skip patients.
+    rows = scan_table("adherence_summary", "*", "email", "")
+    df   = pd.DataFrame(rows, columns=["email", "name", "condition", "gp", "taken_7d", "missed_7d",
+                                     "taken_30d", "missed_30d", "last_day"])
+    for col in ["taken_7d", "missed_7d", "taken_30d", "missed_30d"]:
+        df[col] = df[col].fillna(0).astype("int32")
+    for col in ["condition", "gp"]:
+        df[col] = df[col].fillna("—").astype("category")
+    df["doses_7d"]  = df["taken_7d"] + df["missed_7d"]
+    df["rate_7d"]   = (df["taken_7d"]  * 100 / df["doses_7d"].where(df["doses_7d"] > 0)).round(1)
+    df["rate_30d"]  = (df["taken_30d"] * 100 / (df["taken_30d"] + df["missed_30d"]).where(lambda s: s > 0)).round(1)
+    df["last_day"]  = pd.to_datetime(df["last_day"])
+    return df
+
+def worst_adherence(df, n, min_doses):
+    return df[df["doses_7d"] >= min_doses].nsmallest(n, ["rate_7d", "missed_7d"])
+
+# ══════════════════════════════════════════════════════════════════════════════
+# AUTH
+# ══════════════════════════════════════════════════════════════════════════════
+if not st.session_state.get("clinic_ok", False):
+    st.markdown("## 🩺 MediCare Clinic")
+    pw = st.text_input("Clinic password", type="password")
+    if st.button("Enter →", type="primary"):
+        if hmac.compare_digest(pw.encode(), CLINIC_PASSWORD.encode()):
+            st.session_state.clinic_ok = True; st.rerun()
+        else:
+            st.error("❌ Wrong password.")
+    st.stop()
+
+# ══════════════════════════════════════════════════════════════════════════════
+# DASHBOARD
+# ══════════════════════════════════════════════════════════════════════════════
+df = load_summary()
+
+with st.sidebar:
+    st.markdown("## 🩺 Filters")
+    search     = st.text_input("Search name / email")
+    conditions = st.multiselect("Condition", sorted(df["condition"].cat.categories))
+    gps        = st.multiselect("Doctor", sorted(df["gp"].cat.categories))
+    rate_range = st.slider("7-day adherence %", 0, 100, (0, 100))
+    no_data    = st.checkbox("Include patients with no doses logged in 7 days", value=True)
+    if st.button("🔄 Refresh"):
+        load_summary.clear(); st.rerun()
+
+view = df
+if search:
+    s    = search.strip().lower()
+    view = view[view["name"].str.lower().str.contains(s, regex=False, na=False)
+                | view["email"].str.contains(s, regex=False, na=False)]
+if conditions: view = view[view["condition"].isin(conditions)]
+if gps:        view = view[view["gp"].isin(gps)]
+in_range = view["rate_7d"].between(*rate_range)
+view     = view[in_range | view["rate_7d"].isna()] if no_data else view[in_range]
+
+total_doses = int(view["doses_7d"].sum())
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("Patients", len(view))
+c2.metric("Doses logged (7d)", total_doses)
+c3.metric("Adherence (7d)", f"{view['taken_7d'].sum() * 100 / total_doses:.1f}%" if total_doses else "—")
+c4.metric("No logs in 7d", int((view["doses_7d"] == 0).sum()))
+
+st.markdown("### 🚨 Worst adherence — last 7 days")
+w1, w2 = st.columns(2)
+with w1: top_n     = st.number_input("Show", min_value=5, max_value=500, value=20, step=5)
+with w2: min_doses = st.number_input("Min doses logged", min_value=1, max_value=50, value=3)
+st.dataframe(worst_adherence(view, int(top_n), int(min_doses))
+             [["name", "email", "condition", "gp", "taken_7d", "missed_7d", "rate_7d", "last_day"]],
+             use_container_width=True, hide_index=True)
+
+st.markdown("### 📋 All patients")
+sort_cols = {"7-day adherence": "rate_7d", "30-day adherence": "rate_30d",
+             "Missed (7d)": "missed_7d", "Last log": "last_day", "Name": "name"}
+s1, s2 = st.columns(2)
+with s1: sort_by   = st.selectbox("Sort by", list(sort_cols))
+with s2: ascending = st.toggle("Ascending", value=True)
+st.dataframe(view.sort_values(sort_cols[sort_by], ascending=ascending, na_position="last")
+             [["name", "email", "condition", "gp", "rate_7d", "rate_30d",
+               "taken_7d", "missed_7d", "taken_30d", "missed_30d", "last_day"]],
+             use_container_width=True, hide_index=True)
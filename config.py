@@ -0,0 +1,13 @@
+import os
+import streamlit as st
+
+# ══════════════════════════════════════════════════════════════════════════════
+# SETTINGS — optional knobs; environment first, then Streamlit Secrets
+# ══════════════════════════════════════════════════════════════════════════════
+def setting(name, default=None):
+    if name in os.environ:
+        return os.environ[name]
+    try:
+        return st.secrets.get(name, default)
+    except Exception:
+        return default
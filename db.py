@@ -0,0 +1,191 @@
+import streamlit as st
+from datetime import datetime
+from auth import hash_password
+from config import setting
+from escalation import get_escalations
+from models import Contact, HistoryEntry, Medicine, User
+from offline import cached_read, fresh_read, get_cache, remember
+from resilience import BackendUnavailable, WRITE_DEADLINE, guarded_read, guarded_write
+
+# ══════════════════════════════════════════════════════════════════════════════
+# DATA ACCESS — one Supabase client per process, created on first use; the
+# supabase package is only imported once a page actually needs the database.
+# Every call goes through resilience.py: reads are deadline-bounded and hedged
+# and fall back to the last good result; list reads return None (not []) when
+# the backend is down with nothing cached, so callers can tell "empty" from
+# "unknown". db_get_user raises BackendUnavailable for the same reason.
+# Profile, medicines and contacts are also saved on disk by offline.py and
+# served from there first, refreshed in the background.
+# ══════════════════════════════════════════════════════════════════════════════
+@st.cache_resource(show_spinner=False)
+def get_supabase():
+    if setting("MEDICARE_BACKEND") == "stub":
+        from stub_backend import StubClient
+        return StubClient()
+    from supabase import create_client, ClientOptions
+    # The HTTP timeout only reclaims abandoned worker threads; callers are bounded
+    # by the much shorter deadlines in resilience.py.
+    return create_client(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"],
+                         options=ClientOptions(postgrest_client_timeout=WRITE_DEADLINE * 3))
+
+def _one(res):
+    return next(iter(res.data or []), None)
+
+def _project(row, columns):
+    # Written rows come back whole; the saved copy keeps the read's projection.
+    return {k: row[k] for k in columns if k in row}
+
+def db_get_user(email, fresh=False):
+    # Profile only, no password hash. fresh=True (registration) asks the backend
+    # first and only falls back to the saved copy when it is unreachable.
+    read = fresh_read if fresh else cached_read
+    row  = read(("user", email),
+        lambda: _one(get_supabase().table("users").select(User.columns(User.PROFILE)).eq("email", email).execute()))
+    return row and User.from_row(row)
+
+def db_get_credentials(email):
+    # Sign-in and password change: backend only. The hash is never kept in
+    # memory or on disk, so this raises BackendUnavailable while it is down.
+    get_cache().drop(("credentials", email))   # saved by older versions
+    row = guarded_read(None,
+        lambda: _one(get_supabase().table("users").select(User.columns(User.CREDENTIALS)).eq("email", email).execute()),
+        fallback=False)
+    return row and User.from_row(row)
+
+def db_create_user(name, email, phone, age, sex, password, condition, gp):
+    try:
+        guarded_write(lambda: get_supabase().table("users").insert({
+            "name": name, "email": email, "phone": phone,
+            "age": age, "sex": sex, "password": hash_password(password),
+            "condition": condition, "gp": gp
+        }).execute())
+        return True
+    except Exception as e:
+        st.error(f"Error: {e}"); return False
+
+def db_update_user(email, data):
+    try:
+        guarded_write(lambda: get_supabase().table("users").update(data).eq("email", email).execute())
+        remember(("user", email), lambda user: {**user, **_project(data, User.PROFILE)})
+        if "phone" in data:
+            remember(("phone", email), lambda _: split_numbers(data["phone"]))
+        return True
+    except Exception as e:
+        st.error(f"Error: {e}"); return False
+
+def db_get_medicines(email):
+    try:
+        rows = cached_read(("medicines", email),
+            lambda: get_supabase().table("medicines").select(Medicine.columns(Medicine.SCHEDULE))
+                    .eq("user_email", email).execute().data or [])
+        return Medicine.from_rows(rows)
+    except BackendUnavailable: return None
+
+def db_add_medicine(email, name, time_val, session, rule=None, stock=None, dose_qty=1):
+    # stock: units left (None = not tracked); dose_qty: units per dose.
+    try:
+        res = guarded_write(lambda: get_supabase().table("medicines").insert({
+            "user_email": email, "name": name, "time": time_val, "session": session, "rule": rule,
+            "stock": stock, "dose_qty": dose_qty
+        }).execute())
+        remember(("medicines", email), lambda meds: meds + [_project(r, Medicine.SCHEDULE) for r in res.data or []])
+        return True
+    except Exception as e:
+        st.error(f"Error: {e}"); return False
+
+KEEP = object()   # db_update_medicine: leave the column as it is
+
+def db_update_medicine(med_id, name, time_val, session, rule=None, stock=KEEP, dose_qty=KEEP):
+    # Logged doses count stock down on the backend (sql/stock.sql), so pass
+    # stock only when the user set a new count; a re-sent old one undoes them.
+    row = {"name": name, "time": time_val, "session": session, "rule": rule}
+    row.update({k: v for k, v in (("stock", stock), ("dose_qty", dose_qty)) if v is not KEEP})
+    try:
+        res = guarded_write(lambda: get_supabase().table("medicines").update(row).eq("id", med_id).execute())
+        for row in res.data or []:
+            saved = _project(row, Medicine.SCHEDULE)
+            remember(("medicines", row["user_email"]), lambda meds: [saved if m["id"] == med_id else m for m in meds])
+        return True
+    except Exception as e:
+        st.error(f"Error: {e}"); return False
+
+def db_delete_medicine(med_id):
+    try:
+        res = guarded_write(lambda: get_supabase().table("medicines").delete().eq("id", med_id).execute())
+        for row in res.data or []:
+            remember(("medicines", row["user_email"]), lambda meds: [m for m in meds if m["id"] != med_id])
+        return True
+    except Exception as e:
+        st.error(f"Error: {e}"); return False
+
+def split_numbers(phone):
+    return [n.strip() for n in (phone or "").split(",") if n.strip()]
+
+def db_get_contacts(email):
+    try:
+        numbers = cached_read(("phone", email), lambda: split_numbers((_one(
+            get_supabase().table("users").select("phone").eq("email", email).execute()) or {}).get("phone")))
+        return Contact.from_numbers(numbers)
+    except BackendUnavailable: return None
+
+def db_save_family_numbers(email, numbers):
+    try:
+        guarded_write(lambda: get_supabase().table("users").update({"phone": ",".join(numbers)}).eq("email", email).execute())
+        remember(("phone", email), lambda _: list(numbers))
+        remember(("user", email), lambda user: {**user, "phone": ",".join(numbers)})
+        return True
+    except: return False
+
+def db_add_history(email, session, medicines, status, notes):
+    try:
+        guarded_write(lambda: get_supabase().table("history").insert({
+            "user_email": email,
+            "date_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "session": session, "medicines": medicines,
+            "status": status, "notes": notes
+        }).execute())
+        get_escalations().acknowledge(email, session)
+        return True
+    except Exception as e:
+        st.error(f"Error: {e}"); return False
+
+def db_add_history_rows(rows):
+    # Batched, idempotent insert for the dose journal: rows carry a client_id,
+    # so replaying a batch after a timeout skips what already landed. Raises.
+    guarded_write(lambda: get_supabase().table("history")
+                  .upsert(rows, on_conflict="client_id", ignore_duplicates=True).execute())
+
+def db_get_history(email, columns=HistoryEntry.COUNTS):
+    try:
+        return HistoryEntry.from_rows(guarded_read(("history", email, columns),
+            lambda: get_supabase().table("history").select(HistoryEntry.columns(columns))
+                    .eq("user_email", email).execute().data or []))
+    except BackendUnavailable: return None
+
+def db_get_history_range(email, start, end, columns=HistoryEntry.DISPLAY):
+    try:
+        return HistoryEntry.from_rows(guarded_read(("history", email, start, end, columns),
+            lambda: get_supabase().table("history").select(HistoryEntry.columns(columns)).eq("user_email", email)
+                    .gte("date_time", start).lte("date_time", end).execute().data or []))
+    except BackendUnavailable: return None
+
+def db_clear_history(email):
+    try:
+        guarded_write(lambda: get_supabase().table("history").delete().eq("user_email", email).execute())
+        return True
+    except: return False
+
+# ══════════════════════════════════════════════════════════════════════════════
+# BATCH SCANS — whole tables for operator jobs and the clinic dashboard,
+# keyset-paginated in `key` order, without the per-user caches above
+# ══════════════════════════════════════════════════════════════════════════════
+SCAN_PAGE = 1000   # PostgREST caps a single response at 1000 rows
+
+def scan_table(table, columns, key, after, where=lambda q: q):
+    rows = []
+    while True:
+        page = (where(get_supabase().table(table).select(columns)).gt(key, after)
+                .order(key).limit(SCAN_PAGE).execute().data or [])
+        rows.extend(page)
+        if len(page) < SCAN_PAGE: return rows
+        after = page[-1][key]
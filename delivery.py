@@ -0,0 +1,175 @@
+import argparse
+import base64
+import hashlib
+import hmac
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+import streamlit as st
+
+from config import setting
+from db import get_supabase
+from resilience import BackendUnavailable, guarded_read
+
+# ══════════════════════════════════════════════════════════════════════════════
+# DELIVERY STATUS — receives Twilio status callbacks, coalesces them in memory
+# and bulk-applies them to message_status (see sql/delivery_status.sql)
+#   python delivery.py --port 8080
+# Point TWILIO_STATUS_CALLBACK at the public URL of this receiver. WhatsApp
+# messages that fail because the number can't get WhatsApp are re-sent by SMS
+# when TWILIO_SMS_FROM is set (dispatch.SmsFallback). For a local
+# stand-in run with --no-verify and post form data, e.g.
+#   curl -d MessageSid=SM1 -d MessageStatus=delivered -d To=whatsapp:+91... \
+#        http://localhost:8080/twilio/status
+# ══════════════════════════════════════════════════════════════════════════════
+STATUS_CALLBACK   = setting("TWILIO_STATUS_CALLBACK")
+DEAD_MIN_ATTEMPTS = int(setting("DEAD_NUMBER_MIN_ATTEMPTS", 5))
+DEAD_MAX_RATE     = float(setting("DEAD_NUMBER_MAX_RATE", 0.2))
+STATS_CHUNK       = 100   # numbers per stats query, keeping the URL and the cache key small
+STATUS_RANK       = {"accepted": 0, "queued": 1, "sending": 2, "sent": 3, "delivered": 4,
+                     "read": 5, "undelivered": 6, "failed": 6}
+
+def bare_number(to):
+    return to[len("whatsapp:"):] if to.startswith("whatsapp:") else to
+
+def valid_signature(url, params, signature, token):
+    payload = url + "".join(k + v for k, v in sorted(params.items()))
+    digest  = hmac.new(token.encode(), payload.encode(), hashlib.sha1).digest()
+    return hmac.compare_digest(base64.b64encode(digest).decode(), signature or "")
+
+def record_sent(messages):
+    # messages: [(sid, to, status)] straight after messages.create
+    if not messages: return
+    try:
+        get_supabase().rpc("apply_message_statuses", {"updates": [
+            {"sid": sid, "to_number": bare_number(to), "status": status or "queued"}
+            for sid, to, status in messages
+        ]}).execute()
+    except Exception:
+        pass   # bookkeeping only; never fail a send over it
+
+@st.cache_data(ttl=600, show_spinner=False)
+def delivery_stats(numbers):
+    try:
+        rows = guarded_read(("delivery", None, numbers),
+            lambda: get_supabase().table("contact_delivery_stats").select("*")
+                    .in_("to_number", [bare_number(n) for n in numbers]).execute().data or [])
+        return {r["to_number"]: r for r in rows}
+    except BackendUnavailable:
+        return {}
+
+def delivery_rate(stat):
+    return stat["delivered"] / stat["attempts"] if stat and stat["attempts"] else None
+
+def dead_numbers(numbers):
+    # Without status callbacks nothing ever reaches a final status, so there is
+    # no evidence either way; never call a number dead then.
+    if not STATUS_CALLBACK:
+        return set()
+    stats, keys = {}, sorted(set(numbers))
+    for i in range(0, len(keys), STATS_CHUNK):
+        stats.update(delivery_stats(tuple(keys[i:i + STATS_CHUNK])))
+    return {n for n in numbers
+            if (s := stats.get(bare_number(n))) and s["attempts"] >= DEAD_MIN_ATTEMPTS
+            and delivery_rate(s) < DEAD_MAX_RATE}
+
+# ══════════════════════════════════════════════════════════════════════════════
+# CALLBACK RECEIVER
+# ══════════════════════════════════════════════════════════════════════════════
+class StatusBuffer:
+    # Keeps only the most advanced status per SID between flushes, so a burst of
+    # sent/delivered/read callbacks becomes one row per message.
+    def __init__(self, apply, max_items=500, max_age=2.0):
+        self.apply     = apply
+        self.max_items = max_items
+        self.max_age   = max_age
+        self.pending   = {}
+        self.lock      = threading.Lock()
+        self.wake      = threading.Event()
+        self.flushed   = 0
+
+    def add(self, sid, to, status, error_code=None):
+        with self.lock:
+            cur = self.pending.get(sid)
+            if cur is None or STATUS_RANK.get(status, 0) >= STATUS_RANK.get(cur["status"], 0):
+                self.pending[sid] = {"sid": sid, "to_number": bare_number(to),
+                                     "status": status, "error_code": error_code}
+            if len(self.pending) >= self.max_items:
+                self.wake.set()
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, {}
+        if not batch: return 0
+        try:
+            self.apply(list(batch.values()))
+            self.flushed += len(batch)
+            return len(batch)
+        except Exception:
+            for sid, row in batch.items():   # put back anything newer didn't replace
+                self.add(sid, row["to_number"], row["status"], row["error_code"])
+            return 0
+
+    def run(self, stop):
+        while not stop.is_set():
+            self.wake.wait(self.max_age)
+            self.wake.clear()
+            self.flush()
+        self.flush()
+
+def apply_statuses(rows):
+    get_supabase().rpc("apply_message_statuses", {"updates": rows}).execute()
+
+def make_handler(buffer, verify=True, token=None, public_url=None, on_status=None):
+    class StatusHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path.split("?")[0] != "/twilio/status":
+                self.send_response(404); self.end_headers(); return
+            body   = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+            params = dict(parse_qsl(body, keep_blank_values=True))
+            if verify and not valid_signature(public_url, params,
+                                              self.headers.get("X-Twilio-Signature"), token):
+                self.send_response(403); self.end_headers(); return
+            if params.get("MessageSid") and params.get("MessageStatus"):
+                buffer.add(params["MessageSid"], params.get("To", ""),
+                           params["MessageStatus"], params.get("ErrorCode"))
+                if on_status:
+                    on_status(params["MessageSid"], params.get("To", ""),
+                              params["MessageStatus"], params.get("ErrorCode"))
+            self.send_response(204); self.end_headers()
+
+        def log_message(self, *args):
+            pass
+    return StatusHandler
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Receive Twilio delivery-status callbacks.")
+    ap.add_argument("--host",      default="0.0.0.0")
+    ap.add_argument("--port",      type=int,   default=8080)
+    ap.add_argument("--batch",     type=int,   default=500, help="flush after this many distinct messages")
+    ap.add_argument("--interval",  type=float, default=2.0, help="flush at least this often (seconds)")
+    ap.add_argument("--no-verify", action="store_true", help="skip X-Twilio-Signature checks (local testing)")
+    args = ap.parse_args()
+    if not args.no_verify and not (STATUS_CALLBACK and setting("TWILIO_TOKEN")):
+        raise SystemExit("Signature checks need TWILIO_STATUS_CALLBACK (the public URL Twilio signs) and "
+                         "TWILIO_TOKEN; set both, or pass --no-verify for local testing.")
+
+    buffer = StatusBuffer(apply_statuses, args.batch, args.interval)
+    stop   = threading.Event()
+    worker = threading.Thread(target=buffer.run, args=(stop,), daemon=True)
+    worker.start()
+    from dispatch import Dispatcher, SmsFallback, configured_channels   # dispatch imports this module
+    handler = make_handler(buffer, verify=not args.no_verify, token=setting("TWILIO_TOKEN"),
+                           public_url=STATUS_CALLBACK, on_status=SmsFallback(Dispatcher(configured_channels())))
+    server  = ThreadingHTTPServer((args.host, args.port), handler)
+    print(f"Listening on http://{args.host}:{args.port}/twilio/status")
+    t0 = time.time()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set(); buffer.wake.set(); worker.join()
+        print(f"Applied {buffer.flushed} status update(s) in {time.time() - t0:.0f}s")
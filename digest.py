@@ -0,0 +1,103 @@
+import argparse
+import json
+import sys
+import time
+from datetime import date
+
+import pandas as pd
+
+from db import scan_table
+from dispatch import Dispatcher, configured_channels
+from outbox import queue, send_queued
+from schedule import compile_rule
+
+# ══════════════════════════════════════════════════════════════════════════════
+# END-OF-DAY DIGEST — nightly job telling each family contact how the patient's
+# day went ("took 3/4 doses, missed Night"). The whole day is read in three
+# paged scans (users, medicines, that day's history) and joined in pandas:
+# scheduled (patient, session, medicine) slots, each with its dose count for
+# the day (several for every_hours), left-joined against counts of Taken
+# history rows, grouped per patient, crossed with their family numbers.
+# Schedule rules are evaluated once per distinct (time, rule), not per medicine.
+# Digests go to the outbox (outbox.py) and are sent by --send:
+#   python digest.py                      # queue today's digests
+#   python digest.py --day 2024-03-01 --send
+# ══════════════════════════════════════════════════════════════════════════════
+KIND = "digest"
+
+def load_day(day):
+    users = scan_table("users", "email,name,phone", "email", "")
+    meds  = scan_table("medicines", "id,user_email,name,time,session,rule", "id", 0)
+    hist  = scan_table("history", "id,user_email,session,medicines,status", "id", 0,
+                       lambda q: q.gte("date_time", f"{day} 00:00:00").lte("date_time", f"{day} 23:59:59"))
+    return users, meds, hist
+
+def _doses(day):
+    def count(key):
+        hm, rule = key
+        try:
+            return compile_rule({"time": hm, "rule": rule or None}).count_on(day)
+        except (ValueError, TypeError):
+            return 0   # a malformed row is reported nowhere rather than stopping the run
+    return count
+
+def build_digests(users, meds, hist, day):
+    # DataFrame of (user_email, to_number, body): one row per family contact of
+    # every patient with something scheduled on `day`.
+    meds = pd.DataFrame(meds, columns=["id", "user_email", "name", "time", "session", "rule"])
+    hist = pd.DataFrame(hist, columns=["id", "user_email", "session", "medicines", "status"])
+    if meds.empty:
+        return pd.DataFrame(columns=["user_email", "to_number", "body"])
+
+    meds["key"] = list(zip(meds["time"].astype(str),
+                           meds["rule"].map(lambda r: json.dumps(r, sort_keys=True) if isinstance(r, dict) else r or "")))
+    keys  = meds["key"].drop_duplicates()
+    meds["doses"] = meds["key"].map(dict(zip(keys, keys.map(_doses(day)))))
+    slots = (meds[meds["doses"] > 0].sort_values("time")
+             .groupby(["user_email", "session", "name"], sort=False)["doses"].max().reset_index())
+
+    # One Taken row per dose logged; a slot counts at most its scheduled doses.
+    taken = hist[hist["status"] == "Taken"].assign(name=lambda h: h["medicines"].fillna("").str.split(", "))
+    taken = (taken.explode("name")[["id", "user_email", "session", "name"]].drop_duplicates()
+             .groupby(["user_email", "session", "name"]).size().rename("taken").reset_index())
+    slots = slots.merge(taken, how="left", on=["user_email", "session", "name"])
+    slots["took"] = slots["taken"].fillna(0).clip(upper=slots["doses"]).astype(int)
+
+    summary = slots.groupby("user_email", sort=False).agg(total=("doses", "sum"), took=("took", "sum"))
+    missed  = (slots[slots["took"] < slots["doses"]].drop_duplicates(["user_email", "session"])
+               .groupby("user_email", sort=False)["session"].agg(", ".join))
+    summary = summary.join(missed.rename("missed")).reset_index()
+
+    people  = pd.DataFrame(users, columns=["email", "name", "phone"]).rename(columns={"email": "user_email"})
+    people["to_number"] = people["phone"].fillna("").str.split(",")
+    contacts = people.explode("to_number")
+    contacts["to_number"] = contacts["to_number"].str.strip()
+    contacts = contacts[(contacts.groupby(level=0).cumcount() > 0) & (contacts["to_number"] != "")]   # first = patient
+
+    out = summary.merge(contacts[["user_email", "name", "to_number"]], on="user_email")
+    out["body"] = (f"📋 Daily update, {day:%a %d %b}\n" + out["name"].fillna("Your family member")
+                   + " took " + out["took"].astype(str) + "/" + out["total"].astype(str) + " doses"
+                   + out["missed"].map(lambda m: f", missed {m}" if isinstance(m, str) else "") + ".")
+    return out[["user_email", "to_number", "body"]].reset_index(drop=True)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Queue (and optionally send) end-of-day adherence digests.")
+    ap.add_argument("--day",          type=date.fromisoformat, default=date.today())
+    ap.add_argument("--send",         action="store_true", help="also send every queued digest for the day")
+    ap.add_argument("--include-dead", action="store_true", help="also send to numbers that stopped receiving")
+    args = ap.parse_args()
+
+    t = time.perf_counter()
+    users, meds, hist = load_day(args.day)
+    print(f"read {len(users):,} users, {len(meds):,} medicines, {len(hist):,} history rows "
+          f"in {time.perf_counter() - t:.1f}s", file=sys.stderr)
+    t = time.perf_counter()
+    digests = build_digests(users, meds, hist, args.day)
+    queued  = queue(KIND, args.day, digests.itertuples(index=False))
+    print(f"built {len(digests):,} digests for {digests['user_email'].nunique():,} patients "
+          f"in {time.perf_counter() - t:.1f}s; queued {queued:,}", file=sys.stderr)
+    if args.send:
+        dispatcher = Dispatcher(configured_channels())
+        totals     = send_queued(dispatcher, KIND, args.day, not args.include_dead)
+        dispatcher.close()
+        print(f"sent {totals['sent']:,}  failed {totals['failed']:,}  dead {totals['dead']:,}", file=sys.stderr)
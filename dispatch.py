@@ -0,0 +1,343 @@
+import argparse
+import re
+import smtplib
+import socketserver
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from email.message import EmailMessage
+
+import streamlit as st
+
+from config import setting
+from delivery import STATUS_CALLBACK, dead_numbers, record_sent
+from ratelimit import TokenBucket
+
+# ══════════════════════════════════════════════════════════════════════════════
+# DISPATCH — sends a message to contacts over WhatsApp, SMS or email. A contact
+# is an address with an optional channel prefix, which sets the channel tried
+# first:
+#   +919876543210            WhatsApp, then SMS
+#   sms:+919876543210        SMS, then WhatsApp
+#   ann@example.com          email (mailto: works too)
+# Each channel has its own worker pool and token bucket, so a slow provider
+# only slows its own queue. When a send fails, the message moves to the
+# contact's next channel. The same happens when WhatsApp has stopped
+# delivering to a number (delivery.dead_numbers). Some WhatsApp failures only
+# show up later: Twilio accepts a message to a number that never joined the
+# sandbox as "queued" and fails it afterwards (error 63015). The status
+# receiver in delivery.py re-sends those by SMS (SmsFallback below); without
+# it they are retried over WhatsApp until the number counts as dead.
+# A channel is switched on by configuring its sender:
+# TWILIO_WHATSAPP_FROM (defaults to the sandbox), TWILIO_SMS_FROM, and
+# SMTP_HOST / SMTP_PORT / SMTP_FROM (SMTP_USER and SMTP_PASSWORD log in over
+# STARTTLS). Rates are per second and workers are per channel:
+# WHATSAPP_RATE, SMS_RATE, EMAIL_RATE, WHATSAPP_WORKERS, ...
+#   python dispatch.py --smtp-sink --port 1025      # local stand-in; prints mail
+#   SMTP_HOST=localhost SMTP_PORT=1025 python dispatch.py ann@example.com +9198... -m "Test"
+# ══════════════════════════════════════════════════════════════════════════════
+PHONE_ROUTE = ("whatsapp", "sms")
+EMAIL_ROUTE = ("email",)
+PREFIXES    = {"whatsapp": "whatsapp", "sms": "sms", "mailto": "email", "email": "email"}
+DEFAULTS    = {"whatsapp": (10, 8), "sms": (1, 4), "email": (5, 4)}   # rate/s, workers
+
+_EMAIL = re.compile(r"[^@\s,]+@[^@\s,]+\.[^@\s,]+")
+
+class DeliveryFailed(Exception):
+    pass
+
+def parse_address(address):
+    # -> (preferred channel or None, bare address)
+    address = address.strip()
+    prefix, _, rest = address.partition(":")
+    if rest and prefix.lower() in PREFIXES:
+        return PREFIXES[prefix.lower()], rest.strip()
+    return None, address
+
+def valid_address(address):
+    _, bare = parse_address(address)
+    if "@" in bare:
+        return bool(_EMAIL.fullmatch(bare))
+    return bare.startswith("+") and bare[1:].replace(" ", "").replace("-", "").isdigit()
+
+def is_email(address):
+    return "@" in parse_address(address)[1]
+
+def unreachable(addresses):
+    # Addresses whose number WhatsApp has stopped delivering to.
+    bare   = {a: parse_address(a)[1] for a in addresses}
+    phones = tuple({b for b in bare.values() if "@" not in b})
+    dead   = dead_numbers(phones) if phones else set()
+    return {a for a, b in bare.items() if b in dead}
+
+# ══════════════════════════════════════════════════════════════════════════════
+# CHANNELS — send(address, body) -> (sid or None, to, status)
+# ══════════════════════════════════════════════════════════════════════════════
+class Channel(ABC):
+    name = ""
+
+    def __init__(self, rate=None, workers=None):
+        rate, workers = (float(setting(f"{self.name.upper()}_RATE", DEFAULTS[self.name][0])) if rate is None else rate,
+                         int(setting(f"{self.name.upper()}_WORKERS", DEFAULTS[self.name][1])) if workers is None else workers)
+        self.bucket = TokenBucket(rate) if rate > 0 else None
+        self.pool   = ThreadPoolExecutor(workers, thread_name_prefix=f"dispatch-{self.name}")
+
+    def deliver(self, address, body):
+        if self.bucket: self.bucket.acquire()
+        return self.send(address, body)
+
+    @abstractmethod
+    def send(self, address, body):
+        ...
+
+class TwilioChannel(Channel):
+    def __init__(self, name, sender, prefix="", status_callback=None, rate=None, workers=None):
+        self.name   = name
+        self.sender = sender
+        self.prefix = prefix
+        self.extra  = {"status_callback": status_callback} if status_callback else {}
+        super().__init__(rate, workers)
+
+    def send(self, address, body):
+        from notify import get_twilio
+        to  = f"{self.prefix}{address}"
+        msg = get_twilio().messages.create(to=to, from_=self.sender, body=body, **self.extra)
+        return msg.sid, to, msg.status
+
+class EmailChannel(Channel):
+    # One SMTP connection per worker thread, reopened if the server drops it.
+    name = "email"
+
+    def __init__(self, host, port=587, sender=None, user=None, password=None, rate=None, workers=None):
+        self.host, self.port     = host, int(port)
+        self.sender              = sender or user or "medicare@localhost"
+        self.user, self.password = user, password
+        self.local               = threading.local()
+        super().__init__(rate, workers)
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.user:
+            smtp.starttls()
+            smtp.login(self.user, self.password or "")
+        self.local.smtp = smtp
+        return smtp
+
+    def send(self, address, body):
+        msg            = EmailMessage()
+        msg["From"]    = self.sender
+        msg["To"]      = address
+        msg["Subject"] = body.strip().splitlines()[0][:78] if body.strip() else "MediCare"
+        msg.set_content(body)
+        smtp = getattr(self.local, "smtp", None) or self._connect()
+        try:
+            smtp.send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            self._connect().send_message(msg)
+        return None, f"mailto:{address}", "sent"
+
+def configured_channels():
+    channels = [TwilioChannel("whatsapp", "whatsapp:" + parse_address(
+                    setting("TWILIO_WHATSAPP_FROM", "+14155238886"))[1], "whatsapp:", STATUS_CALLBACK)]
+    if setting("TWILIO_SMS_FROM"):
+        channels.append(TwilioChannel("sms", setting("TWILIO_SMS_FROM")))
+    if setting("SMTP_HOST"):
+        channels.append(EmailChannel(setting("SMTP_HOST"), setting("SMTP_PORT", 587), setting("SMTP_FROM"),
+                                     setting("SMTP_USER"), setting("SMTP_PASSWORD")))
+    return channels
+
+# ══════════════════════════════════════════════════════════════════════════════
+# DISPATCHER
+# ══════════════════════════════════════════════════════════════════════════════
+class Dispatcher:
+    def __init__(self, channels):
+        self.channels = {c.name: c for c in channels}
+
+    def route(self, address, skip=()):
+        # -> (bare address, channels to try in order)
+        preferred, bare = parse_address(address)
+        kinds = EMAIL_ROUTE if "@" in bare else PHONE_ROUTE
+        order = ([preferred] if preferred in kinds else []) + [k for k in kinds if k != preferred]
+        return bare, [self.channels[k] for k in order if k in self.channels and k not in skip]
+
+    def deliver(self, address, body, skip=()):
+        # In the calling thread: (channel name, result) from the first channel that takes it.
+        bare, route = self.route(address, skip)
+        errors      = []
+        for ch in route:
+            try:
+                return ch.name, ch.deliver(bare, body)
+            except Exception as e:
+                errors.append(f"{ch.name}: {e}")
+        raise DeliveryFailed("; ".join(errors) or f"no channel for {address}")
+
+    def submit(self, address, body, skip=()):
+        # On the channel pools: a Future of (channel name, result), or DeliveryFailed.
+        bare, route = self.route(address, skip)
+        done        = Future()
+        self._next(done, bare, body, route, [])
+        return done
+
+    def _next(self, done, bare, body, route, errors):
+        if not route:
+            done.set_exception(DeliveryFailed("; ".join(errors) or f"no channel for {bare}"))
+            return
+        ch = route[0]
+        def after(f):
+            if f.exception() is None:
+                done.set_result((ch.name, f.result()))
+            else:
+                self._next(done, bare, body, route[1:], errors + [f"{ch.name}: {f.exception()}"])
+        ch.pool.submit(ch.deliver, bare, body).add_done_callback(after)
+
+    def send(self, body, addresses, skip_dead=True):
+        # One message to many contacts; waits for all of them.
+        # -> {"sent": {channel: n}, "failed": [(address, error)], "dead": [address]}
+        dead    = unreachable(addresses) if skip_dead else set()
+        skipped = [a for a in addresses if a in dead and not self.route(a, ("whatsapp",))[1]]
+        futures = {a: self.submit(a, body, ("whatsapp",) if a in dead else ())
+                   for a in dict.fromkeys(addresses) if a not in skipped}
+        out     = {"sent": {}, "failed": [], "dead": skipped}
+        results = []
+        for address, f in futures.items():
+            try:
+                channel, result = f.result()
+                out["sent"][channel] = out["sent"].get(channel, 0) + 1
+                results.append((channel, result))
+            except DeliveryFailed as e:
+                out["failed"].append((address, str(e)))
+        record(results)
+        return out
+
+    def close(self):
+        for ch in self.channels.values():
+            ch.pool.shutdown(wait=True)
+
+def record(results):
+    # Only WhatsApp sends go into message_status: the dead-number check is about
+    # WhatsApp reachability, and a failing number should still get its SMS.
+    record_sent([r for channel, r in results if channel == "whatsapp" and r and r[0]])
+
+@st.cache_resource(show_spinner=False)
+def get_dispatcher():
+    return Dispatcher(configured_channels())
+
+# ══════════════════════════════════════════════════════════════════════════════
+# LATE WHATSAPP FAILURES — called by the delivery.py receiver for every status
+# callback. A WhatsApp message that failed because the number can't get
+# WhatsApp from this sender (not on WhatsApp, not joined to the sandbox, outside
+# the 24-hour session window) is sent again by SMS, once. The body is fetched
+# back from Twilio by SID, since the receiver never saw it.
+# ══════════════════════════════════════════════════════════════════════════════
+NOT_ON_WHATSAPP = {"63003", "63015", "63016"}
+
+def fetch_body(sid):
+    from notify import get_twilio
+    return get_twilio().messages(sid).fetch().body
+
+class SmsFallback:
+    def __init__(self, dispatcher, fetch=fetch_body, workers=2):
+        self.dispatcher = dispatcher
+        self.fetch      = fetch
+        self.pool       = ThreadPoolExecutor(workers, thread_name_prefix="sms-fallback")
+        self.done       = set()   # SIDs already re-sent; Twilio may repeat a callback
+        self.lock       = threading.Lock()
+
+    def __call__(self, sid, to, status, error_code=None):
+        if status not in ("undelivered", "failed") or str(error_code) not in NOT_ON_WHATSAPP:
+            return None
+        preferred, bare = parse_address(to)
+        if preferred != "whatsapp" or not self.dispatcher.route(bare, ("whatsapp",))[1]:
+            return None
+        with self.lock:
+            if sid in self.done: return None
+            if len(self.done) > 100_000: self.done.clear()
+            self.done.add(sid)
+        return self.pool.submit(self._resend, sid, bare)
+
+    def _resend(self, sid, bare):
+        # -> (channel name, result); raises DeliveryFailed like Dispatcher.deliver.
+        return self.dispatcher.deliver(bare, self.fetch(sid), ("whatsapp",))
+
+# ══════════════════════════════════════════════════════════════════════════════
+# LOCAL SMTP STAND-IN — accepts every message and keeps it in memory (and
+# prints it with --smtp-sink), so the email channel can be exercised without
+# a mail provider. Speaks just enough SMTP for smtplib.
+# ══════════════════════════════════════════════════════════════════════════════
+class SmtpSink(socketserver.ThreadingTCPServer):
+    daemon_threads      = True
+    allow_reuse_address = True
+
+    def __init__(self, host="localhost", port=1025, echo=False):
+        self.messages = []   # (mail from, [rcpt to], raw message)
+        self.echo     = echo
+        self.lock     = threading.Lock()
+        super().__init__((host, port), _SmtpHandler)
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        sink, sender, rcpts = self.server, None, []
+        self.reply("220 medicare-sink ready")
+        for raw in self.rfile:
+            cmd = raw.decode(errors="replace").strip()
+            verb = cmd[:4].upper()
+            if verb in ("HELO", "EHLO"):
+                self.reply("250 medicare-sink")
+            elif verb == "MAIL":
+                sender, rcpts = cmd.partition(":")[2].strip(" <>"), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                rcpts.append(cmd.partition(":")[2].strip(" <>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                for line in self.rfile:
+                    if line.rstrip(b"\r\n") == b".": break
+                    lines.append(line[1:] if line.startswith(b"..") else line)
+                with sink.lock:
+                    sink.messages.append((sender, rcpts, b"".join(lines).decode(errors="replace")))
+                if sink.echo:
+                    print(f"── {sender} → {', '.join(rcpts)}\n{b''.join(lines).decode(errors='replace')}", flush=True)
+                self.reply("250 OK queued")
+            elif verb in ("RSET", "NOOP"):
+                sender, rcpts = (None, []) if verb == "RSET" else (sender, rcpts)
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Send a message to contacts, or run a local SMTP stand-in.")
+    ap.add_argument("addresses",    nargs="*", help="numbers or email addresses, optionally sms:/whatsapp:/mailto:")
+    ap.add_argument("-m", "--message")
+    ap.add_argument("--smtp-sink",  action="store_true", help="run the local SMTP stand-in instead")
+    ap.add_argument("--host",       default="localhost")
+    ap.add_argument("--port",       type=int, default=1025)
+    args = ap.parse_args()
+
+    if args.smtp_sink:
+        sink = SmtpSink(args.host, args.port, echo=True)
+        print(f"SMTP stand-in on {args.host}:{args.port}", file=sys.stderr)
+        try:
+            sink.serve_forever()
+        except KeyboardInterrupt:
+            print(f"received {len(sink.messages)} message(s)", file=sys.stderr)
+        sys.exit(0)
+    if not args.addresses or not args.message:
+        ap.error("give addresses and --message, or --smtp-sink")
+    dispatcher = Dispatcher(configured_channels())
+    print(f"channels: {', '.join(dispatcher.channels)}", file=sys.stderr)
+    t   = time.perf_counter()
+    out = dispatcher.send(args.message, args.addresses)
+    dispatcher.close()
+    print(f"sent {out['sent']}  dead {out['dead']}  in {time.perf_counter() - t:.2f}s", file=sys.stderr)
+    for address, error in out["failed"]:
+        print(f"failed {address}: {error}", file=sys.stderr)
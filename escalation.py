@@ -0,0 +1,127 @@
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime
+
+from config import setting
+from schedule import from_minute, to_minute
+
+# ══════════════════════════════════════════════════════════════════════════════
+# ESCALATION — when a reminder goes unanswered, re-remind the patient after
+# ESCALATE_REMIND_AFTER minutes and tell the family after ESCALATE_FAMILY_AFTER
+# (either may be 0 to switch that step off). Recording the dose through
+# db_add_history cancels the pending step.
+# One pending timer per (email, session) lives in a timing wheel of one-minute
+# slots: arming and cancelling are dict operations, a cancelled timer is gone
+# rather than left as a tombstone, and each minute's tick only touches that
+# minute's slot, so millions of pending doses stay cheap.
+# ══════════════════════════════════════════════════════════════════════════════
+REMIND_AFTER = int(setting("ESCALATE_REMIND_AFTER", 15))
+FAMILY_AFTER = int(setting("ESCALATE_FAMILY_AFTER", 45))
+REMIND, FAMILY = "remind", "family"
+
+class TimingWheel:
+    # Timers due within `slots` minutes sit in the slot for their minute; later
+    # ones wait on an overflow heap until they come within range.
+    def __init__(self, slots=1440, now=0):
+        self.slots    = [{} for _ in range(slots)]
+        self.where    = {}          # key -> due minute of its live timer
+        self.overflow = []
+        self.seq      = itertools.count()
+        self.now      = now
+
+    def add(self, key, due, value):
+        self.cancel(key)
+        due = self.where[key] = max(due, self.now)
+        if due - self.now < len(self.slots):
+            self.slots[due % len(self.slots)][key] = value
+        else:
+            heapq.heappush(self.overflow, (due, next(self.seq), key, value))
+
+    def cancel(self, key):
+        due = self.where.pop(key, None)
+        if due is not None:   # overflow entries are skipped lazily once `where` forgets them
+            self.slots[due % len(self.slots)].pop(key, None)
+        return due is not None
+
+    def advance(self, now):
+        # Fires every timer due at or before `now`, oldest minute first.
+        fired = []
+        while self.now <= now:
+            while self.overflow and self.overflow[0][0] - self.now < len(self.slots):
+                due, _, key, value = heapq.heappop(self.overflow)
+                if self.where.get(key) == due:   # a later re-add for the same minute pops after this one
+                    self.slots[due % len(self.slots)][key] = value
+            bucket = self.slots[self.now % len(self.slots)]
+            if bucket:
+                for key, value in bucket.items():
+                    del self.where[key]
+                    fired.append((key, value))
+                bucket.clear()
+            self.now += 1
+        return fired
+
+    def __len__(self):
+        return len(self.where)
+
+class Escalations:
+    def __init__(self, remind_after=REMIND_AFTER, family_after=FAMILY_AFTER, now=None):
+        self.remind_after = remind_after
+        self.family_after = family_after
+        self.wheel        = TimingWheel(now=to_minute(now or datetime.now()))
+        self.lock         = threading.Lock()
+
+    def arm(self, email, session, now, names):
+        sent = to_minute(now)
+        if self.remind_after:
+            stage, due = REMIND, sent + self.remind_after
+        elif self.family_after:
+            stage, due = FAMILY, sent + self.family_after
+        else:
+            return
+        with self.lock:
+            self.wheel.add((email, session), due, (stage, sent, tuple(names)))
+
+    def acknowledge(self, email, session):
+        with self.lock:
+            return self.wheel.cancel((email, session))
+
+    def due(self, now):
+        # [(email, session, stage, reminded_at, names)]; a fired re-remind is
+        # replaced by the family step, still cancellable by logging the dose.
+        with self.lock:
+            fired = self.wheel.advance(to_minute(now))
+            out   = []
+            for (email, session), (stage, sent, names) in fired:
+                if stage == REMIND and self.family_after > self.remind_after:
+                    self.wheel.add((email, session), sent + self.family_after, (FAMILY, sent, names))
+                out.append((email, session, stage, from_minute(sent), names))
+            return out
+
+    def __len__(self):
+        return len(self.wheel)
+
+def escalation_message(stage, user_name, session, names, reminded_at):
+    if stage == REMIND:
+        return (f"⏰ STILL DUE\nHi {user_name}, your {session} medicines ({', '.join(names)}) "
+                f"from {reminded_at:%H:%M} haven't been marked as taken yet.")
+    return (f"⚠️ MISSED DOSE ALERT\n{user_name} hasn't confirmed their {session} medicines "
+            f"({', '.join(names)}) due at {reminded_at:%H:%M}. Please check in with them.")
+
+def run_escalations(escalations, send, is_active=lambda: True,
+                    clock=datetime.now, sleep=time.sleep, interval=30):
+    while is_active():
+        for email, session, stage, reminded_at, names in escalations.due(clock()):
+            try:
+                send(email, session, stage, reminded_at, names)
+            except Exception:
+                pass   # one failed alert must not stop everyone else's
+        sleep(interval)
+
+# Process-wide instance, shared by every session's reminder thread and by
+# db_add_history for cancellation.
+_escalations = Escalations()
+
+def get_escalations():
+    return _escalations
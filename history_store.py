@@ -0,0 +1,85 @@
+import io
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+# ══════════════════════════════════════════════════════════════════════════════
+# HISTORY STORE — a user's history as one Arrow table instead of pandas
+# copies. session / status / medicines / notes repeat a handful of values, so
+# they are dictionary-encoded: each row holds a small integer and the strings
+# are stored once. Filters compare those integers and only gather index
+# arrays, sharing the dictionaries; with no filter the same table goes to
+# st.dataframe and the CSV export untouched.
+# ══════════════════════════════════════════════════════════════════════════════
+DISPLAY_COLS = ["date_time", "session", "medicines", "status", "notes"]
+LABELS       = pa.dictionary(pa.int32(), pa.string())
+SCHEMA       = pa.schema([
+    ("id", pa.int64()), ("client_id", pa.string()), ("date_time", pa.string()),
+    ("session", LABELS), ("medicines", LABELS), ("status", LABELS), ("notes", LABELS),
+])
+
+def _encode(table):
+    # Conform any history-shaped table (backend rows, Parquet archive) to SCHEMA.
+    cols = []
+    for field in SCHEMA:
+        if field.name not in table.column_names:
+            cols.append(pa.nulls(table.num_rows, field.type)); continue
+        col = table.column(field.name)
+        if pa.types.is_dictionary(field.type) and not pa.types.is_dictionary(col.type):
+            col = pc.dictionary_encode(col.cast(pa.string()))
+        cols.append(col.cast(field.type))
+    return pa.Table.from_arrays(cols, schema=SCHEMA)
+
+def from_rows(rows):
+    names = SCHEMA.names
+    return _encode(pa.Table.from_pydict({n: [r.get(n) for r in rows] for n in names},
+                                        schema=pa.schema([(n, pa.string() if n != "id" else pa.int64())
+                                                          for n in names])))
+
+def combine(live, archived=None):
+    # Live rows win over archived copies of the same id (a crash mid-archive
+    # leaves both); result is sorted by date_time.
+    tables = [live]
+    if archived is not None and archived.num_rows:
+        archived = _encode(archived)
+        if live.num_rows:
+            archived = archived.filter(pc.invert(pc.is_in(archived["id"], value_set=live["id"].combine_chunks())))
+        tables.append(archived)
+    table = pa.concat_tables(tables, promote_options="permissive") if len(tables) > 1 else live
+    return table.sort_by("date_time").unify_dictionaries().combine_chunks()
+
+def where(table, **equals):
+    # Rows whose column equals the value for every keyword, e.g. status="Taken".
+    mask = None
+    for col, value in equals.items():
+        hit  = pc.equal(table[col], pa.scalar(value, table.schema.field(col).type.value_type))
+        mask = hit if mask is None else pc.and_(mask, hit)
+    return table if mask is None else table.filter(mask)
+
+def labels(table, col):
+    # Distinct values present in a dictionary column, in first-seen order.
+    return [v for v in pc.unique(table[col]).to_pylist() if v is not None]
+
+def with_column(table, name, values):
+    return table.append_column(name, pc.dictionary_encode(pa.array(values, pa.string())))
+
+def append_pending(table, rows, states):
+    # Journal rows the backend hasn't returned yet, flagged in a `sync` column.
+    base  = with_column(table, "sync", ["✅ synced"] * table.num_rows)
+    extra = with_column(from_rows(rows), "sync", states)
+    return pa.concat_tables([base, extra]).unify_dictionaries().sort_by("date_time").combine_chunks()
+
+def display(table, extra=()):
+    return table.select([c for c in DISPLAY_COLS + list(extra) if c in table.column_names])
+
+def to_csv(table):
+    # Written straight from the Arrow buffers; dictionaries are decoded per batch.
+    out = io.BytesIO()
+    pacsv.write_csv(table, out)
+    return out.getvalue()
+
+def change_marker(table):
+    # Changes whenever a dose is added, synced, edited or cleared; keys cached reports.
+    taken = pc.sum(pc.equal(table["status"], pa.scalar("Taken", pa.string()))).as_py()
+    return (table.num_rows, pc.max(table["id"]).as_py(), pc.max(table["date_time"]).as_py(), taken)
@@ -0,0 +1,145 @@
+import argparse
+import csv
+import hashlib
+import re
+import sys
+import time
+from collections import defaultdict
+from functools import lru_cache
+from itertools import combinations
+from pathlib import Path
+
+import streamlit as st
+
+from catalog import normalize
+from config import setting
+
+# ══════════════════════════════════════════════════════════════════════════════
+# DRUG INTERACTIONS — catalog/interactions.csv (drug_a, drug_b, severity, note)
+# compiled into a hash of ingredient-ID pairs. A medicine's name is reduced to
+# ingredient IDs ("Amoxicillin and Clavulanate Potassium 625 mg tab" →
+# amoxicillin, clavulanate; dose, form and salt dropped, casefolded, 64-bit
+# hash), and each pair is keyed (lower ID, higher ID), so checking a new
+# medicine against a patient's k others is k dictionary lookups. When the dataset changes, rescreen every
+# patient and report what the new version flags that the old one did not:
+#   python interactions.py --rescreen --previous old_interactions.csv > flags.csv
+# ══════════════════════════════════════════════════════════════════════════════
+DATASET_PATH = setting("DRUG_INTERACTIONS", str(Path(__file__).resolve().parent / "catalog" / "interactions.csv"))
+SEVERITY     = {"moderate": 1, "major": 2}
+MIN_SEVERITY = setting("INTERACTION_MIN_SEVERITY", "moderate")
+
+_PARTS  = re.compile(r"\s+and\s+|\s*[+/,&]\s*")
+_SUFFIX = re.compile(r"\s+(\d|(sr|er|xr|cr|xl|mr|od|tablets?|tab|capsules?|cap|syrup|injection|drops)\b).*$")
+_SALT   = re.compile(r"(?<=\w)(\s+(hydrochloride|hcl|hydrobromide|sodium|disodium|potassium|calcium|magnesium|"
+                     r"maleate|mesylate|besylate|besilate|succinate|tartrate|fumarate|citrate|sulfate|sulphate|"
+                     r"phosphate|acetate|bromide|hyclate|(mono|di|tri)?hydrate|anhydrous))+$")
+
+@lru_cache(maxsize=65536)
+def ingredients(name):
+    ids = []
+    for part in _PARTS.split(normalize(name)):
+        part = _SALT.sub("", _SUFFIX.sub("", part).strip())
+        if part:
+            ids.append(int.from_bytes(hashlib.blake2b(part.encode(), digest_size=8).digest(), "big"))
+    return tuple(ids)
+
+def pair_key(a, b):
+    return (a, b) if a < b else (b, a)
+
+class InteractionIndex:
+    def __init__(self, rows, min_severity=MIN_SEVERITY, version=""):
+        self.version = version
+        self.pairs   = {}   # (id, id) -> (severity, note); the more severe entry wins
+        floor        = SEVERITY[min_severity]
+        for a, b, severity, note in rows:
+            severity = severity.strip().lower()
+            if SEVERITY.get(severity, 0) < floor:
+                continue
+            for x in ingredients(a):
+                for y in ingredients(b):
+                    key = pair_key(x, y)
+                    old = self.pairs.get(key)
+                    if x != y and (old is None or SEVERITY[severity] > SEVERITY[old[0]]):
+                        self.pairs[key] = (severity, note.strip())
+
+    @classmethod
+    def load(cls, path=DATASET_PATH, min_severity=MIN_SEVERITY):
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        rows = csv.reader(line for line in text.splitlines() if line.strip() and not line.startswith("#"))
+        next(rows, None)   # header
+        return cls(rows, min_severity, hashlib.sha256(text.encode()).hexdigest()[:12])
+
+    def _hit(self, ids, other_ids):
+        best = None
+        for x in ids:
+            for y in other_ids:
+                hit = self.pairs.get(pair_key(x, y))
+                if hit and (best is None or SEVERITY[hit[0]] > SEVERITY[best[0]]):
+                    best = hit
+        return best
+
+    def check(self, name, others):
+        # `name` against each of `others`: [{medicine, other, severity, note}], major first.
+        ids, out = ingredients(name), []
+        for other in others:
+            hit = self._hit(ids, ingredients(other))
+            if hit:
+                out.append({"medicine": name, "other": other, "severity": hit[0], "note": hit[1]})
+        return sorted(out, key=lambda f: -SEVERITY[f["severity"]])
+
+    def screen(self, names):
+        # Every interacting pair within one patient's list.
+        out = []
+        for a, b in combinations(dict.fromkeys(names), 2):
+            hit = self._hit(ingredients(a), ingredients(b))
+            if hit:
+                out.append({"medicine": a, "other": b, "severity": hit[0], "note": hit[1]})
+        return sorted(out, key=lambda f: -SEVERITY[f["severity"]])
+
+@st.cache_resource(show_spinner=False)
+def get_interactions():
+    return InteractionIndex.load()
+
+# ══════════════════════════════════════════════════════════════════════════════
+# RESCREEN — every patient's medicines against the dataset, in one table scan
+# ══════════════════════════════════════════════════════════════════════════════
+def rescreen(index, meds, previous=None):
+    # meds: rows with user_email and name. Yields (user_email, flag) for flags
+    # `previous` (an older index) did not raise.
+    by_user = defaultdict(list)
+    for m in meds:
+        by_user[m["user_email"]].append(m["name"])
+    for email, names in by_user.items():
+        for flag in index.screen(names):
+            before = previous and previous._hit(ingredients(flag["medicine"]), ingredients(flag["other"]))
+            if before != (flag["severity"], flag["note"]):
+                yield email, flag
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Check medicines for interactions, or rescreen every patient.")
+    ap.add_argument("names",      nargs="*", help="medicine names to screen against each other")
+    ap.add_argument("--rescreen", action="store_true", help="screen every patient's medicines (CSV to stdout)")
+    ap.add_argument("--previous", help="older interactions.csv: only report flags it did not raise")
+    ap.add_argument("--dataset",  default=DATASET_PATH)
+    args = ap.parse_args()
+
+    index = InteractionIndex.load(args.dataset)
+    print(f"{len(index.pairs):,} interacting ingredient pairs, dataset {index.version}", file=sys.stderr)
+    for flag in index.screen(args.names):
+        print(f"{flag['severity']:<9} {flag['medicine']} + {flag['other']}: {flag['note']}")
+    if args.rescreen:
+        from db import scan_table
+        t        = time.perf_counter()
+        meds     = scan_table("medicines", "id,user_email,name", "id", 0)
+        previous = InteractionIndex.load(args.previous) if args.previous else None
+        out      = csv.writer(sys.stdout)
+        out.writerow(["user_email", "medicine", "other", "severity", "note"])
+        counts   = defaultdict(int)
+        patients = set()
+        for email, flag in rescreen(index, meds, previous):
+            out.writerow([email, flag["medicine"], flag["other"], flag["severity"], flag["note"]])
+            counts[flag["severity"]] += 1
+            patients.add(email)
+        print(f"screened {len(meds):,} medicines in {time.perf_counter() - t:.1f}s: {len(patients):,} patients"
+              + "".join(f", {n:,} {s}" for s, n in sorted(counts.items())), file=sys.stderr)
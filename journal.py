@@ -0,0 +1,181 @@
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import streamlit as st
+
+from config import setting
+from db import db_add_history_rows
+from escalation import get_escalations
+from models import HistoryEntry
+from resilience import BackendUnavailable, _is_outage
+
+# ══════════════════════════════════════════════════════════════════════════════
+# DOSE JOURNAL — write-behind logging for Taken / Missed clicks. A click is a
+# local SQLite (WAL) insert and returns at once; a background flusher upserts
+# queued rows to history in batches, keyed by a per-dose client_id so a retried
+# batch never duplicates a dose (see sql/history_client_id.sql). Rows stay in
+# the journal, marked synced, for JOURNAL_KEEP_HOURS so the UI can show them
+# until the next history read picks them up. A batch the backend refuses (not
+# an outage) is retried row by row; rows it still refuses are marked rejected
+# and kept, so one bad row doesn't hold up the queue behind it.
+# ══════════════════════════════════════════════════════════════════════════════
+JOURNAL_PATH   = setting("DOSE_JOURNAL", "dose_journal.sqlite3")
+FLUSH_INTERVAL = float(setting("JOURNAL_FLUSH_INTERVAL", 2.0))
+FLUSH_BATCH    = int(setting("JOURNAL_FLUSH_BATCH", 200))
+MAX_BACKOFF    = float(setting("JOURNAL_MAX_BACKOFF", 60.0))
+KEEP_HOURS     = float(setting("JOURNAL_KEEP_HOURS", 24))
+HISTORY_FIELDS = ("client_id", "user_email", "date_time", "session", "medicines", "status", "notes")
+
+SCHEMA = """
+create table if not exists journal (
+    client_id  text primary key,
+    user_email text not null,
+    date_time  text not null,
+    session    text not null,
+    medicines  text not null,
+    status     text not null,
+    notes      text,
+    created    real not null,
+    synced     real,
+    rejected   real,
+    attempts   integer not null default 0,
+    last_error text
+);
+create index if not exists journal_queue on journal (created) where synced is null and rejected is null;
+create index if not exists journal_user on journal (user_email, created);
+"""
+
+class DoseJournal:
+    def __init__(self, path=JOURNAL_PATH, apply=db_add_history_rows,
+                 interval=FLUSH_INTERVAL, batch=FLUSH_BATCH):
+        self.apply    = apply
+        self.interval = interval
+        self.batch    = batch
+        self.lock     = threading.Lock()
+        self.wake     = threading.Event()
+        self.failures = 0
+        self.conn     = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("pragma journal_mode=wal")
+        self.conn.execute("pragma synchronous=full")   # a logged dose survives a crash
+        columns = {c[1] for c in self.conn.execute("pragma table_info(journal)")}
+        if columns and "rejected" not in columns:   # a journal from before rows could be rejected
+            self.conn.execute("alter table journal add column rejected real")
+        self.conn.executescript(SCHEMA)
+
+    def record(self, email, session, medicines, status, notes):
+        row = {"client_id": uuid.uuid4().hex, "user_email": email,
+               "date_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+               "session": session, "medicines": medicines, "status": status, "notes": notes}
+        with self.lock:
+            self.conn.execute(
+                "insert into journal (client_id, user_email, date_time, session, medicines, status, notes, created)"
+                " values (:client_id, :user_email, :date_time, :session, :medicines, :status, :notes, :created)",
+                {**row, "created": time.time()})
+        self.wake.set()
+        return row
+
+    def flush(self):
+        # One batch; returns rows settled (synced or rejected), or None if the
+        # backend was unreachable.
+        with self.lock:
+            rows = [dict(r) for r in self.conn.execute(
+                "select * from journal where synced is null and rejected is null order by created limit ?",
+                (self.batch,))]
+        if not rows:
+            return 0
+        try:
+            self.apply([{k: r[k] for k in HISTORY_FIELDS} for r in rows])
+        except Exception as e:
+            if _transient(e):
+                self._mark(rows, None, e)
+                return None
+            # Something in the batch is bad: settle the rows one at a time.
+            for i, r in enumerate(rows):
+                if self._flush_one(r) is None:
+                    return i or None
+            return len(rows)
+        self._mark(rows, "synced")
+        return len(rows)
+
+    def _flush_one(self, row):
+        try:
+            self.apply([{k: row[k] for k in HISTORY_FIELDS}])
+        except Exception as e:
+            if _transient(e):
+                self._mark([row], None, e)
+                return None
+            self._mark([row], "rejected", e)
+        else:
+            self._mark([row], "synced")
+        return 1
+
+    def _mark(self, rows, field, error=None):
+        # Stamps rows "synced" or "rejected"; field None counts a failed attempt.
+        change = f"{field} = {time.time()!r}" if field else "attempts = attempts + 1"
+        with self.lock:
+            self.conn.executemany(f"update journal set {change}, last_error = coalesce(?, last_error) where client_id = ?",
+                                  [(error and str(error)[:200], r["client_id"]) for r in rows])
+
+    def prune(self):
+        with self.lock:
+            self.conn.execute("delete from journal where synced is not null and synced < ?",
+                              (time.time() - KEEP_HOURS * 3600,))
+
+    def run(self, stop):
+        while not stop.is_set():
+            # Back off exponentially while the backend keeps refusing batches.
+            self.wake.wait(min(self.interval * 2 ** self.failures, MAX_BACKOFF))
+            self.wake.clear()
+            while (n := self.flush()):
+                self.failures = 0
+                if n < self.batch: break
+            if n is None:
+                self.failures += 1
+            self.prune()
+
+    def entries(self, email):
+        # This user's journal rows, newest first, each with a `synced` flag.
+        with self.lock:
+            rows = self.conn.execute(
+                "select * from journal where user_email = ? order by created desc", (email,)).fetchall()
+        return [{**{k: r[k] for k in HISTORY_FIELDS}, "synced": r["synced"] is not None,
+                 "rejected": r["rejected"] is not None} for r in rows]
+
+    def pending_count(self, email=None):
+        with self.lock:
+            if email is None:
+                return self.conn.execute("select count(*) from journal where synced is null and rejected is null"
+                                         ).fetchone()[0]
+            return self.conn.execute("select count(*) from journal where synced is null and rejected is null"
+                                     " and user_email = ?",
+                                     (email,)).fetchone()[0]
+
+    def forget(self, email):
+        with self.lock:
+            self.conn.execute("delete from journal where user_email = ?", (email,))
+
+def _transient(e):
+    # Worth retrying the same batch later; anything else is the backend refusing the rows.
+    return isinstance(e, BackendUnavailable) or _is_outage(e)
+
+@st.cache_resource(show_spinner=False)
+def get_journal():
+    journal = DoseJournal()
+    threading.Thread(target=journal.run, args=(threading.Event(),), daemon=True).start()
+    return journal
+
+def log_dose(email, session, medicines, status, notes):
+    # The dose counts as recorded once it is in the journal: escalation stops here.
+    row = get_journal().record(email, session, medicines, status, notes)
+    get_escalations().acknowledge(email, session)
+    return row
+
+def with_pending(history, entries):
+    # Backend history plus journal rows it doesn't contain yet (and will accept).
+    seen = {h.client_id for h in history}
+    return list(history) + [HistoryEntry.from_row(e) for e in entries
+                            if e["client_id"] not in seen and not e["rejected"]]
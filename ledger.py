@@ -0,0 +1,103 @@
+import sqlite3
+import threading
+import time
+
+import streamlit as st
+
+from config import setting
+from schedule import DAY
+
+# ══════════════════════════════════════════════════════════════════════════════
+# REMINDER LEDGER — which reminder slots have gone out, so each (user, minute)
+# is sent exactly once across reminder threads, restarts and worker processes.
+# The record is an indexed SQLite table: claiming a slot is an
+# INSERT OR IGNORE, and only the caller whose insert lands sends. In front of
+# it sits a 1440-bit bitset per user for the current day, so the every-30 s
+# "already sent?" check is a bit test. On the first claim of a new day the
+# bitsets are dropped and rows older than LEDGER_KEEP_DAYS are pruned.
+# ══════════════════════════════════════════════════════════════════════════════
+LEDGER_PATH = setting("REMINDER_LEDGER", "reminder_ledger.sqlite3")
+KEEP_DAYS   = int(setting("LEDGER_KEEP_DAYS", 7))
+
+SCHEMA = """
+create table if not exists sent (
+    user_email text    not null,
+    minute     integer not null,   -- schedule.to_minute() of the slot
+    claimed    real    not null,
+    primary key (user_email, minute)
+) without rowid;
+"""
+
+class ReminderLedger:
+    def __init__(self, path=LEDGER_PATH, keep_days=KEEP_DAYS):
+        self.keep_days = keep_days
+        self.lock      = threading.Lock()
+        self.day       = None
+        self.bits      = {}   # email -> (day, bytearray of 1440 bits)
+        self.conn      = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                         timeout=30, uri=path.startswith("file:"))
+        self.conn.execute("pragma journal_mode=wal")
+        self.conn.executescript(SCHEMA)
+
+    def _rollover(self, day):
+        self.day  = day
+        self.bits = {e: b for e, b in self.bits.items() if b[0] == day}
+        self.conn.execute("delete from sent where minute < ?", ((day - self.keep_days) * DAY,))
+
+    def _bitset(self, email, day):
+        # Built from the table on first use, so a restart picks up today's sends.
+        if self.day is None or day > self.day:
+            self._rollover(day)
+        entry = self.bits.get(email)
+        if entry is None or entry[0] != day:
+            bits = bytearray(DAY // 8)
+            for (m,) in self.conn.execute("select minute - ? from sent where user_email = ? and minute >= ? and minute < ?",
+                                          (day * DAY, email, day * DAY, (day + 1) * DAY)):
+                bits[m >> 3] |= 1 << (m & 7)
+            entry = (day, bits)
+            if day == self.day:
+                self.bits[email] = entry
+        return entry[1]
+
+    def seen(self, email, minute):
+        day, slot = divmod(minute, DAY)
+        with self.lock:
+            return bool(self._bitset(email, day)[slot >> 3] & 1 << (slot & 7))
+
+    def claim(self, email, minute):
+        # True for exactly one caller per (email, minute), across processes.
+        day, slot = divmod(minute, DAY)
+        with self.lock:
+            bits = self._bitset(email, day)
+            if bits[slot >> 3] & 1 << (slot & 7):
+                return False
+            won = self.conn.execute("insert or ignore into sent values (?, ?, ?)",
+                                    (email, minute, time.time())).rowcount == 1
+            bits[slot >> 3] |= 1 << (slot & 7)   # ours now, or someone else's already
+            return won
+
+    def release(self, email, minute):
+        # The send never happened (it raised); let a later tick in the same minute retry.
+        day, slot = divmod(minute, DAY)
+        with self.lock:
+            self.conn.execute("delete from sent where user_email = ? and minute = ?", (email, minute))
+            self._bitset(email, day)[slot >> 3] &= ~(1 << (slot & 7)) & 0xFF
+
+    def for_user(self, email):
+        return UserLedger(self, email)
+
+class UserLedger:
+    # One user's view, as reminder_tick sees it.
+    __slots__ = ("ledger", "email")
+
+    def __init__(self, ledger, email):
+        self.ledger = ledger
+        self.email  = email
+
+    def seen(self, minute):    return self.ledger.seen(self.email, minute)
+    def claim(self, minute):   return self.ledger.claim(self.email, minute)
+    def release(self, minute): self.ledger.release(self.email, minute)
+
+@st.cache_resource(show_spinner=False)
+def get_ledger():
+    return ReminderLedger()
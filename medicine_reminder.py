@@ -1,22 +1,30 @@
 import streamlit as st
-import pandas as pd
 import time
 import threading
-import hashlib
 from datetime import datetime
-from twilio.rest import Client
-from supabase import create_client, Client as SupabaseClient
-
-# ══════════════════════════════════════════════════════════════════════════════
-# CREDENTIALS — all stored in Streamlit Secrets, nothing hardcoded here
-# ══════════════════════════════════════════════════════════════════════════════
-TWILIO_SID   = st.secrets["TWILIO_SID"]
-TWILIO_TOKEN = st.secrets["TWILIO_TOKEN"]
-TWILIO_FROM  = "whatsapp:+14155238886"
-SUPABASE_URL = st.secrets["SUPABASE_URL"]
-SUPABASE_KEY = st.secrets["SUPABASE_KEY"]
-
-supabase: SupabaseClient = create_client(SUPABASE_URL, SUPABASE_KEY)
+from auth import LoginThrottled, check_password, hash_password
+from catalog import get_catalog, normalize
+from interactions import get_interactions
+from db import (
+    db_get_credentials, db_get_user, db_create_user, db_update_user,
+    db_add_medicine, db_update_medicine, db_delete_medicine, db_save_family_numbers,
+    db_get_history_range, db_clear_history, KEEP,
+)
+from models import Contact, HistoryEntry
+from user_state import get_user_store, session_id
+from schedule import WEEKDAYS, compile_rule, describe_rule, from_minute, parse_rule, to_minute
+from resilience import BackendUnavailable, is_degraded
+from notify import send_message
+from dispatch import get_dispatcher, is_email, parse_address, unreachable, valid_address
+from delivery import delivery_rate, delivery_stats
+from reminder_engine import reminder_loop as run_reminder_loop
+from journal import get_journal, log_dose, with_pending
+from stock import REFILL_DAYS, days_left
+from ledger import get_ledger
+from escalation import FAMILY_AFTER, REMIND, REMIND_AFTER, escalation_message, get_escalations, run_escalations
+from profiling import get_profiler, profiling_toggle
+
+profiler = get_profiler(__file__)   # no-op unless an admin has switched it on
 
 st.set_page_config(
     page_title="MediCare Reminder",
@@ -25,6 +33,7 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+profiler.mark("CSS")
 st.markdown("""
 <style>
 @import url('https://fonts.googleapis.com/css2?family=DM+Sans:wght@400;600;700&display=swap');
@@ -82,141 +91,122 @@ section[data-testid="stSidebar"] * { color: white !important; }
 # ══════════════════════════════════════════════════════════════════════════════
 # HELPERS
 # ══════════════════════════════════════════════════════════════════════════════
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def db_get_user(email):
-    try:
-        res = supabase.table("users").select("*").eq("email", email).execute()
-        return res.data[0] if res.data else None
-    except: return None
-
-def db_create_user(name, email, phone, age, sex, password, condition, gp):
-    try:
-        supabase.table("users").insert({
-            "name": name, "email": email, "phone": phone,
-            "age": age, "sex": sex, "password": hash_password(password),
-            "condition": condition, "gp": gp
-        }).execute()
-        return True
-    except Exception as e:
-        st.error(f"Error: {e}"); return False
-
-def db_update_user(email, data):
-    try:
-        supabase.table("users").update(data).eq("email", email).execute()
-        return True
-    except Exception as e:
-        st.error(f"Error: {e}"); return False
-
-def db_get_medicines(email):
-    try:
-        res = supabase.table("medicines").select("*").eq("user_email", email).execute()
-        return res.data or []
-    except: return []
-
-def db_add_medicine(email, name, time_val, session):
-    try:
-        supabase.table("medicines").insert({
-            "user_email": email, "name": name, "time": time_val, "session": session
-        }).execute()
-        return True
-    except Exception as e:
-        st.error(f"Error: {e}"); return False
-
-def db_update_medicine(med_id, name, time_val, session):
-    try:
-        supabase.table("medicines").update({
-            "name": name, "time": time_val, "session": session
-        }).eq("id", med_id).execute()
-        return True
-    except Exception as e:
-        st.error(f"Error: {e}"); return False
-
-def db_delete_medicine(med_id):
-    try:
-        supabase.table("medicines").delete().eq("id", med_id).execute()
-        return True
-    except Exception as e:
-        st.error(f"Error: {e}"); return False
-
-def db_get_family_numbers(email):
-    try:
-        res = supabase.table("users").select("phone").eq("email", email).execute()
-        if res.data and res.data[0].get("phone"):
-            return [n.strip() for n in res.data[0]["phone"].split(",") if n.strip()]
-        return []
-    except: return []
-
-def db_save_family_numbers(email, numbers):
-    try:
-        supabase.table("users").update({"phone": ",".join(numbers)}).eq("email", email).execute()
-        return True
-    except: return False
-
-def db_add_history(email, session, medicines, status, notes):
-    try:
-        supabase.table("history").insert({
-            "user_email": email,
-            "date_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "session": session, "medicines": medicines,
-            "status": status, "notes": notes
-        }).execute()
-        return True
-    except Exception as e:
-        st.error(f"Error: {e}"); return False
-
-def db_get_history(email):
-    try:
-        res = supabase.table("history").select("*").eq("user_email", email).execute()
-        return res.data or []
-    except: return []
-
-def db_clear_history(email):
-    try:
-        supabase.table("history").delete().eq("user_email", email).execute()
-        return True
-    except: return False
+OFFLINE_MSG = "⚠️ Can't reach the server right now. Please try again in a moment."
+
+def loaded(value):
+    # db_get_* return None when the backend is down and nothing is cached; stop
+    # the page rather than render that as "no medicines" / "no contacts".
+    if value is None:
+        st.error(OFFLINE_MSG); st.stop()
+    return value
+
+REPEATS = ["Every day", "Specific weekdays", "Every N hours"]
+
+def rule_inputs(key, rule=None):
+    # Repeat / course-end / tapering widgets; returns the rule dict (or None
+    # for a plain daily dose). Raises ValueError on a malformed taper line or
+    # an empty weekday pick.
+    rule   = parse_rule(rule) or {}
+    repeat = st.selectbox("Repeat", REPEATS, key=f"rr_{key}",
+        index=2 if "every_hours" in rule else 1 if "days" in rule else 0)
+    out = {}
+    if repeat == "Specific weekdays":
+        days = st.multiselect("Days", WEEKDAYS, default=[WEEKDAYS[d] for d in rule.get("days", [])], key=f"rd_{key}")
+        if not days:
+            raise ValueError("Pick at least one weekday, or choose Every day")
+        out["days"] = [WEEKDAYS.index(d) for d in days]
+    elif repeat == "Every N hours":
+        out["every_hours"] = st.number_input("Every (hours)", 1, 24, int(rule.get("every_hours", 8)), key=f"rh_{key}")
+        out["start"]       = rule.get("start") or str(datetime.now().date())
+    if st.checkbox("Course ends", value="end" in rule, key=f"re_{key}"):
+        end = rule.get("end") or str(datetime.now().date())
+        out["end"] = str(st.date_input("Last day", value=datetime.fromisoformat(end).date(), key=f"rl_{key}"))
+    taper = st.text_area("Tapering (optional, one step per line: YYYY-MM-DD dose)", key=f"rt_{key}",
+        value="\n".join(f"{d} {dose}" for d, dose in rule.get("taper", [])), height=68)
+    steps = [line.strip().split(None, 1) for line in taper.splitlines() if line.strip()]
+    if any(len(step) != 2 for step in steps):
+        raise ValueError("Each tapering line needs a date and a dose, e.g. 2024-03-08 20 mg")
+    out["taper"] = steps
+    return parse_rule(out)
+
+def stock_inputs(key, stock=None, dose_qty=1):
+    # Pills on hand (blank = not tracked) and pills per dose.
+    s1, s2 = st.columns(2)
+    with s1: stock = st.number_input("Pills left (blank = don't track)", min_value=0.0, step=1.0, key=f"ss_{key}",
+                                     value=None if stock is None else float(stock))
+    with s2: dose_qty = st.number_input("Pills per dose", min_value=0.5, step=0.5, key=f"sq_{key}",
+                                        value=float(dose_qty or 1))
+    return stock, dose_qty
+
+def took(medicines, session, names):
+    # The stock sql/stock.sql leaves once the dose is written, shown until the next re-read.
+    names = {n.strip().lower() for n in names}
+    return [m.replace(stock=max(m.stock - (m.get("dose_qty") or 1), 0))
+            if m.get("stock") is not None and m.session == session and m.name.lower() in names else m
+            for m in medicines]
+
+def pick_name(key):
+    st.session_state[key] = st.session_state[f"{key}_pick"]
+
+def medicine_name_input(label, key, value=None, placeholder=None):
+    # Free text with catalog suggestions under it until it matches a catalog
+    # name; returns the catalog's spelling when it does.
+    if value is not None:
+        st.session_state.setdefault(key, value)
+    name    = st.text_input(label, key=key, placeholder=placeholder)
+    catalog = get_catalog()
+    exact   = catalog.canonical(name)
+    if name.strip() and not exact:
+        options = catalog.suggest(name, 6)
+        if options:
+            st.pills("Suggestions", options, key=f"{key}_pick", on_change=pick_name, args=(key,))
+    return exact or name.strip()
+
+def show_interactions(flags):
+    for f in flags:
+        (st.error if f["severity"] == "major" else st.warning)(
+            f"⚠️ **{f['medicine']}** + **{f['other']}**: {f['note']} ({f['severity']}). "
+            "Check with your doctor or pharmacist before taking them together.")
+
+def send_reminder(store, email, message):
+    # reminder_tick only knows a send failed if it raises.
+    ok, info = send_message(message, [c.number for c in store.get(email).contacts or ()])
+    if not ok:
+        raise RuntimeError(info)
+
+def reminder_loop(email, store):
+    run_reminder_loop(
+        is_active     = lambda: st.session_state.get("reminder_active", False),
+        get_medicines = lambda: store.get(email).medicines or [],
+        get_user_name = lambda: (store.get(email).user or {}).get("name", ""),
+        send          = lambda msg: send_reminder(store, email, msg),
+        ledger        = get_ledger().for_user(email),
+        escalate      = lambda session, names, now: get_escalations().arm(email, session, now, names),
+    )
 
-def send_whatsapp(message, numbers=None):
-    try:
-        client = Client(TWILIO_SID, TWILIO_TOKEN)
-        targets = numbers or st.session_state.get("family_numbers", [])
-        if not targets:
-            return False, "No contacts added. Go to Family Contacts page."
-        for num in targets:
-            wa = num if num.startswith("whatsapp:") else f"whatsapp:{num}"
-            client.messages.create(to=wa, from_=TWILIO_FROM, body=message)
-        return True, f"Sent to {len(targets)} number(s)"
-    except Exception as e:
-        return False, str(e)
-
-def reminder_loop():
-    sent_today = set()
-    while st.session_state.get("reminder_active", False):
-        now   = datetime.now().strftime("%H:%M")
-        today = datetime.now().strftime("%Y-%m-%d")
-        key   = f"{today}_{now}"
-        if key not in sent_today:
-            medicines = st.session_state.get("medicines", [])
-            for med in medicines:
-                if med["time"] == now:
-                    meds_now  = list({m["name"] for m in medicines if m["time"] == now})
-                    user_name = st.session_state.get("user", {}).get("name", "")
-                    send_whatsapp(
-                        f"💊 MEDICINE REMINDER\n"
-                        f"Hi {user_name}! Time for your {med['session']} medicines.\n"
-                        f"Medicines: {', '.join(meds_now)}\nStay healthy! ❤️"
-                    )
-                    sent_today.add(key); break
-        time.sleep(30)
+def send_escalation(store, email, session, stage, reminded_at, names):
+    # Doses logged from another process (e.g. the JSON API) never reached this
+    # process's timers, so look before nagging.
+    logged = db_get_history_range(email, f"{reminded_at:%Y-%m-%d %H:%M}:00", f"{datetime.now():%Y-%m-%d %H:%M:%S}",
+                                  HistoryEntry.SESSIONS)
+    if logged and any(h.session == session for h in logged):
+        return
+    snap    = store.get(email)
+    targets = [c.number for c in snap.contacts or () if c.is_patient or stage != REMIND]
+    send_message(escalation_message(stage, (snap.user or {}).get("name", ""), session, names, reminded_at), targets)
+
+@st.cache_resource(show_spinner=False)
+def escalation_dispatcher(_store):
+    thread = threading.Thread(target=run_escalations, daemon=True,
+        args=(get_escalations(), lambda *a: send_escalation(_store, *a)))
+    thread.start()
+    return thread
 
 # ══════════════════════════════════════════════════════════════════════════════
 # SESSION STATE
 # ══════════════════════════════════════════════════════════════════════════════
 for key, val in {
-    "logged_in": False, "user": {}, "medicines": [],
-    "family_numbers": [], "reminder_active": False
+    "logged_in": False, "email": "", "reminder_active": False
 }.items():
     if key not in st.session_state:
         st.session_state[key] = val
@@ -241,13 +231,20 @@ if not st.session_state.logged_in:
             login_pass  = st.text_input("Password", type="password", placeholder="your password", key="lp")
             if st.button("Login →", type="primary", use_container_width=True):
                 if login_email and login_pass:
-                    user = db_get_user(login_email.strip().lower())
-                    if user and user["password"] == hash_password(login_pass):
-                        st.session_state.logged_in      = True
-                        st.session_state.user           = user
-                        st.session_state.medicines      = db_get_medicines(login_email.strip().lower())
-                        st.session_state.family_numbers = db_get_family_numbers(login_email.strip().lower())
-                        st.success(f"Welcome back, {user['name']}! 👋")
+                    try:
+                        creds = db_get_credentials(login_email.strip().lower())
+                        ok, upgraded = check_password(login_email.strip().lower(), login_pass, creds and creds.password)
+                    except BackendUnavailable:
+                        st.error(OFFLINE_MSG); st.stop()
+                    except LoginThrottled as e:
+                        st.error(f"⏳ {e}"); st.stop()
+                    if ok:
+                        if upgraded:   # legacy or outdated hash: store the current scrypt form
+                            db_update_user(creds.email, {"password": upgraded})
+                        st.session_state.logged_in = True
+                        st.session_state.email     = creds.email
+                        get_user_store().acquire(creds.email, session_id())
+                        st.success(f"Welcome back, {creds.name}! 👋")
                         time.sleep(1); st.rerun()
                     else:
                         st.error("❌ Wrong email or password.")
@@ -276,62 +273,91 @@ if not st.session_state.logged_in:
                     st.error("Passwords don't match!")
                 elif not reg_phone.startswith("+"):
                     st.error("Phone must start with + and country code. Example: +919876543210")
-                elif db_get_user(reg_email.strip().lower()):
-                    st.error("An account with this email already exists.")
                 else:
-                    ok = db_create_user(reg_name, reg_email.strip().lower(), reg_phone,
-                                        reg_age, reg_sex, reg_pass, reg_cond, reg_gp)
-                    if ok:
-                        st.success("✅ Account created! Please log in.")
+                    try:
+                        exists = db_get_user(reg_email.strip().lower(), fresh=True)
+                    except BackendUnavailable:
+                        st.error(OFFLINE_MSG); st.stop()
+                    if exists:
+                        st.error("An account with this email already exists.")
+                    else:
+                        ok = db_create_user(reg_name, reg_email.strip().lower(), reg_phone,
+                                            reg_age, reg_sex, reg_pass, reg_cond, reg_gp)
+                        if ok:
+                            st.success("✅ Account created! Please log in.")
     st.stop()
 
 # ══════════════════════════════════════════════════════════════════════════════
 # MAIN APP
 # ══════════════════════════════════════════════════════════════════════════════
-user = st.session_state.user
-
+profiler.mark("User state")
+store = get_user_store()
+store.acquire(st.session_state.email, session_id())
+escalation_dispatcher(store)
+snap  = store.get(st.session_state.email)
+user  = loaded(snap.user)
+# Doses clicked but possibly not yet in snap.history (see journal.py)
+doses = get_journal().entries(user.email)
+
+profiler.mark("Sidebar")
 with st.sidebar:
     st.markdown("## 💊 MediCare")
-    st.markdown(f"👤 **{user.get('name','')}**")
+    st.markdown(f"👤 **{user.name}**")
     st.markdown("---")
     page = st.radio("Navigate", [
         "🏠 Home", "💊 Medicines", "⏰ Reminders",
         "👨‍👩‍👧 Family Contacts", "📋 History", "⚙️ Profile",
     ])
     st.markdown("---")
-    history = db_get_history(user["email"])
-    taken   = sum(1 for h in history if h.get("status") == "Taken")
-    missed  = len(history) - taken
-    st.markdown(f"**✅ Taken:** {taken}\n\n**❌ Missed:** {missed}")
+    history = snap.history
+    if history is None:
+        st.markdown("**✅ Taken:** —\n\n**❌ Missed:** —")
+    else:
+        history = with_pending(history, doses)
+        taken   = sum(1 for h in history if h.status == "Taken")
+        missed  = len(history) - taken
+        st.markdown(f"**✅ Taken:** {taken}\n\n**❌ Missed:** {missed}")
+        st.caption("Recent doses; older ones are archived on History.")
+    unsynced = sum(1 for d in doses if not d["synced"] and not d["rejected"])
+    rejected = sum(1 for d in doses if d["rejected"])
+    if unsynced:
+        st.markdown(f"⏳ {unsynced} dose(s) waiting to sync")
+    if rejected:
+        st.markdown(f"⚠️ {rejected} dose(s) the server refused to save")
+    if is_degraded(user.email):
+        st.warning("⚠️ Server unreachable — showing your last saved data.")
     st.markdown("---")
     st.markdown(f"**Reminders:** {'🟢 Active' if st.session_state.reminder_active else '🔴 Inactive'}")
     st.markdown("---")
+    profiling_toggle(user.email)
     if st.button("🚪 Logout"):
+        store.release(user.email, session_id())
         for k in list(st.session_state.keys()): del st.session_state[k]
         st.rerun()
 
+profiler.mark(page)
+
 # ── HOME ───────────────────────────────────────────────────────────────────────
 if page == "🏠 Home":
-    st.markdown(f'<div class="hero-header"><h1>💊 MediCare Reminder</h1><p>Hello {user.get("name","")}! Stay on top of your health journey.</p></div>', unsafe_allow_html=True)
-
-    medicines = db_get_medicines(user["email"])
-    now_mins  = datetime.now().hour * 60 + datetime.now().minute
-    upcoming  = sorted(
-        [(int(m["time"].split(":")[0])*60 + int(m["time"].split(":")[1]), m)
-         for m in medicines
-         if int(m["time"].split(":")[0])*60 + int(m["time"].split(":")[1]) > now_mins],
-        key=lambda x: x[0]
-    )
+    st.markdown(f'<div class="hero-header"><h1>💊 MediCare Reminder</h1><p>Hello {user.name}! Stay on top of your health journey.</p></div>', unsafe_allow_html=True)
+
+    medicines = loaded(snap.medicines)
+    today     = datetime.now().date()
+    now_min   = to_minute(datetime.now())
+    todays    = [m for m in medicines if compile_rule(m).occurs_on(today)]
+    upcoming  = sorted(((f, m) for m in todays
+                        if (f := compile_rule(m).next_fire(now_min + 1)) is not None and f < to_minute(today) + 24 * 60),
+                       key=lambda x: x[0])
     if upcoming:
-        nxt      = upcoming[0][1]
-        nxt_meds = list({m["name"] for m in medicines if m["time"] == nxt["time"]})
-        st.markdown(f'<div class="alert-box">⏰ <strong>Next:</strong> {nxt["session"]} at {nxt["time"]} — {", ".join(nxt_meds)}</div>', unsafe_allow_html=True)
+        nxt, nxt_med = upcoming[0][0], upcoming[0][1]
+        nxt_meds     = list(dict.fromkeys(m.name for f, m in upcoming if f == nxt))
+        st.markdown(f'<div class="alert-box">⏰ <strong>Next:</strong> {nxt_med.session} at {from_minute(nxt):%H:%M} — {", ".join(nxt_meds)}</div>', unsafe_allow_html=True)
     else:
         st.markdown('<div class="alert-box">✅ All medicines done for today!</div>', unsafe_allow_html=True)
 
-    history = db_get_history(user["email"])
+    history = with_pending(loaded(snap.history), doses)
     total   = len(history)
-    taken   = sum(1 for h in history if h.get("status") == "Taken")
+    taken   = sum(1 for h in history if h.status == "Taken")
     missed  = total - taken
     rate    = int(taken / total * 100) if total > 0 else 0
     st.markdown(f"""
@@ -341,77 +367,110 @@ if page == "🏠 Home":
         <div class="stat-box stat-blue"> <div class="stat-num">{rate}%</div><div class="stat-lbl">Adherence</div></div>
         <div class="stat-box">           <div class="stat-num">{len(medicines)}</div><div class="stat-lbl">Medicines</div></div>
     </div>""", unsafe_allow_html=True)
+    st.caption("Taken, missed and adherence cover recent doses; older ones are archived and shown on the History page.")
 
     st.markdown('<div class="card"><div class="card-title">📋 Record Today\'s Intake</div>', unsafe_allow_html=True)
-    if medicines:
+    if todays:
         sessions = {}
-        for med in medicines: sessions.setdefault(med["session"], []).append(med["name"])
+        for med in todays: sessions.setdefault(med.session, []).append(med.name)
         for session, meds in sessions.items():
             with st.expander(f"🕐 {session} — {', '.join(meds)}"):
                 c1, c2 = st.columns(2)
                 with c1:
                     if st.button("✅ Taken", key=f"t_{session}"):
-                        db_add_history(user["email"], session, ", ".join(meds), "Taken", "Taken on time")
+                        log_dose(user.email, session, ", ".join(meds), "Taken", "Taken on time")
+                        store.update(user.email, medicines=took(medicines, session, meds))
                         st.success("Recorded! ✅"); st.rerun()
                 with c2:
                     if st.button("❌ Missed", key=f"m_{session}"):
-                        db_add_history(user["email"], session, ", ".join(meds), "Missed", "Missed dose")
+                        log_dose(user.email, session, ", ".join(meds), "Missed", "Missed dose")
                         st.warning("Recorded as missed ⚠️"); st.rerun()
+        logged = [d for d in doses if d["date_time"].startswith(str(today))]
+        if logged:
+            st.markdown("**Logged today**")
+            for d in logged:
+                state = "✅ synced" if d["synced"] else "⚠️ not saved" if d["rejected"] else "⏳ saving…"
+                st.markdown(f"{d['date_time'][11:16]} · {d['session']} · {d['status']} — <small>{state}</small>",
+                            unsafe_allow_html=True)
+    elif medicines:
+        st.info("Nothing scheduled for today.")
     else:
         st.info("No medicines yet. Go to 💊 Medicines to add some!")
     st.markdown('</div>', unsafe_allow_html=True)
 
     c1, c2 = st.columns(2)
     with c1:
-        st.markdown(f'<div class="card"><div class="card-title">👤 My Info</div><p><strong>Name:</strong> {user.get("name","")}</p><p><strong>Condition:</strong> {user.get("condition","")}</p><p><strong>GP:</strong> {user.get("gp","")}</p><p><strong>Age:</strong> {user.get("age","")}</p></div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="card"><div class="card-title">👤 My Info</div><p><strong>Name:</strong> {user.name}</p><p><strong>Condition:</strong> {user.condition}</p><p><strong>GP:</strong> {user.gp}</p><p><strong>Age:</strong> {user.age}</p></div>', unsafe_allow_html=True)
     with c2:
-        nums      = st.session_state.family_numbers
-        nums_html = "".join(f"<p>📱 {n}</p>" for n in nums) if nums else "<p>No contacts yet.</p>"
+        nums      = snap.contacts
+        nums_html = "".join(f"<p>📱 {c.number}</p>" for c in nums) if nums else "<p>No contacts yet.</p>"
         st.markdown(f'<div class="card"><div class="card-title">📞 Family Contacts</div>{nums_html}</div>', unsafe_allow_html=True)
 
 # ── MEDICINES ──────────────────────────────────────────────────────────────────
 elif page == "💊 Medicines":
     st.markdown('<div class="hero-header"><h1>💊 Medicine Schedule</h1><p>Add, edit and manage your medicines</p></div>', unsafe_allow_html=True)
 
-    medicines    = db_get_medicines(user["email"])
+    medicines    = loaded(snap.medicines)
     time_options = [f"{h:02d}:{m:02d}" for h in range(24) for m in [0, 30]]
 
     st.markdown('<div class="card"><div class="card-title">📋 Your Medicines</div>', unsafe_allow_html=True)
     if medicines:
+        show_interactions(get_interactions().screen([m.name for m in medicines]))
         for med in medicines:
             c1, c2, c3, c4, c5 = st.columns([3, 2, 2, 1, 1])
-            with c1: st.markdown(f"💊 **{med['name']}**")
-            with c2: st.markdown(f"🕐 {med['time']}")
-            with c3: st.markdown(f"☀️ {med['session']}")
+            with c1:
+                st.markdown(f"💊 **{med.name}**")
+                left = days_left(med)
+                if left is not None:
+                    st.caption(f"{'⚠️ ' if left < REFILL_DAYS else ''}📦 {med.stock:g} left"
+                               + (f" · about {int(left)} days" if left != float("inf") else ""))
+            with c2: st.markdown(f"🕐 {describe_rule(med)}")
+            with c3: st.markdown(f"☀️ {med.session}")
             with c4:
-                if st.button("✏️", key=f"edit_{med['id']}"):
-                    st.session_state[f"editing_{med['id']}"] = True
+                if st.button("✏️", key=f"edit_{med.id}"):
+                    st.session_state[f"editing_{med.id}"] = True
             with c5:
-                if st.button("🗑️", key=f"del_{med['id']}"):
-                    db_delete_medicine(med["id"])
-                    st.success(f"Removed {med['name']}"); st.rerun()
+                if st.button("🗑️", key=f"del_{med.id}"):
+                    db_delete_medicine(med.id)
+                    store.refresh(user.email, "medicines")
+                    st.success(f"Removed {med.name}"); st.rerun()
 
-            if st.session_state.get(f"editing_{med['id']}", False):
-                with st.expander(f"✏️ Editing {med['name']}", expanded=True):
+            if st.session_state.get(f"editing_{med.id}", False):
+                with st.expander(f"✏️ Editing {med.name}", expanded=True):
                     ec1, ec2, ec3 = st.columns(3)
-                    with ec1: e_name = st.text_input("Name", value=med["name"], key=f"en_{med['id']}")
+                    with ec1: e_name = medicine_name_input("Name", f"en_{med.id}", value=med.name)
                     with ec2:
                         e_time = st.selectbox("Time", time_options,
-                            index=time_options.index(med["time"]) if med["time"] in time_options else 0,
-                            key=f"et_{med['id']}")
+                            index=time_options.index(med.time) if med.time in time_options else 0,
+                            key=f"et_{med.id}")
                     with ec3:
                         e_sess = st.selectbox("Session", ["Morning","Afternoon","Night"],
-                            index=["Morning","Afternoon","Night"].index(med["session"]),
-                            key=f"es_{med['id']}")
+                            index=["Morning","Afternoon","Night"].index(med.session),
+                            key=f"es_{med.id}")
+                    try:
+                        e_rule, rule_err = rule_inputs(med.id, med.rule), None
+                    except ValueError as e:
+                        e_rule, rule_err = None, str(e)
+                    e_stock, e_qty = stock_inputs(med.id, med.get("stock"), med.get("dose_qty"))
+                    if e_name and normalize(e_name) != normalize(med.name):
+                        show_interactions(get_interactions().check(e_name, [m.name for m in medicines if m.id != med.id]))
                     sc1, sc2 = st.columns(2)
                     with sc1:
-                        if st.button("💾 Save", key=f"save_{med['id']}", type="primary"):
-                            db_update_medicine(med["id"], e_name, e_time, e_sess)
-                            del st.session_state[f"editing_{med['id']}"]
-                            st.success("✅ Updated!"); st.rerun()
+                        if st.button("💾 Save", key=f"save_{med.id}", type="primary"):
+                            if rule_err:
+                                st.error(rule_err)
+                            elif not e_name:
+                                st.error("Please enter a medicine name.")
+                            else:
+                                db_update_medicine(med.id, e_name, e_time, e_sess, e_rule,
+                                                   e_stock if e_stock != med.get("stock") else KEEP,
+                                                   e_qty if e_qty != (med.get("dose_qty") or 1) else KEEP)
+                                store.refresh(user.email, "medicines")
+                                del st.session_state[f"editing_{med.id}"]
+                                st.success("✅ Updated!"); st.rerun()
                     with sc2:
-                        if st.button("Cancel", key=f"cancel_{med['id']}"):
-                            del st.session_state[f"editing_{med['id']}"]
+                        if st.button("Cancel", key=f"cancel_{med.id}"):
+                            del st.session_state[f"editing_{med.id}"]
                             st.rerun()
     else:
         st.info("No medicines yet. Add one below!")
@@ -419,12 +478,22 @@ elif page == "💊 Medicines":
 
     st.markdown('<div class="card"><div class="card-title">➕ Add New Medicine</div>', unsafe_allow_html=True)
     c1, c2, c3 = st.columns(3)
-    with c1: new_name    = st.text_input("Medicine Name", placeholder="e.g. Metformin")
+    with c1: new_name    = medicine_name_input("Medicine Name", "new_med", placeholder="e.g. Metformin")
     with c2: new_time    = st.selectbox("Time", time_options)
     with c3: new_session = st.selectbox("Session", ["Morning", "Afternoon", "Night"])
+    try:
+        new_rule, rule_err = rule_inputs("new"), None
+    except ValueError as e:
+        new_rule, rule_err = None, str(e)
+    new_stock, new_qty = stock_inputs("new")
+    if new_name and normalize(new_name) not in {normalize(m.name) for m in medicines}:
+        show_interactions(get_interactions().check(new_name, [m.name for m in medicines]))
     if st.button("➕ Add Medicine", type="primary"):
-        if new_name.strip():
-            db_add_medicine(user["email"], new_name.strip(), new_time, new_session)
+        if rule_err:
+            st.error(rule_err)
+        elif new_name:
+            db_add_medicine(user.email, new_name, new_time, new_session, new_rule, new_stock, new_qty)
+            store.refresh(user.email, "medicines")
             st.success(f"✅ {new_name} added!"); st.rerun()
         else:
             st.error("Please enter a medicine name.")
@@ -432,7 +501,7 @@ elif page == "💊 Medicines":
 
 # ── REMINDERS ─────────────────────────────────────────────────────────────────
 elif page == "⏰ Reminders":
-    st.markdown('<div class="hero-header"><h1>⏰ Reminders</h1><p>Start and manage WhatsApp reminders</p></div>', unsafe_allow_html=True)
+    st.markdown('<div class="hero-header"><h1>⏰ Reminders</h1><p>Start and manage reminders</p></div>', unsafe_allow_html=True)
 
     st.markdown("""
     <div class="sandbox-box">
@@ -443,15 +512,19 @@ elif page == "⏰ Reminders":
 
     st.markdown('<div class="card"><div class="card-title">🔔 Reminder Control</div>', unsafe_allow_html=True)
     st.markdown(f"**Status:** {'🟢 Active' if st.session_state.reminder_active else '🔴 Inactive'}")
+    steps = ([f"re-reminded after {REMIND_AFTER} min"] if REMIND_AFTER else []) + \
+            ([f"family alerted after {FAMILY_AFTER} min"] if FAMILY_AFTER else [])
+    if steps:
+        st.caption(f"Doses not marked Taken or Missed on Home are {' and '.join(steps)}.")
     c1, c2 = st.columns(2)
     with c1:
         if st.button("▶️ Start Reminders", type="primary", disabled=st.session_state.reminder_active):
-            if not st.session_state.family_numbers:
+            if not snap.contacts:
                 st.error("⚠️ Add contacts in Family Contacts first!")
             else:
-                st.session_state.medicines       = db_get_medicines(user["email"])
+                store.refresh(user.email, "medicines")
                 st.session_state.reminder_active = True
-                threading.Thread(target=reminder_loop, daemon=True).start()
+                threading.Thread(target=reminder_loop, args=(user.email, store), daemon=True).start()
                 st.success("✅ Reminders started!"); st.rerun()
     with c2:
         if st.button("⏹️ Stop Reminders", disabled=not st.session_state.reminder_active):
@@ -459,11 +532,11 @@ elif page == "⏰ Reminders":
             st.warning("Reminders stopped."); st.rerun()
     st.markdown('</div>', unsafe_allow_html=True)
 
-    medicines = db_get_medicines(user["email"])
+    medicines = loaded(snap.medicines)
     st.markdown('<div class="card"><div class="card-title">📅 Current Schedule</div>', unsafe_allow_html=True)
     if medicines:
         sessions = {}
-        for med in medicines: sessions.setdefault(f"{med['session']} — {med['time']}", []).append(med["name"])
+        for med in medicines: sessions.setdefault(f"{med.session} — {describe_rule(med)}", []).append(med.name)
         for label, meds in sessions.items():
             pills = "".join(f'<span class="pill-tag">{m}</span>' for m in meds)
             st.markdown(f"<p>⏰ <strong>{label}</strong><br/>{pills}</p>", unsafe_allow_html=True)
@@ -472,8 +545,9 @@ elif page == "⏰ Reminders":
     st.markdown('</div>', unsafe_allow_html=True)
 
     st.markdown('<div class="card"><div class="card-title">🧪 Test Message</div>', unsafe_allow_html=True)
-    if st.button("📤 Send Test WhatsApp"):
-        ok, msg = send_whatsapp(f"👋 Hello {user.get('name','')}! MediCare reminder is working. ✅")
+    if st.button("📤 Send Test Message"):
+        ok, msg = send_message(f"👋 Hello {user.name}! MediCare reminder is working. ✅",
+                               [c.number for c in snap.contacts or ()])
         st.success(f"✅ {msg}") if ok else st.error(f"❌ {msg}")
     st.markdown('</div>', unsafe_allow_html=True)
 
@@ -485,22 +559,29 @@ elif page == "👨‍👩‍👧 Family Contacts":
     <div class="sandbox-box">
         <strong>📱 Every person must do this ONCE:</strong><br/><br/>
         1. Open WhatsApp → Send <code>join machinery-final</code> to <strong>+14155238886</strong><br/>
-        2. Wait for confirmation reply ✅
+        2. Wait for confirmation reply ✅<br/><br/>
+        Add <code>sms:</code> in front of a number to text it instead, or add an email address.
     </div>""", unsafe_allow_html=True)
 
-    numbers = db_get_family_numbers(user["email"])
-    st.session_state.family_numbers = numbers
+    numbers = [c.number for c in loaded(snap.contacts)]
 
     st.markdown('<div class="card"><div class="card-title">📱 Current Contacts</div>', unsafe_allow_html=True)
     if numbers:
+        stats = delivery_stats(tuple(parse_address(n)[1] for n in numbers if not is_email(n)))
+        dead  = unreachable(numbers)
         for i, num in enumerate(numbers):
             c1, c2 = st.columns([5, 1])
-            with c1: st.markdown(f"📱 `{num}`")
+            rate = None if is_email(num) else delivery_rate(stats.get(parse_address(num)[1]))
+            note = "" if rate is None else f" — {rate:.0%} delivered (30d)"
+            if num in dead:
+                note += " · ⚠️ not receiving WhatsApp, " + (
+                    "sent by SMS" if get_dispatcher().route(num, ("whatsapp",))[1] else "skipped")
+            with c1: st.markdown(f"{'✉️' if is_email(num) else '📱'} `{num}`{note}")
             with c2:
                 if st.button("🗑️", key=f"d_{i}"):
                     numbers.pop(i)
-                    db_save_family_numbers(user["email"], numbers)
-                    st.session_state.family_numbers = numbers
+                    if db_save_family_numbers(user.email, numbers):
+                        store.update(user.email, contacts=Contact.from_numbers(numbers))
                     st.rerun()
     else:
         st.info("No contacts yet.")
@@ -509,23 +590,23 @@ elif page == "👨‍👩‍👧 Family Contacts":
     st.markdown('<div class="card"><div class="card-title">➕ Add Family Member</div>', unsafe_allow_html=True)
     st.markdown("Include country code — **+919876543210** (India) or **+447911123456** (UK)")
     st.info("📱 Remind them: Send **join machinery-final** to **+14155238886** on WhatsApp first!")
-    new_num = st.text_input("WhatsApp Number", placeholder="+919876543210")
-    if st.button("➕ Add Number", type="primary"):
-        if new_num.strip().startswith("+"):
+    new_num = st.text_input("WhatsApp Number or Email", placeholder="+919876543210")
+    if st.button("➕ Add Contact", type="primary"):
+        if valid_address(new_num):
             if new_num.strip() not in numbers:
                 numbers.append(new_num.strip())
-                db_save_family_numbers(user["email"], numbers)
-                st.session_state.family_numbers = numbers
+                if db_save_family_numbers(user.email, numbers):
+                    store.update(user.email, contacts=Contact.from_numbers(numbers))
                 st.success("✅ Added!"); st.rerun()
             else: st.warning("Already in the list!")
-        else: st.error("Must start with + and country code. Example: +919876543210")
+        else: st.error("Numbers must start with + and country code (e.g. +919876543210); or enter an email address.")
     st.markdown('</div>', unsafe_allow_html=True)
 
     st.markdown('<div class="card"><div class="card-title">📢 Message All Contacts</div>', unsafe_allow_html=True)
     msg_text = st.text_area("Message", placeholder="Type your message here...")
     if st.button("📤 Send to All", type="primary"):
         if msg_text.strip():
-            ok, res = send_whatsapp(msg_text.strip(), numbers)
+            ok, res = send_message(msg_text.strip(), numbers)
             st.success(f"✅ {res}") if ok else st.error(f"❌ {res}")
         else: st.error("Please type a message first.")
     st.markdown('</div>', unsafe_allow_html=True)
@@ -534,35 +615,84 @@ elif page == "👨‍👩‍👧 Family Contacts":
 elif page == "📋 History":
     st.markdown('<div class="hero-header"><h1>📋 Intake History</h1><p>Your complete medication record</p></div>', unsafe_allow_html=True)
 
-    history = db_get_history(user["email"])
-    if history:
-        df           = pd.DataFrame(history)
-        display_cols = ["date_time","session","medicines","status","notes"]
-        df           = df[[c for c in display_cols if c in df.columns]]
+    import history_store as hs   # pyarrow is only loaded once History is opened
+    from archive import ArchiveUnavailable, archive_cutoff, read_archive, clear_archive
+
+    today      = datetime.now().date()
+    date_range = st.date_input("Date range", value=(archive_cutoff(), today), max_value=today)
+    start, end = date_range if len(date_range) == 2 else (date_range[0], date_range[0])
 
+    def build_history(archived=True):
+        live = hs.from_rows(loaded(db_get_history_range(user.email, f"{start} 00:00:00", f"{end} 23:59:59")))
+        return hs.combine(live, read_archive(user.email, start, end) if archived and start < archive_cutoff() else None)
+
+    # Built once per user and range; every open tab reuses it until history changes.
+    try:
+        table = store.derive(user.email, ("history_table", start, end), build_history)
+    except ArchiveUnavailable:
+        st.warning(f"⚠️ Archived history (before {archive_cutoff()}) can't be read right now — showing recent doses only.")
+        table = build_history(archived=False)
+    extra = []
+
+    # Journal rows the backend hasn't returned yet, flagged pending or synced.
+    seen  = set(table["client_id"].to_pylist())
+    fresh = [d for d in doses if str(start) <= d["date_time"][:10] <= str(end) and d["client_id"] not in seen]
+    if fresh:
+        table = hs.append_pending(table, fresh, ["✅ synced" if d["synced"] else "⚠️ not saved" if d["rejected"] else "⏳ pending"
+                                                   for d in fresh])
+        extra = ["sync"]
+
+    if table.num_rows:
         c1, c2 = st.columns(2)
-        with c1: f_status = st.selectbox("Filter Status", ["All","Taken","Missed"])
-        with c2:
-            sess_list = ["All"] + (list(df["session"].unique()) if "session" in df.columns else [])
-            f_session = st.selectbox("Filter Session", sess_list)
+        with c1: f_status  = st.selectbox("Filter Status", ["All","Taken","Missed"])
+        with c2: f_session = st.selectbox("Filter Session", ["All"] + hs.labels(table, "session"))
 
-        filtered = df.copy()
-        if f_status  != "All": filtered = filtered[filtered["status"]  == f_status]
-        if f_session != "All" and "session" in filtered.columns:
-            filtered = filtered[filtered["session"] == f_session]
+        filters  = {k: v for k, v in (("status", f_status), ("session", f_session)) if v != "All"}
+        filtered = hs.display(hs.where(table, **filters), extra)
 
         st.dataframe(filtered, use_container_width=True, hide_index=True)
         c1, c2 = st.columns(2)
         with c1:
-            st.download_button("⬇️ Download CSV",
-                filtered.to_csv(index=False).encode("utf-8"),
+            st.download_button("⬇️ Download CSV", hs.to_csv(filtered),
                 "medicine_history.csv", "text/csv", type="primary")
         with c2:
             if st.button("🗑️ Clear All History"):
-                db_clear_history(user["email"])
+                db_clear_history(user.email)
+                clear_archive(user.email)
+                get_journal().forget(user.email)
+                store.refresh(user.email, "history")
                 st.success("Cleared!"); st.rerun()
+
+        # ── Adherence report: built in a worker process, kept until history changes ──
+        from reports import get_reports
+        st.markdown('<div class="card"><div class="card-title">📄 Adherence Report</div>', unsafe_allow_html=True)
+        report_key = (user.email, start, end, hs.change_marker(table))
+        job        = get_reports().lookup(report_key)
+        if job is None or (job.done() and job.exception() is not None):
+            if job is not None:
+                st.error(f"Couldn't build the report: {job.exception()}")
+            st.caption("A printable summary of this date range for your doctor: charts, per-medicine adherence and every missed dose.")
+            if st.button("📄 Build report"):
+                profile = user.to_dict()
+                get_reports().request(report_key, profile, hs.display(table).to_pylist(), start, end)
+                st.rerun()
+        elif not job.done():
+            @st.fragment(run_every=1.0)
+            def report_progress():
+                if job.done(): st.rerun()
+                st.info("⏳ Building your report… you can keep using the app.")
+            report_progress()
+        else:
+            report = job.result()
+            name   = f"adherence_{start}_{end}"
+            c1, c2 = st.columns(2)
+            with c1: st.download_button("⬇️ Report (HTML)", report["html"], f"{name}.html", "text/html", type="primary")
+            with c2:
+                if report["pdf"]: st.download_button("⬇️ Report (PDF)", report["pdf"], f"{name}.pdf", "application/pdf")
+                else: st.caption("PDF export needs WeasyPrint on the server; the HTML report prints cleanly to PDF.")
+        st.markdown('</div>', unsafe_allow_html=True)
     else:
-        st.info("No history yet. Record your intake on the Home page!")
+        st.info("No history in this date range. Record your intake on the Home page!")
 
 # ── PROFILE ────────────────────────────────────────────────────────────────────
 elif page == "⚙️ Profile":
@@ -571,26 +701,22 @@ elif page == "⚙️ Profile":
     st.markdown('<div class="card"><div class="card-title">👤 Personal Information</div>', unsafe_allow_html=True)
     c1, c2 = st.columns(2)
     with c1:
-        p_name  = st.text_input("Full Name",       value=user.get("name",""))
-        p_email = st.text_input("Email",           value=user.get("email",""), disabled=True)
-        p_phone = st.text_input("WhatsApp Number", value=user.get("phone",""))
-        p_age   = st.number_input("Age", min_value=1, max_value=120, value=int(user.get("age") or 30))
+        p_name  = st.text_input("Full Name",       value=user.name or "")
+        p_email = st.text_input("Email",           value=user.email or "", disabled=True)
+        p_phone = st.text_input("WhatsApp Number", value=user.phone or "")
+        p_age   = st.number_input("Age", min_value=1, max_value=120, value=int(user.age or 30))
     with c2:
         p_sex  = st.selectbox("Sex", ["Male","Female","Other"],
-            index=["Male","Female","Other"].index(user.get("sex","Male")) if user.get("sex") in ["Male","Female","Other"] else 0)
-        p_cond = st.text_input("Medical Condition", value=user.get("condition",""))
-        p_gp   = st.text_input("Doctor's Name",     value=user.get("gp",""))
+            index=["Male","Female","Other"].index(user.sex) if user.sex in ["Male","Female","Other"] else 0)
+        p_cond = st.text_input("Medical Condition", value=user.condition or "")
+        p_gp   = st.text_input("Doctor's Name",     value=user.gp or "")
 
     if st.button("💾 Save Profile", type="primary"):
-        db_update_user(user["email"], {
-            "name": p_name, "phone": p_phone, "age": p_age,
-            "sex": p_sex, "condition": p_cond, "gp": p_gp
-        })
-        st.session_state.user.update({
-            "name": p_name, "phone": p_phone, "age": p_age,
-            "sex": p_sex, "condition": p_cond, "gp": p_gp
-        })
-        st.success("✅ Profile updated!")
+        changes = {"name": p_name, "phone": p_phone, "age": p_age,
+                   "sex": p_sex, "condition": p_cond, "gp": p_gp}
+        if db_update_user(user.email, changes):
+            store.update(user.email, user=user.replace(**changes))
+            st.success("✅ Profile updated!")
     st.markdown('</div>', unsafe_allow_html=True)
 
     st.markdown('<div class="card"><div class="card-title">🔑 Change Password</div>', unsafe_allow_html=True)
@@ -598,16 +724,23 @@ elif page == "⚙️ Profile":
     new_pass  = st.text_input("New Password",         type="password")
     new_pass2 = st.text_input("Confirm New Password", type="password")
     if st.button("🔑 Update Password", type="primary"):
-        if user["password"] != hash_password(old_pass):
+        try:
+            creds    = db_get_credentials(user.email)
+            ok       = check_password(user.email, old_pass, creds and creds.password)[0]
+            new_hash = hash_password(new_pass) if ok and new_pass == new_pass2 and len(new_pass) >= 6 else None
+        except BackendUnavailable:
+            st.error(OFFLINE_MSG); st.stop()
+        except LoginThrottled as e:
+            st.error(f"⏳ {e}"); st.stop()
+        if not ok:
             st.error("❌ Current password is wrong.")
         elif new_pass != new_pass2:
             st.error("❌ New passwords don't match.")
         elif len(new_pass) < 6:
             st.error("Password must be at least 6 characters.")
         else:
-            db_update_user(user["email"], {"password": hash_password(new_pass)})
-            st.session_state.user["password"] = hash_password(new_pass)
-            st.success("✅ Password updated!")
+            if db_update_user(user.email, {"password": new_hash}):
+                st.success("✅ Password updated!")
     st.markdown('</div>', unsafe_allow_html=True)
 
     st.markdown("""
@@ -615,4 +748,6 @@ elif page == "⚙️ Profile":
     <p style="font-size:0.85rem;color:#6b7280;">
     This app is a reminder and tracking tool only. It does not replace professional medical advice.
     Always consult your doctor. In an emergency call 108 (India) or 999 (UK) immediately.
-    </p></div>""", unsafe_allow_html=True)
\ No newline at end of file
+    </p></div>""", unsafe_allow_html=True)
+
+profiler.report()
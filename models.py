@@ -0,0 +1,88 @@
+# ══════════════════════════════════════════════════════════════════════════════
+# MODELS — rows as small read-only __slots__ objects instead of dicts, with
+# named column projections so every read asks PostgREST for only what its
+# call site uses (the password hash, for one, only at sign-in). A model built
+# from a projection simply lacks the other fields: reading one raises
+# AttributeError instead of quietly seeing None. Models also answer m["name"]
+# and m.get("rule"), so code shared with plain-dict rows (the reminder
+# simulator, journal rows, JSON bodies) takes either.
+# ══════════════════════════════════════════════════════════════════════════════
+class Model:
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    @classmethod
+    def from_row(cls, row):
+        obj = object.__new__(cls)
+        for name in cls.__slots__:
+            if name in row:
+                object.__setattr__(obj, name, row[name])
+        return obj
+
+    @classmethod
+    def from_rows(cls, rows):
+        return [cls.from_row(r) for r in rows]
+
+    @classmethod
+    def columns(cls, names=None):
+        # PostgREST select list for a projection; unknown names fail here, not at the server.
+        names   = names or cls.__slots__
+        unknown = set(names) - set(cls.__slots__)
+        if unknown:
+            raise ValueError(f"{cls.__name__} has no column(s) {sorted(unknown)}")
+        return ",".join(names)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only; use replace()")
+
+    def replace(self, **changes):
+        return self.from_row({**self.to_dict(), **changes})
+
+    def keys(self):
+        return [n for n in self.__slots__ if hasattr(self, n)]
+
+    def to_dict(self):
+        return {n: getattr(self, n) for n in self.keys()}
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other.to_dict() == self.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{k}={v!r}' for k, v in self.to_dict().items())})"
+
+class User(Model):
+    __slots__   = ("email", "name", "phone", "age", "sex", "condition", "gp", "password")
+    PROFILE     = ("email", "name", "phone", "age", "sex", "condition", "gp")
+    CREDENTIALS = ("email", "name", "password")
+
+class Medicine(Model):
+    __slots__ = ("id", "user_email", "name", "time", "session", "rule", "stock", "dose_qty")
+    SCHEDULE  = ("id", "name", "time", "session", "rule", "stock", "dose_qty")
+
+class HistoryEntry(Model):
+    __slots__ = ("id", "client_id", "user_email", "date_time", "session", "medicines", "status", "notes")
+    COUNTS    = ("client_id", "status")            # sidebar / Home totals, merged with the journal
+    DISPLAY   = ("id", "client_id", "date_time", "session", "medicines", "status", "notes")
+    SESSIONS  = ("session",)                        # "was this dose logged?" before escalating
+
+class Contact(Model):
+    # users.phone is a comma-separated list; the patient's own number comes first.
+    __slots__ = ("number", "is_patient")
+
+    @classmethod
+    def from_numbers(cls, numbers):
+        return [cls(number=n, is_patient=i == 0) for i, n in enumerate(numbers)]
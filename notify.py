@@ -0,0 +1,31 @@
+import streamlit as st
+from dispatch import get_dispatcher
+
+# ══════════════════════════════════════════════════════════════════════════════
+# NOTIFY — messages from the app go out through dispatch.py (WhatsApp, SMS or
+# email per contact); the Twilio client is built lazily and shared across reruns
+# ══════════════════════════════════════════════════════════════════════════════
+CHANNEL_NAMES = {"whatsapp": "WhatsApp", "sms": "SMS", "email": "email"}
+
+@st.cache_resource(show_spinner=False)
+def get_twilio():
+    from twilio.rest import Client
+    return Client(st.secrets["TWILIO_SID"], st.secrets["TWILIO_TOKEN"])
+
+def send_message(message, addresses=None):
+    targets = list(addresses or [])
+    if not targets:
+        return False, "No contacts added. Go to Family Contacts page."
+    try:
+        out = get_dispatcher().send(message, targets)
+    except Exception as e:
+        return False, str(e)
+    sent    = sum(out["sent"].values())
+    skipped = f", skipped {len(out['dead'])} unreachable" if out["dead"] else ""
+    if out["failed"]:
+        return False, f"Sent to {sent} contact(s){skipped}; failed: " + \
+               "; ".join(f"{a} ({e})" for a, e in out["failed"])
+    if not sent:
+        return False, f"Skipped {len(out['dead'])} number(s) that have stopped receiving messages."
+    via = ", ".join(f"{n} {CHANNEL_NAMES.get(c, c)}" for c, n in out["sent"].items())
+    return True, f"Sent to {sent} contact(s) ({via}){skipped}"
@@ -0,0 +1,104 @@
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import setting
+from resilience import BackendUnavailable, guarded_read
+
+# ══════════════════════════════════════════════════════════════════════════════
+# OFFLINE SNAPSHOTS — each user's profile, medicines and contacts are kept in a
+# local SQLite file, updated on every successful read and write. Reads are
+# answered from it first (stale-while-revalidate): a copy older than
+# SNAPSHOT_FRESH seconds is still returned at once and refreshed in the
+# background, so pages render without a round trip and reminders keep running
+# while the backend is down. Only a user seen for the first time waits on it.
+# ══════════════════════════════════════════════════════════════════════════════
+CACHE_PATH = setting("SNAPSHOT_CACHE", "snapshot_cache.sqlite3")
+FRESH_FOR  = float(setting("SNAPSHOT_FRESH", 30.0))
+
+_refresh  = ThreadPoolExecutor(max_workers=4, thread_name_prefix="revalidate")
+_inflight = set()
+_lock     = threading.Lock()
+
+class SnapshotCache:
+    def __init__(self, path=CACHE_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("pragma journal_mode=wal")
+        self.conn.execute("create table if not exists snapshot (key text primary key, value text, saved real)")
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute("select value, saved from snapshot where key = ?", (json.dumps(key),)).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def put(self, key, value):
+        with self.lock:
+            self.conn.execute("insert or replace into snapshot values (?, ?, ?)",
+                              (json.dumps(key), json.dumps(value), time.time()))
+
+    def patch(self, key, change):
+        # Applies a write we know succeeded; nothing to do if the key was never read.
+        with self.lock:
+            row = self.conn.execute("select value from snapshot where key = ?", (json.dumps(key),)).fetchone()
+            if row:
+                self.conn.execute("update snapshot set value = ?, saved = ? where key = ?",
+                                  (json.dumps(change(json.loads(row[0]))), time.time(), json.dumps(key)))
+
+    def drop(self, key):
+        with self.lock:
+            self.conn.execute("delete from snapshot where key = ?", (json.dumps(key),))
+
+_cache = None
+
+def get_cache():
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = SnapshotCache()
+        return _cache
+
+def _revalidate(key, fn):
+    try:
+        value = guarded_read(key, fn, fallback=False)
+        if value is None: get_cache().drop(key)
+        else: get_cache().put(key, value)
+    except Exception:
+        pass   # still offline; keep serving the saved copy
+    finally:
+        with _lock: _inflight.discard(key)
+
+def cached_read(key, fn, fresh_for=None):
+    # Raises BackendUnavailable only when there is no saved copy to fall back on.
+    hit = get_cache().get(key)
+    if hit is None:
+        value = guarded_read(key, fn, fallback=False)
+        if value is not None:
+            get_cache().put(key, value)
+        return value
+    value, saved = hit
+    if time.time() - saved > (FRESH_FOR if fresh_for is None else fresh_for):
+        with _lock:
+            start = key not in _inflight
+            _inflight.add(key)
+        if start:
+            _refresh.submit(_revalidate, key, fn)
+    return value
+
+def fresh_read(key, fn):
+    # Backend first, saved copy only if it can't be reached (e.g. registration,
+    # where a stale "no such user" must not win while the server is up).
+    try:
+        value = guarded_read(key, fn, fallback=False)
+    except BackendUnavailable:
+        hit = get_cache().get(key)
+        if hit is None: raise
+        return hit[0]
+    if value is None: get_cache().drop(key)
+    else: get_cache().put(key, value)
+    return value
+
+def remember(key, change):
+    get_cache().patch(key, change)
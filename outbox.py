@@ -0,0 +1,72 @@
+import argparse
+import sys
+from datetime import date, datetime
+
+from db import get_supabase
+from dispatch import DeliveryFailed, Dispatcher, configured_channels, record, unreachable
+
+# ══════════════════════════════════════════════════════════════════════════════
+# OUTBOX — messages queued by batch jobs (digest.py, refill.py) in the outbox
+# table (sql/outbox.sql), one per (kind, day, patient, recipient), and sent
+# later a page at a time through dispatch.py, so each channel keeps its own
+# pool and rate limit. A page is claimed as 'sending' before anything goes out,
+# so a crash mid-page never sends a message twice (it is left unsent instead).
+#   python outbox.py --kind refill
+# ══════════════════════════════════════════════════════════════════════════════
+PAGE_SIZE = 1000   # PostgREST caps a single response at 1000 rows
+
+def queue(kind, day, messages):
+    # messages: (user_email, to_number, body) rows; returns how many were offered.
+    rows = [{"kind": kind, "day": str(day), "user_email": u, "to_number": n, "body": b, "status": "queued"}
+            for u, n, b in messages]
+    for i in range(0, len(rows), PAGE_SIZE):
+        get_supabase().table("outbox").upsert(rows[i:i + PAGE_SIZE], on_conflict="kind,day,user_email,to_number",
+                                              ignore_duplicates=True).execute()
+    return len(rows)
+
+def _mark(ids, status, **extra):
+    if ids:
+        get_supabase().table("outbox").update({"status": status, **extra}).in_("id", ids).execute()
+
+def send_queued(dispatcher, kind=None, day=None, skip_dead=True, out=sys.stderr):
+    # Numbers WhatsApp has stopped delivering to go by their other channels,
+    # and are marked 'dead' only when there is none.
+    totals = {"sent": 0, "failed": 0, "dead": 0}
+    while True:
+        q = get_supabase().table("outbox").select("id,to_number,body").eq("status", "queued")
+        if kind: q = q.eq("kind", kind)
+        if day:  q = q.eq("day", str(day))
+        rows = q.order("id").limit(PAGE_SIZE).execute().data or []
+        if not rows: return totals
+        _mark([r["id"] for r in rows], "sending")
+        dead    = unreachable({r["to_number"] for r in rows}) if skip_dead else set()
+        skip    = {n: ("whatsapp",) for n in dead}
+        stuck   = [r["id"] for r in rows if not dispatcher.route(r["to_number"], skip.get(r["to_number"], ()))[1]]
+        _mark(stuck, "dead")
+        futures = [(r["id"], r["to_number"], dispatcher.submit(r["to_number"], r["body"], skip.get(r["to_number"], ())))
+                   for r in rows if r["id"] not in stuck]
+        results = []
+        for i, number, f in futures:
+            try:
+                results.append((i, f.result()))
+            except DeliveryFailed as e:
+                print(f"failed {number}: {e}", file=out)
+                results.append((i, None))
+        record([r for _, r in results if r])
+        _mark([i for i, r in results if r], "sent", sent_at=datetime.now().isoformat())
+        _mark([i for i, r in results if not r], "failed")
+        totals["dead"]   += len(stuck)
+        totals["sent"]   += sum(1 for _, r in results if r)
+        totals["failed"] += sum(1 for _, r in results if not r)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Send queued outbox messages.")
+    ap.add_argument("--kind",         help="only this kind (digest, refill, ...)")
+    ap.add_argument("--day",          type=date.fromisoformat)
+    ap.add_argument("--include-dead", action="store_true", help="also send to numbers that stopped receiving")
+    args = ap.parse_args()
+
+    dispatcher = Dispatcher(configured_channels())
+    totals     = send_queued(dispatcher, args.kind, args.day, not args.include_dead)
+    dispatcher.close()
+    print(f"sent {totals['sent']:,}  failed {totals['failed']:,}  dead {totals['dead']:,}", file=sys.stderr)
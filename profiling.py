@@ -0,0 +1,191 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+import streamlit as st
+
+from config import setting
+
+# ══════════════════════════════════════════════════════════════════════════════
+# PROFILING — admin-only. With the sidebar toggle on, a sampling thread records
+# the script thread's stack every PROFILE_INTERVAL seconds for the whole rerun,
+# tagged with the section the script was in (marked by profiler.mark(...)).
+# The end of the rerun shows per-section wall time and offers the samples as a
+# flame graph (SVG), folded stacks (flamegraph.pl / inferno) and a speedscope
+# file (https://www.speedscope.app).
+# ══════════════════════════════════════════════════════════════════════════════
+ADMIN_EMAILS = {e.strip().lower() for e in setting("ADMIN_EMAILS", "").split(",") if e.strip()}
+INTERVAL     = float(setting("PROFILE_INTERVAL", 0.001))
+MAX_SECONDS  = float(setting("PROFILE_MAX_SECONDS", 120))
+
+# The switch interval is process-wide and admins' reruns overlap: the first
+# profiler to start saves it, each lowers it to its own interval, and the last
+# one to stop puts the saved value back.
+_switch_lock = threading.Lock()
+_switch      = {"users": 0, "saved": None}
+
+def _lower_switch(interval):
+    with _switch_lock:
+        if not _switch["users"]:
+            _switch["saved"] = sys.getswitchinterval()
+        _switch["users"] += 1
+        sys.setswitchinterval(min(sys.getswitchinterval(), interval))
+
+def _restore_switch():
+    with _switch_lock:
+        _switch["users"] -= 1
+        if not _switch["users"]:
+            sys.setswitchinterval(_switch["saved"])
+
+def is_admin(email):
+    return (email or "").lower() in ADMIN_EMAILS
+
+class Profiler:
+    def __init__(self, script, interval=INTERVAL):
+        self.script   = os.path.abspath(script)
+        self.interval = interval
+        self.target   = threading.get_ident()
+        self.marks    = [("Startup", time.perf_counter())]
+        self.samples  = []          # (section, seconds since previous sample, stack)
+        self.stop     = threading.Event()
+        _lower_switch(interval)     # let the sampler in while the script holds the GIL
+        self.thread   = threading.Thread(target=self._sample, daemon=True, name="profiler")
+        self.thread.start()
+
+    def __bool__(self):
+        return True
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            if code.co_filename == self.script and code.co_name == "<module>":
+                break   # everything above this is Streamlit's script runner
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+    def _sample(self):
+        last = time.perf_counter()
+        end  = last + MAX_SECONDS
+        while not self.stop.wait(self.interval) and last < end:
+            frame = sys._current_frames().get(self.target)
+            now   = time.perf_counter()
+            if frame is not None:
+                self.samples.append((self.marks[-1][0], now - last, self._stack(frame)))
+            last = now
+        _restore_switch()
+
+    def mark(self, section):
+        self.marks.append((section, time.perf_counter()))
+
+    def finish(self):
+        if not self.stop.is_set():
+            self.stop.set()
+            self.thread.join()
+            self.mark(None)
+
+    def sections(self):
+        seen   = Counter(s for s, _, _ in self.samples)
+        totals = {}
+        for (name, t0), (_, t1) in zip(self.marks, self.marks[1:]):
+            totals[name] = totals.get(name, 0.0) + t1 - t0
+        return [{"section": name, "ms": round(secs * 1000, 1), "samples": seen[name]}
+                for name, secs in totals.items()]
+
+    def _label(self, frame):
+        name, path, line = frame
+        return f"{name} ({os.path.basename(path)}:{line})"
+
+    def folded(self):
+        counts = Counter(";".join([section] + [self._label(f) for f in stack])
+                         for section, _, stack in self.samples)
+        return "\n".join(f"{stack} {n}" for stack, n in counts.most_common())
+
+    def speedscope(self, name="MediCare rerun"):
+        index, frames, samples = {}, [], []
+        for section, _, stack in self.samples:
+            ids = []
+            for f in (("[" + section + "]", "", 0),) + stack:
+                if f not in index:
+                    index[f] = len(frames)
+                    frames.append({"name": f[0], "file": f[1], "line": f[2]} if f[1] else {"name": f[0]})
+                ids.append(index[f])
+            samples.append(ids)
+        weights = [w for _, w, _ in self.samples]
+        return json.dumps({
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{"type": "sampled", "name": name, "unit": "seconds", "startValue": 0,
+                          "endValue": sum(weights), "samples": samples, "weights": weights}],
+            "name": name, "exporter": "medicare-profiling",
+        })
+
+    def flamegraph_svg(self, width=1200, row=17):
+        # Classic flame graph: x = share of samples, y = stack depth, root at the bottom.
+        tree = {}
+        for section, _, stack in self.samples:
+            node = tree
+            for label in [section] + [self._label(f) for f in stack]:
+                node = node.setdefault(label, [0, {}])
+                node[0] += 1
+                node = node[1]
+        total = len(self.samples) or 1
+        depth = lambda n: 1 + max((depth(c[1]) for c in n.values()), default=0)
+        rows  = depth(tree)
+        rects = []
+        def draw(node, x, level):
+            for label, (count, children) in sorted(node.items()):
+                w = count / total * width
+                if w >= 0.5:
+                    y   = (rows - level - 1) * row
+                    hue = 20 + hash(label) % 40
+                    esc = label.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+                    rects.append(f'<g><title>{esc} — {count} samples</title>'
+                                 f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row - 1}" '
+                                 f'fill="hsl({hue},85%,60%)"/>'
+                                 f'<text x="{x + 3:.1f}" y="{y + row - 5}" font-size="11" font-family="monospace">'
+                                 f'{esc[:int(w / 7)]}</text></g>')
+                    draw(children, x, level + 1)
+                x += w
+        draw(tree, 0.0, 0)
+        return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{rows * row}">'
+                + "".join(rects) + "</svg>")
+
+    def report(self):
+        self.finish()
+        st.session_state.pop("_profiler", None)
+        with st.expander(f"🔬 Profile of this rerun — {len(self.samples)} samples", expanded=True):
+            st.dataframe(self.sections(), hide_index=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            c1, c2, c3 = st.columns(3)
+            with c1: st.download_button("🔥 Flame graph (SVG)", self.flamegraph_svg(),
+                                        f"medicare-{stamp}.svg", "image/svg+xml")
+            with c2: st.download_button("📈 Speedscope", self.speedscope(),
+                                        f"medicare-{stamp}.speedscope.json", "application/json")
+            with c3: st.download_button("📄 Folded stacks", self.folded(),
+                                        f"medicare-{stamp}.folded", "text/plain")
+
+class _Off:
+    # Stand-in when profiling is off: every call is a no-op.
+    def __bool__(self):           return False
+    def mark(self, section):      pass
+    def report(self):             pass
+
+def get_profiler(script):
+    # The toggle lives in the sidebar (admins only); its value is already in
+    # session_state when the next rerun starts, so the whole rerun is covered.
+    prev = st.session_state.pop("_profiler", None)
+    if prev:   # the last rerun ended early (st.stop / st.rerun) before its report
+        prev.finish()
+    if st.session_state.get("profiling") and is_admin(st.session_state.get("email")):
+        profiler = st.session_state["_profiler"] = Profiler(script)
+        return profiler
+    return _Off()
+
+def profiling_toggle(email):
+    if is_admin(email):
+        st.toggle("🔬 Profile reruns", key="profiling")
@@ -0,0 +1,42 @@
+import threading
+import time
+
+# ══════════════════════════════════════════════════════════════════════════════
+# RATE LIMITING — a thread-safe token bucket: `rate` tokens per second, up to
+# `burst` saved up. acquire() blocks until a token is free, so any number of
+# sender threads together stay under the provider's messages-per-second cap.
+# Clock and sleep are injectable for simulations.
+# ══════════════════════════════════════════════════════════════════════════════
+class TokenBucket:
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate   = float(rate)
+        self.burst  = float(burst if burst is not None else max(1.0, rate))
+        self.clock  = clock
+        self.sleep  = sleep
+        self.tokens = self.burst
+        self.stamp  = clock()
+        self.lock   = threading.Lock()
+
+    def _refill(self):
+        now         = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp  = now
+
+    def try_acquire(self, n=1):
+        with self.lock:
+            self._refill()
+            if self.tokens >= n:
+                self.tokens -= n
+                return True
+            return False
+
+    def acquire(self, n=1):
+        # Takes the tokens now (possibly going negative) and sleeps off the debt,
+        # so waiting threads are served in arrival order without spinning.
+        with self.lock:
+            self._refill()
+            self.tokens -= n
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            self.sleep(wait)
+        return wait
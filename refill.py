@@ -0,0 +1,96 @@
+import argparse
+import sys
+import time
+from collections import defaultdict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from db import scan_table
+from dispatch import Dispatcher, configured_channels
+from outbox import queue, send_queued
+from stock import REFILL_DAYS, _per_day, _rule_key
+
+# ══════════════════════════════════════════════════════════════════════════════
+# REFILLS — medicines with a stock count (sql/stock.sql) run out after
+#   stock / (dose_qty × doses per day)
+# days, where doses per day comes from the schedule rule (weekdays, every N
+# hours; stock.py). The daily job reads every tracked medicine in one scan,
+# works out doses per day once per distinct (time, rule) and does the rest as
+# column arithmetic. A medicine under REFILL_DAYS of supply, and whose course runs
+# past the run-out day, goes into one reminder per patient, queued to the
+# patient and every family contact. It is queued each day until the stock is
+# topped up.
+#   python refill.py --days 7 --send
+# ══════════════════════════════════════════════════════════════════════════════
+KIND = "refill"
+
+def build_alerts(users, meds, today, days=REFILL_DAYS):
+    # DataFrame of (user_email, to_number, body): one row per contact of every
+    # patient with a medicine running out within `days`.
+    meds = pd.DataFrame(meds, columns=["id", "user_email", "name", "time", "rule", "stock", "dose_qty"])
+    meds = meds[meds["stock"].notna()]
+    if meds.empty:
+        return pd.DataFrame(columns=["user_email", "to_number", "body"])
+
+    rates = {}   # str() of the stored rule is enough to tell repeats apart; only misses pay for json
+    for t, r in zip(meds["time"], meds["rule"]):
+        if (k := (t, str(r))) not in rates:
+            rates[k] = _per_day(_rule_key(t, r))
+    rate    = np.array([rates[t, str(r)] for t, r in zip(meds["time"], meds["rule"])]).reshape(-1, 2)
+    per_day = rate[:, 0]
+    last    = rate[:, 1].astype(np.int64)
+    daily   = per_day * meds["dose_qty"].fillna(1).to_numpy(float)
+    stock   = meds["stock"].to_numpy(float)
+    with np.errstate(divide="ignore"):
+        left = np.where(daily > 0, stock / daily, np.inf)
+    runout = today.toordinal() + np.floor(left)
+    short  = (left < days) & (runout <= last) & (last >= today.toordinal())
+
+    low = (meds[short].assign(left=np.floor(left[short]).astype(int), runout=runout[short].astype(int))
+           .sort_values("left"))
+    low["line"] = low["name"] + ": " + low["stock"].map(lambda s: f"{s:g}") + " left, " + [
+        "runs out today" if n <= 0 else f"about {date.fromordinal(d):%a %d %b}"
+        for n, d in zip(low["left"], low["runout"])]
+    by_user = defaultdict(list)
+    for email, line in zip(low["user_email"], low["line"]):
+        by_user[email].append(line)
+    lines = pd.DataFrame({"user_email": list(by_user), "lines": ["\n".join(v) for v in by_user.values()]})
+
+    people = pd.DataFrame(users, columns=["email", "name", "phone"]).rename(columns={"email": "user_email"})
+    people["to_number"] = people["phone"].fillna("").str.split(",")
+    contacts = people.explode("to_number")
+    contacts["to_number"] = contacts["to_number"].str.strip()
+    contacts = contacts[contacts["to_number"] != ""]
+
+    out = lines.merge(contacts[["user_email", "name", "to_number"]], on="user_email")
+    out["body"] = ("💊 Refill reminder for " + out["name"].fillna("your medicines") + "\n" + out["lines"]
+                   + "\nPlease reorder soon, then update the count on the Medicines page.")
+    return out[["user_email", "to_number", "body"]].reset_index(drop=True)
+
+def load():
+    users = scan_table("users", "email,name,phone", "email", "")
+    meds  = scan_table("medicines", "id,user_email,name,time,rule,stock,dose_qty", "id", 0,
+                       lambda q: q.gte("stock", 0))
+    return users, meds
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Queue (and optionally send) refill reminders.")
+    ap.add_argument("--days",         type=int, default=REFILL_DAYS, help="remind under this many days of supply")
+    ap.add_argument("--day",          type=date.fromisoformat, default=date.today())
+    ap.add_argument("--send",         action="store_true", help="also send every queued reminder for the day")
+    ap.add_argument("--include-dead", action="store_true", help="also send to numbers that stopped receiving")
+    args = ap.parse_args()
+
+    t = time.perf_counter()
+    users, meds = load()
+    alerts = build_alerts(users, meds, args.day, args.days)
+    queued = queue(KIND, args.day, alerts.itertuples(index=False))
+    print(f"{len(meds):,} tracked medicines; {alerts['user_email'].nunique():,} patients running low, "
+          f"queued {queued:,} reminders in {time.perf_counter() - t:.1f}s", file=sys.stderr)
+    if args.send:
+        dispatcher = Dispatcher(configured_channels())
+        totals     = send_queued(dispatcher, KIND, args.day, not args.include_dead)
+        dispatcher.close()
+        print(f"sent {totals['sent']:,}  failed {totals['failed']:,}  dead {totals['dead']:,}", file=sys.stderr)
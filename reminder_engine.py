@@ -0,0 +1,46 @@
+import time
+from datetime import datetime
+
+from schedule import compile_rule, to_minute
+
+# ══════════════════════════════════════════════════════════════════════════════
+# REMINDER ENGINE — clock, sleep and sender are injected so the same code path
+# runs in the Streamlit thread and in reminder_sim.py on a virtual clock
+# ══════════════════════════════════════════════════════════════════════════════
+def reminder_message(user_name, session, names):
+    return (
+        f"💊 MEDICINE REMINDER\n"
+        f"Hi {user_name}! Time for your {session} medicines.\n"
+        f"Medicines: {', '.join(names)}\nStay healthy! ❤️"
+    )
+
+def reminder_tick(medicines, user_name, now, ledger, send, escalate=None):
+    # ledger is a ledger.UserLedger: only the caller that claims the minute sends.
+    # send raises if the message did not go out; the minute is then released
+    # so the next tick retries it.
+    minute = to_minute(now)
+    if ledger.seen(minute):
+        return False
+    due = [(m, r) for m in medicines if (r := compile_rule(m)).fires_at(minute)]
+    if not due or not ledger.claim(minute):
+        return False
+    names = list(dict.fromkeys(
+        f"{m['name']} ({dose})" if (dose := r.dose_at(minute)) else m["name"] for m, r in due))
+    try:
+        send(reminder_message(user_name, due[0][0]["session"], names))
+    except BaseException:
+        ledger.release(minute)
+        raise
+    if escalate:
+        for session in dict.fromkeys(m["session"] for m, _ in due):
+            escalate(session, [m["name"] for m, _ in due if m["session"] == session], now)
+    return True
+
+def reminder_loop(is_active, get_medicines, get_user_name, send, ledger,
+                  clock=datetime.now, sleep=time.sleep, interval=30, escalate=None):
+    while is_active():
+        try:
+            reminder_tick(get_medicines(), get_user_name(), clock(), ledger, send, escalate)
+        except Exception:
+            pass   # the slot was released; the next tick tries again
+        sleep(interval)
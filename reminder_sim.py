@@ -0,0 +1,151 @@
+import argparse
+import random
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta
+
+from ledger import ReminderLedger
+from reminder_engine import reminder_tick
+from schedule import DAY, Scheduler, compile_rule, from_minute, to_minute
+
+# ══════════════════════════════════════════════════════════════════════════════
+# ACCELERATED-CLOCK SIMULATION — replays days of schedules for a synthetic
+# population through reminder_tick without waiting real minutes
+#   python reminder_sim.py --users 5000 --days 30 --send-latency-ms 50
+# --workers N runs N reminder workers over the same users, each with its own
+# ledger bitsets over one shared table (like N processes), to check that every
+# slot still goes out exactly once.
+# ══════════════════════════════════════════════════════════════════════════════
+TIME_OPTIONS = [f"{h:02d}:{m:02d}" for h in range(24) for m in [0, 30]]
+SESSIONS     = ["Morning", "Afternoon", "Night"]
+DRUGS        = ["Metformin", "Amlodipine", "Atorvastatin", "Levothyroxine",
+                "Lisinopril", "Omeprazole", "Aspirin", "Vitamin D"]
+
+class VirtualClock:
+    def __init__(self, start):
+        self._now = start
+
+    def now(self):
+        return self._now
+
+    def sleep(self, seconds):
+        self._now += timedelta(seconds=seconds)
+
+class FakeSender:
+    # Records every send; latency is charged to the virtual clock, just as a
+    # blocking Twilio call delays the real loop before its next sleep.
+    def __init__(self, clock, latency=0.0):
+        self.clock   = clock
+        self.latency = latency
+        self.sent    = []
+
+    def send(self, email, slot, message):
+        self.sent.append((email, slot.strftime("%Y-%m-%d %H:%M")))
+        if self.latency:
+            self.clock.sleep(self.latency)
+        return True, "Sent to 1 number(s)"
+
+def synthetic_rule(rng, start):
+    # Mostly plain daily doses, with a share of each richer rule type.
+    kind = rng.random()
+    if kind < 0.15:
+        return {"days": rng.sample(range(7), rng.randint(1, 5))}
+    if kind < 0.25:
+        return {"every_hours": rng.choice([4, 6, 8, 12]), "start": str(start.date())}
+    if kind < 0.30:
+        return {"end": str((start + timedelta(days=rng.randint(0, 10))).date())}
+    if kind < 0.33:
+        taper = [[str((start + timedelta(days=7 * k)).date()), f"{40 >> k} mg"] for k in range(3)]
+        return {"taper": taper, "end": str((start + timedelta(days=20)).date())}
+    return None
+
+def synthetic_population(n_users, max_meds=4, seed=0, start=datetime(2024, 1, 1)):
+    rng   = random.Random(seed)
+    users = []
+    for i in range(n_users):
+        meds = [{"id": j, "name": rng.choice(DRUGS), "time": rng.choice(TIME_OPTIONS),
+                 "session": rng.choice(SESSIONS), "rule": synthetic_rule(rng, start)}
+                for j in range(rng.randint(1, max_meds))]
+        users.append({"email": f"user{i}@sim.local", "name": f"User {i}", "medicines": meds})
+    return users
+
+def expected_slots(users, start, days):
+    slots = set()
+    t0, t1 = to_minute(start), to_minute(start) + days * DAY
+    for u in users:
+        for m in u["medicines"]:
+            rule = compile_rule(m)
+            f    = rule.next_fire(t0)
+            while f is not None and f < t1:
+                slots.add((u["email"], from_minute(f).strftime("%Y-%m-%d %H:%M")))
+                f = rule.next_fire(f + 1)
+    return slots
+
+def _pct(values, p):
+    if not values: return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+def simulate(users, days=1, start=None, tick=30, send_latency=0.0, workers=1):
+    start   = start or datetime(2024, 1, 1)
+    end     = start + timedelta(days=days)
+    clock   = VirtualClock(start)
+    sender  = FakeSender(clock, send_latency)
+    shared  = f"file:reminder_sim_{id(users)}?mode=memory&cache=shared"
+    ledgers = [ReminderLedger(shared, keep_days=days + 1) for _ in range(workers)]
+
+    # Only users with a medicine due now can fire; every other user's
+    # reminder_tick would be a no-op, so the scheduler's heap picks them out.
+    sched = Scheduler((((i, j), compile_rule(m)) for i, u in enumerate(users)
+                       for j, m in enumerate(u["medicines"])), to_minute(start))
+
+    tick_lat, depths = [], []
+    wall0 = time.perf_counter()
+    while clock.now() < end:
+        t0    = time.perf_counter()
+        due   = sched.pop_due(to_minute(clock.now()))
+        queue = deque((u, ledger) for u in (users[i] for i in dict.fromkeys(key[0] for _, key, _ in due))
+                      for ledger in ledgers)
+        depths.append(len(queue))
+        while queue:
+            (u, ledger), now = queue.popleft(), clock.now()
+            reminder_tick(u["medicines"], u["name"], now, ledger.for_user(u["email"]),
+                          lambda msg, e=u["email"], now=now: sender.send(e, now, msg))
+        tick_lat.append(time.perf_counter() - t0)
+        clock.sleep(tick)
+    wall = time.perf_counter() - wall0
+
+    counts   = Counter(sender.sent)
+    expected = expected_slots(users, start, days)
+    return {
+        "users":            len(users),
+        "days":             days,
+        "ticks":            len(tick_lat),
+        "wall_s":           round(wall, 3),
+        "sends":            len(sender.sent),
+        "sends_per_s":      round(len(sender.sent) / wall, 1) if wall else 0.0,
+        "tick_p50_ms":      round(_pct(tick_lat, 0.50) * 1000, 3),
+        "tick_p99_ms":      round(_pct(tick_lat, 0.99) * 1000, 3),
+        "tick_max_ms":      round(max(tick_lat, default=0) * 1000, 3),
+        "queue_depth_max":  max(depths, default=0),
+        "queue_depth_mean": round(sum(depths) / len(depths), 2) if depths else 0.0,
+        "duplicates":       sum(c - 1 for c in counts.values() if c > 1),
+        "missed":           len(expected - set(counts)),
+    }
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Replay reminder schedules on a virtual clock.")
+    ap.add_argument("--users",           type=int,   default=1000)
+    ap.add_argument("--days",            type=int,   default=1)
+    ap.add_argument("--max-meds",        type=int,   default=4)
+    ap.add_argument("--tick",            type=int,   default=30, help="virtual seconds between ticks")
+    ap.add_argument("--send-latency-ms", type=float, default=0.0, help="virtual time charged per send")
+    ap.add_argument("--workers",         type=int,   default=1, help="reminder workers sharing one ledger")
+    ap.add_argument("--seed",            type=int,   default=0)
+    args = ap.parse_args()
+
+    population = synthetic_population(args.users, args.max_meds, args.seed)
+    report     = simulate(population, args.days, tick=args.tick,
+                          send_latency=args.send_latency_ms / 1000, workers=args.workers)
+    for k, v in report.items():
+        print(f"{k:<18} {v}")
@@ -0,0 +1,302 @@
+import argparse
+import html
+import itertools
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from functools import partial
+from multiprocessing.connection import Client, Listener
+
+import streamlit as st
+
+from config import setting
+
+# ══════════════════════════════════════════════════════════════════════════════
+# ADHERENCE REPORTS — a printable per-patient report (summary, daily chart,
+# per-medicine and per-session tables, every missed dose) as HTML with inline
+# SVG, plus a PDF when WeasyPrint is installed. Reports are built in a process
+# pool so a rerun only submits the job; finished reports are kept per user,
+# date range and history state, so asking again is instant until a dose is
+# logged or history is cleared. Spawned workers import their parent's
+# __main__, which under Streamlit is the app script, so the pool runs in a
+# helper process started on first use with this module as its main:
+#   python reports.py --serve 2
+# ══════════════════════════════════════════════════════════════════════════════
+WORKERS    = int(setting("REPORT_WORKERS", 2))
+CAPACITY   = int(setting("REPORT_CACHE", 64))
+WEEKLY_AT  = 92   # longer ranges chart one bar per week
+TAKEN_CLR  = "#059669"
+MISSED_CLR = "#dc2626"
+
+def rate(taken, missed):
+    return round(taken * 100 / (taken + missed), 1) if taken + missed else None
+
+def summarize(rows):
+    # Anything that isn't 'Taken' counts as missed, as everywhere else in the app.
+    days, meds, sessions, missed = {}, {}, {}, []
+    for r in rows:
+        miss = r["status"] != "Taken"
+        days.setdefault(r["date_time"][:10], [0, 0])[miss] += 1
+        sessions.setdefault(r["session"] or "—", [0, 0])[miss] += 1
+        for name in (r["medicines"] or "").split(","):
+            if name.strip():
+                meds.setdefault(name.strip(), [0, 0])[miss] += 1
+        if miss:
+            missed.append(r)
+    taken = sum(t for t, _ in days.values())
+    return {"taken": taken, "missed": len(rows) - taken, "days": days,
+            "medicines": sorted(meds.items(), key=lambda kv: (rate(*kv[1]), kv[0])),
+            "sessions": sorted(sessions.items()),
+            "missed_doses": sorted(missed, key=lambda r: r["date_time"], reverse=True)}
+
+def _buckets(days, start, end):
+    # Every day in the range (gaps show as empty bars), or weeks for long ranges.
+    weekly = (end - start).days > WEEKLY_AT
+    first  = start - timedelta(days=start.weekday()) if weekly else start
+    step   = timedelta(days=7 if weekly else 1)
+    out, d = [], first
+    while d <= end:
+        span = [(d + timedelta(days=i)).isoformat() for i in range(step.days)]
+        out.append((d, sum(days.get(s, (0, 0))[0] for s in span), sum(days.get(s, (0, 0))[1] for s in span)))
+        d += step
+    return out, weekly
+
+def daily_chart(days, start, end, width=720, height=180):
+    buckets, weekly = _buckets(days, start, end)
+    top   = max((t + m for _, t, m in buckets), default=0) or 1
+    slot  = (width - 40) / max(len(buckets), 1)
+    plot  = height - 24
+    parts = [f'<line x1="34" y1="{plot}" x2="{width}" y2="{plot}" stroke="#cbd5e1"/>',
+             f'<text x="30" y="10" font-size="10" text-anchor="end">{top}</text>',
+             f'<text x="30" y="{plot}" font-size="10" text-anchor="end">0</text>']
+    every = max(1, len(buckets) // 8)
+    for i, (d, taken, missed) in enumerate(buckets):
+        x  = 40 + i * slot
+        w  = max(slot * 0.8, 1)
+        ht = taken / top * (plot - 6)
+        hm = missed / top * (plot - 6)
+        parts.append(f'<rect x="{x:.1f}" y="{plot - ht:.1f}" width="{w:.1f}" height="{ht:.1f}" fill="{TAKEN_CLR}">'
+                     f'<title>{d} — {taken} taken</title></rect>')
+        parts.append(f'<rect x="{x:.1f}" y="{plot - ht - hm:.1f}" width="{w:.1f}" height="{hm:.1f}" fill="{MISSED_CLR}">'
+                     f'<title>{d} — {missed} missed</title></rect>')
+        if i % every == 0:
+            parts.append(f'<text x="{x:.1f}" y="{height - 8}" font-size="10">{d:%d %b}</text>')
+    caption = "Doses per week" if weekly else "Doses per day"
+    return (f'<figure><svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'font-family="sans-serif">{"".join(parts)}</svg><figcaption>{caption} — '
+            f'<span style="color:{TAKEN_CLR}">■ taken</span> <span style="color:{MISSED_CLR}">■ missed</span>'
+            f'</figcaption></figure>')
+
+def medicine_chart(medicines, width=720, row=22):
+    if not medicines:
+        return ""
+    label = 200
+    parts = []
+    for i, (name, (taken, missed)) in enumerate(medicines):
+        y   = i * row
+        pct = rate(taken, missed) or 0
+        w   = pct / 100 * (width - label - 60)
+        clr = TAKEN_CLR if pct >= 80 else "#f59e0b" if pct >= 50 else MISSED_CLR
+        parts.append(f'<text x="{label - 8}" y="{y + 15}" font-size="12" text-anchor="end">{html.escape(name[:28])}</text>'
+                     f'<rect x="{label}" y="{y + 4}" width="{w:.1f}" height="{row - 8}" fill="{clr}"/>'
+                     f'<text x="{label + w + 6:.1f}" y="{y + 15}" font-size="11">{pct:g}%</text>')
+    return (f'<figure><svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{len(medicines) * row}" '
+            f'font-family="sans-serif">{"".join(parts)}</svg><figcaption>Adherence by medicine</figcaption></figure>')
+
+def _table(head, rows):
+    cells = lambda tag, values: "".join(f"<{tag}>{html.escape(str(v))}</{tag}>" for v in values)
+    body  = "".join(f"<tr>{cells('td', r)}</tr>" for r in rows)
+    return f"<table><thead><tr>{cells('th', head)}</tr></thead><tbody>{body}</tbody></table>"
+
+STYLE = """
+@page { size: A4; margin: 16mm 14mm; }
+body { font-family: 'DM Sans', Helvetica, Arial, sans-serif; color: #1f2937; font-size: 12px; }
+h1 { color: #1e3a5f; margin: 0 0 4px; font-size: 22px; }
+h2 { color: #1e3a5f; font-size: 15px; margin: 22px 0 8px; border-bottom: 2px solid #e8edf5; padding-bottom: 4px; }
+.meta { color: #6b7280; margin-bottom: 14px; }
+.kpis { display: flex; gap: 10px; }
+.kpi { flex: 1; border: 1px solid #e8edf5; border-radius: 10px; padding: 8px 12px; text-align: center; }
+.kpi b { display: block; font-size: 22px; }
+table { border-collapse: collapse; width: 100%; }
+th, td { border-bottom: 1px solid #e8edf5; padding: 4px 6px; text-align: left; }
+th { background: #f0f4ff; }
+tr, figure { page-break-inside: avoid; }
+figure { margin: 6px 0; } figcaption { color: #6b7280; font-size: 11px; }
+"""
+
+def render_html(profile, rows, start, end):
+    s     = summarize(rows)
+    pct   = rate(s["taken"], s["missed"])
+    about = " · ".join(f"{k}: {html.escape(str(profile[f]))}" for k, f in
+                       (("Age", "age"), ("Sex", "sex"), ("Condition", "condition"), ("GP", "gp")) if profile.get(f))
+    kpis  = "".join(f'<div class="kpi"><b style="color:{c}">{v}</b>{k}</div>' for k, v, c in (
+        ("Doses", len(rows), "#2563eb"), ("Taken", s["taken"], TAKEN_CLR),
+        ("Missed", s["missed"], MISSED_CLR), ("Adherence", "—" if pct is None else f"{pct:g}%", "#1e3a5f")))
+    meds  = _table(["Medicine", "Taken", "Missed", "Adherence"],
+                   [(n, t, m, f"{rate(t, m):g}%") for n, (t, m) in s["medicines"]])
+    sess  = _table(["Session", "Taken", "Missed", "Adherence"],
+                   [(n, t, m, f"{rate(t, m):g}%") for n, (t, m) in s["sessions"]])
+    miss  = (_table(["Date & time", "Session", "Medicines", "Notes"],
+                    [(r["date_time"], r["session"], r["medicines"], r.get("notes") or "") for r in s["missed_doses"]])
+             if s["missed_doses"] else "<p>No missed doses in this period. 🎉</p>")
+    return f"""<!doctype html>
+<html><head><meta charset="utf-8"><title>Adherence report — {html.escape(profile.get("name") or "")}</title>
+<style>{STYLE}</style></head><body>
+<h1>💊 Medication adherence report</h1>
+<div class="meta"><b>{html.escape(profile.get("name") or "")}</b> ({html.escape(profile.get("email") or "")})<br>
+{about}<br>Period {start:%d %b %Y} – {end:%d %b %Y} · generated {datetime.now():%d %b %Y %H:%M}</div>
+<div class="kpis">{kpis}</div>
+<h2>Doses over time</h2>{daily_chart(s["days"], start, end)}
+<h2>By medicine</h2>{medicine_chart(s["medicines"])}{meds}
+<h2>By session</h2>{sess}
+<h2>Missed doses ({s["missed"]})</h2>{miss}
+</body></html>"""
+
+def render_pdf(doc):
+    try:
+        from weasyprint import HTML
+    except ImportError:
+        return None   # HTML only; it prints cleanly from the browser
+    return HTML(string=doc).write_pdf()
+
+def build_report(profile, rows, start, end):
+    # Runs in a worker process: plain dicts in, bytes out.
+    doc = render_html(profile, rows, start, end)
+    return {"html": doc.encode("utf-8"), "pdf": render_pdf(doc)}
+
+def _watch(parent):
+    # Pool workers wait on their queue forever if the helper is killed rather
+    # than shut down; this makes them exit with it.
+    def watch():
+        while os.getppid() == parent:
+            time.sleep(1)
+        os._exit(0)
+    threading.Thread(target=watch, daemon=True).start()
+
+def _pool(workers):
+    # spawn, not fork: the helper is multi-threaded once replies are flowing.
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_watch, initargs=(os.getpid(),))
+
+def serve(workers):
+    # The helper: prints the address it listens on, then builds each report it
+    # is sent in the pool and sends back (job id, ok, report or exception).
+    # Exits when the app closes the connection.
+    authkey = bytes.fromhex(sys.stdin.readline().strip())
+    with Listener(authkey=authkey) as listener:
+        print(listener.address, flush=True)
+        conn = listener.accept()
+    lock = threading.Lock()
+    pool = _pool(workers)
+
+    def reply(job_id, job):
+        error = job.exception()
+        with lock:
+            conn.send((job_id, error is None, job.result() if error is None else error))
+
+    try:
+        while True:
+            job_id, args = conn.recv()
+            try:
+                job = pool.submit(build_report, *args)
+            except BrokenProcessPool:   # a worker died; start a fresh pool
+                pool = _pool(workers)
+                job  = pool.submit(build_report, *args)
+            job.add_done_callback(partial(reply, job_id))
+    except (EOFError, OSError):
+        pass
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+class ReportServer:
+    # The app's end of one helper process: submit() returns a Future that a
+    # reader thread settles when the report comes back.
+    def __init__(self, workers):
+        authkey   = os.urandom(16)
+        self.proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", str(workers)],
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        self.proc.stdin.write(authkey.hex() + "\n"); self.proc.stdin.close()
+        address   = self.proc.stdout.readline().strip()
+        self.proc.stdout.close()
+        if not address:
+            raise BrokenProcessPool(f"report server exited with {self.proc.wait()}")
+        self.conn    = Client(address, authkey=authkey)
+        self.ids     = itertools.count()
+        self.pending = {}   # job id -> Future
+        self.lock    = threading.Lock()
+        self.alive   = True
+        threading.Thread(target=self._read, daemon=True, name="report-server").start()
+
+    def submit(self, *args):
+        job = Future()
+        with self.lock:
+            if not self.alive:
+                raise BrokenProcessPool("report server exited")
+            job_id = next(self.ids)
+            self.pending[job_id] = job
+            try:
+                self.conn.send((job_id, args))
+            except OSError:
+                del self.pending[job_id]
+                raise BrokenProcessPool("report server exited")
+        return job
+
+    def _read(self):
+        try:
+            while True:
+                job_id, ok, value = self.conn.recv()
+                with self.lock:
+                    job = self.pending.pop(job_id)
+                job.set_result(value) if ok else job.set_exception(value)
+        except (EOFError, OSError):
+            with self.lock:
+                self.alive, lost, self.pending = False, self.pending, {}
+            for job in lost.values():
+                job.set_exception(BrokenProcessPool("report server exited"))
+
+class ReportService:
+    def __init__(self, workers=WORKERS, capacity=CAPACITY):
+        self.workers  = workers
+        self.capacity = capacity
+        self.jobs     = OrderedDict()   # key -> Future, least recently used first
+        self.lock     = threading.Lock()
+        self.server   = None            # started on the first request
+
+    def lookup(self, key):
+        with self.lock:
+            job = self.jobs.get(key)
+            if job is not None:
+                self.jobs.move_to_end(key)
+            return job
+
+    def request(self, key, *args):
+        with self.lock:
+            job = self.jobs.get(key)
+            if job is None or (job.done() and job.exception() is not None):
+                try:
+                    self.server = self.server or ReportServer(self.workers)
+                    job = self.server.submit(*args)
+                except BrokenProcessPool:   # the helper died; start a fresh one
+                    self.server = ReportServer(self.workers)
+                    job = self.server.submit(*args)
+                self.jobs[key] = job
+                while len(self.jobs) > self.capacity:
+                    self.jobs.popitem(last=False)
+            self.jobs.move_to_end(key)
+            return job
+
+@st.cache_resource(show_spinner=False)
+def get_reports():
+    return ReportService()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Report worker pool for the app; started by ReportService.")
+    ap.add_argument("--serve", type=int, metavar="WORKERS", required=True)
+    serve(ap.parse_args().serve)
@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from config import setting
+
+# ══════════════════════════════════════════════════════════════════════════════
+# RESILIENCE — per-call deadlines, hedged reads and a circuit breaker around
+# the backend, with the last good result of recent reads kept as a fallback
+# (LRU, DB_SNAPSHOTS keys; offline.py keeps the long-lived copy on disk)
+# ══════════════════════════════════════════════════════════════════════════════
+READ_DEADLINE  = float(setting("DB_READ_DEADLINE", 3.0))
+WRITE_DEADLINE = float(setting("DB_WRITE_DEADLINE", 5.0))
+HEDGE_AFTER    = float(setting("DB_HEDGE_AFTER", 0.4))
+BREAKER_FAILS  = int(setting("DB_BREAKER_FAILURES", 5))
+BREAKER_RESET  = float(setting("DB_BREAKER_RESET", 20.0))
+SNAPSHOTS      = int(setting("DB_SNAPSHOTS", 2000))
+
+_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="db")
+
+class BackendUnavailable(Exception):
+    pass
+
+class CircuitBreaker:
+    # closed → open after N consecutive failures; after `reset_after` seconds one
+    # probe is let through (half-open) and its outcome closes or re-opens it.
+    def __init__(self, failures=BREAKER_FAILS, reset_after=BREAKER_RESET):
+        self.max_failures = failures
+        self.reset_after  = reset_after
+        self.failures     = 0
+        self.opened_at    = None
+        self.probing      = False
+        self.lock         = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if not self.probing and time.monotonic() - self.opened_at >= self.reset_after:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures, self.opened_at, self.probing = 0, None, False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.max_failures:
+                self.opened_at, self.probing = time.monotonic(), False
+
+breaker    = CircuitBreaker()
+_snapshots = OrderedDict()
+_stale     = set()
+_lock      = threading.Lock()
+
+def call_with_deadline(fn, deadline, hedge_after=None):
+    # With hedge_after set, a second identical attempt starts if the first has
+    # not answered by then; whichever finishes first wins. Only for idempotent calls.
+    end      = time.monotonic() + deadline
+    attempts = [_pool.submit(fn)]
+    errors   = []
+    while attempts:
+        now     = time.monotonic()
+        hedging = hedge_after is not None and len(attempts) + len(errors) == 1
+        timeout = min(end, now + hedge_after) - now if hedging else end - now
+        if timeout <= 0:
+            break
+        done, _ = wait(attempts, timeout=timeout, return_when=FIRST_COMPLETED)
+        for f in done:
+            attempts.remove(f)
+            if f.exception() is None:
+                return f.result()
+            errors.append(f.exception())
+        if hedging and len(attempts) + len(errors) == 1:
+            attempts.append(_pool.submit(fn))
+    if errors and not attempts:
+        raise errors[-1]
+    raise TimeoutError(f"no response within {deadline:.1f}s")
+
+def _is_outage(e):
+    # Transport trouble trips the breaker; a rejected request (bad data) does not.
+    return isinstance(e, (TimeoutError, OSError)) or type(e).__module__.startswith(("httpx", "httpcore"))
+
+def guarded_read(key, fn, deadline=None, hedge_after=HEDGE_AFTER, fallback=True):
+    # fallback=False: raise instead of serving the in-memory copy, for callers
+    # (offline.py) that keep their own. key=None keeps no copy at all.
+    if breaker.allow():
+        try:
+            value = call_with_deadline(fn, deadline or READ_DEADLINE, hedge_after)
+        except Exception as e:
+            breaker.record_failure() if _is_outage(e) else breaker.record_success()
+        else:
+            breaker.record_success()
+            if key is None:
+                return value
+            with _lock:
+                _snapshots[key] = value
+                _snapshots.move_to_end(key)
+                _stale.discard(key)
+                while len(_snapshots) > SNAPSHOTS:
+                    _stale.discard(_snapshots.popitem(last=False)[0])
+            return value
+    with _lock:
+        if fallback and key in _snapshots:
+            _snapshots.move_to_end(key)
+            _stale.add(key)
+            return _snapshots[key]
+    raise BackendUnavailable("The server is not responding. Please try again shortly.")
+
+def guarded_write(fn, deadline=None):
+    if not breaker.allow():
+        raise BackendUnavailable("The server is not responding. Please try again shortly.")
+    try:
+        result = call_with_deadline(fn, deadline or WRITE_DEADLINE)
+    except TimeoutError:
+        breaker.record_failure()
+        raise BackendUnavailable("The server did not confirm the change in time. Please check and retry.")
+    except Exception as e:
+        breaker.record_failure() if _is_outage(e) else breaker.record_success()
+        raise
+    breaker.record_success()
+    return result
+
+def is_degraded(email=None):
+    with _lock:
+        stale = any(k[1] == email for k in _stale) if email else bool(_stale)
+    return breaker.is_open or stale
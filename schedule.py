@@ -0,0 +1,206 @@
+import heapq
+import itertools
+import json
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+# ══════════════════════════════════════════════════════════════════════════════
+# SCHEDULE RULES — a medicine fires at its HH:MM every day unless its optional
+# `rule` (jsonb on medicines, see sql/schedule_rules.sql) narrows it:
+#   {"days": [0, 2, 4],                 weekdays, Monday = 0
+#    "every_hours": 8,                  repeat from HH:MM on the start day (1–24)
+#    "start": "2024-03-01",             first day of the course
+#    "end": "2024-03-21",               last day of the course (inclusive)
+#    "taper": [["2024-03-01", "40 mg"], ["2024-03-08", "20 mg"]]}
+# Rules compile to a few integers so the next fire time is plain arithmetic,
+# and Scheduler keeps only each rule's next occurrence on a heap.
+# ══════════════════════════════════════════════════════════════════════════════
+DAY      = 24 * 60          # schedule times are whole minutes since date.min
+NEVER    = date.max.toordinal() * DAY + DAY
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+# _SKIP[mask][weekday] = days from that weekday to the next one set in mask
+_SKIP = [tuple(next((k for k in range(7) if mask >> ((w + k) % 7) & 1), 0) for w in range(7))
+         for mask in range(128)]
+
+def to_minute(dt):
+    if not isinstance(dt, datetime):
+        return dt.toordinal() * DAY
+    return dt.toordinal() * DAY + dt.hour * 60 + dt.minute
+
+def from_minute(m):
+    return datetime.combine(date.fromordinal(m // DAY), datetime.min.time()) + timedelta(minutes=m % DAY)
+
+def _day(value):
+    return date.fromisoformat(str(value)[:10]).toordinal()
+
+def _clock(hm):
+    h, m = str(hm).split(":")[:2]
+    if not (0 <= int(h) < 24 and 0 <= int(m) < 60):
+        raise ValueError(f"bad time {hm!r}")
+    return int(h) * 60 + int(m)
+
+def parse_time(hm):
+    # "8:5" / "08:05" / "08:05:00" -> "08:05"; raises ValueError.
+    try:
+        m = _clock(hm)
+    except (ValueError, TypeError):
+        raise ValueError(f"bad time {hm!r}, expected HH:MM")
+    return f"{m // 60:02d}:{m % 60:02d}"
+
+def parse_rule(rule):
+    # Validates a rule dict and returns it normalized; raises ValueError.
+    if not rule:
+        return None
+    if isinstance(rule, str):
+        rule = json.loads(rule)
+    unknown = set(rule) - {"days", "every_hours", "start", "end", "taper"}
+    if unknown:
+        raise ValueError(f"unknown rule field(s): {', '.join(sorted(unknown))}")
+    out = {}
+    if rule.get("days"):
+        days = sorted({int(d) for d in rule["days"]})
+        if days[0] < 0 or days[-1] > 6:
+            raise ValueError("days must be weekday numbers 0 (Mon) to 6 (Sun)")
+        out["days"] = days
+    if rule.get("every_hours"):
+        hours = int(rule["every_hours"])
+        if not 1 <= hours <= 24:
+            raise ValueError("every_hours must be between 1 and 24")
+        out["every_hours"] = hours
+    for k in ("start", "end"):
+        if rule.get(k):
+            out[k] = date.fromordinal(_day(rule[k])).isoformat()
+    if "every_hours" in out and "start" not in out:
+        # The interval counts from its first dose; without one it would count
+        # from year 1 and land on arbitrary times.
+        out["start"] = date.today().isoformat()
+    if "start" in out and "end" in out and out["end"] < out["start"]:
+        raise ValueError("end is before start")
+    if rule.get("taper"):
+        steps = sorted((date.fromordinal(_day(d)).isoformat(), str(dose).strip()) for d, dose in rule["taper"])
+        out["taper"] = [list(s) for s in steps]
+    return out or None
+
+class Rule:
+    __slots__ = ("minute", "mask", "period", "anchor", "last", "taper_at", "taper_dose")
+
+    def __init__(self, hm, rule=None):
+        rule            = parse_rule(rule) or {}
+        start           = _day(rule["start"]) if "start" in rule else 0
+        taper           = rule.get("taper", [])
+        self.minute     = _clock(hm)
+        self.mask       = sum(1 << d for d in rule.get("days", range(7)))
+        self.period     = rule.get("every_hours", 0) * 60
+        self.anchor     = start * DAY + self.minute
+        self.last       = _day(rule["end"]) * DAY + DAY - 1 if "end" in rule else NEVER
+        self.taper_at   = [_day(d) * DAY for d, _ in taper]
+        self.taper_dose = [dose for _, dose in taper]
+
+    def next_fire(self, t):
+        # Earliest fire time >= t (minutes), or None once the course has ended.
+        t = max(t, self.anchor)
+        if self.period:
+            f    = self.anchor - (self.anchor - t) // self.period * self.period
+            skip = _SKIP[self.mask][(f // DAY - 1) % 7]
+            if skip:
+                # A period of at most a day puts an occurrence on every day, so
+                # the first one on the next allowed day is one step away.
+                t = (f // DAY + skip) * DAY
+                f = self.anchor - (self.anchor - t) // self.period * self.period
+        else:
+            d  = t // DAY + (t % DAY > self.minute)
+            d += _SKIP[self.mask][(d - 1) % 7]
+            f  = d * DAY + self.minute
+        return f if f <= self.last else None
+
+    def fires_at(self, t):
+        return self.next_fire(t) == t
+
+    def occurs_on(self, day):
+        f = self.next_fire(to_minute(day))
+        return f is not None and f < to_minute(day) + DAY
+
+    def count_on(self, day):
+        # Doses on `day`: 0 or 1, or several for every_hours.
+        t, n = to_minute(day), 0
+        end  = t + DAY
+        while (f := self.next_fire(t)) is not None and f < end:
+            t, n = f + 1, n + 1
+        return n
+
+    def dose_at(self, t):
+        i = bisect_right(self.taper_at, t)
+        return self.taper_dose[i - 1] if i else None
+
+@lru_cache(maxsize=65536)
+def _compile(hm, rule_json):
+    return Rule(hm, json.loads(rule_json) if rule_json else None)
+
+def compile_rule(med):
+    rule = med.get("rule")
+    if isinstance(rule, dict):
+        rule = json.dumps(rule, sort_keys=True)
+    return _compile(med["time"], rule or "")
+
+def describe_rule(med):
+    rule  = parse_rule(med.get("rule")) or {}
+    parts = [f"every {rule['every_hours']} h from {med['time']}" if "every_hours" in rule else med["time"]]
+    if "days" in rule and len(rule["days"]) < 7:
+        parts.append(", ".join(WEEKDAYS[d] for d in rule["days"]))
+    if "end" in rule:
+        parts.append(f"until {rule['end']}")
+    dose = compile_rule(med).dose_at(to_minute(datetime.now()))
+    if dose:
+        parts.append(dose)
+    return " · ".join(parts)
+
+# ══════════════════════════════════════════════════════════════════════════════
+# SCHEDULER — lazy expansion: one heap entry per rule, replaced by the rule's
+# following occurrence when popped. Memory is O(rules), not O(occurrences).
+# ══════════════════════════════════════════════════════════════════════════════
+class Scheduler:
+    def __init__(self, rules=(), after=0):
+        # rules: iterable of (key, Rule); first fires are computed from `after`.
+        self.seq  = itertools.count()
+        self.live = {}
+        self.heap = []
+        for key, rule in rules:
+            f = rule.next_fire(after)
+            if f is not None:
+                self.live[key] = n = next(self.seq)
+                self.heap.append((f, n, key, rule))
+        heapq.heapify(self.heap)
+
+    def add(self, key, rule, after):
+        # Adding an existing key replaces it; the old heap entry dies lazily.
+        f = rule.next_fire(after)
+        if f is None:
+            self.live.pop(key, None); return
+        self.live[key] = n = next(self.seq)
+        heapq.heappush(self.heap, (f, n, key, rule))
+
+    def remove(self, key):
+        self.live.pop(key, None)
+
+    def peek(self):
+        while self.heap and self.live.get(self.heap[0][2]) != self.heap[0][1]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now):
+        # Every (fire, key, rule) with fire <= now, each rule re-armed after it.
+        due = []
+        while (f := self.peek()) is not None and f <= now:
+            _, n, key, rule = self.heap[0]
+            nxt = rule.next_fire(f + 1)
+            if nxt is None:
+                heapq.heappop(self.heap); del self.live[key]
+            else:
+                heapq.heapreplace(self.heap, (nxt, n, key, rule))
+            due.append((f, key, rule))
+        return due
+
+    def __len__(self):
+        return len(self.live)
@@ -0,0 +1,69 @@
+-- ════════════════════════════════════════════════════════════════════════════
+-- ADHERENCE SUMMARY — per-patient, per-day counters kept current by a trigger
+-- on history, so the clinic dashboard never scans raw history rows.
+-- Run once in the Supabase SQL editor.
+-- ════════════════════════════════════════════════════════════════════════════
+create table if not exists adherence_daily (
+    user_email text    not null,
+    day        date    not null,
+    taken      integer not null default 0,
+    missed     integer not null default 0,
+    primary key (user_email, day)
+);
+create index if not exists adherence_daily_day_idx on adherence_daily (day);
+
+-- history.date_time is stored as 'YYYY-MM-DD HH:MM:SS' text; the app counts
+-- anything that is not 'Taken' as missed, and so does this summary. Rows moved
+-- to the Parquet archive (sql/history_archive.sql) still count.
+create or replace function adherence_daily_apply() returns trigger
+language plpgsql as $$
+begin
+    if current_setting('medicare.archiving', true) = 'on' then
+        return null;
+    end if;
+    if tg_op in ('DELETE', 'UPDATE') then
+        update adherence_daily
+           set taken  = taken  - (old.status is not distinct from 'Taken')::int,
+               missed = missed - (old.status is distinct from 'Taken')::int
+         where user_email = old.user_email
+           and day = left(old.date_time, 10)::date;
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        insert into adherence_daily (user_email, day, taken, missed)
+        values (new.user_email, left(new.date_time, 10)::date,
+                (new.status is not distinct from 'Taken')::int,
+                (new.status is distinct from 'Taken')::int)
+        on conflict (user_email, day) do update
+           set taken  = adherence_daily.taken  + excluded.taken,
+               missed = adherence_daily.missed + excluded.missed;
+    end if;
+    return null;
+end $$;
+
+drop trigger if exists history_adherence_daily on history;
+create trigger history_adherence_daily
+    after insert or update or delete on history
+    for each row execute function adherence_daily_apply();
+
+-- One-off backfill from existing history.
+insert into adherence_daily (user_email, day, taken, missed)
+select user_email, left(date_time, 10)::date,
+       count(*) filter (where status = 'Taken'),
+       count(*) filter (where status is distinct from 'Taken')
+  from history
+ group by 1, 2
+on conflict (user_email, day) do update
+   set taken = excluded.taken, missed = excluded.missed;
+
+-- Per-patient rollup over the last 30 days; served by the day index above.
+create or replace view adherence_summary as
+select u.email, u.name, u.condition, u.gp,
+       coalesce(sum(a.taken)  filter (where a.day >= current_date - 6), 0)::int as taken_7d,
+       coalesce(sum(a.missed) filter (where a.day >= current_date - 6), 0)::int as missed_7d,
+       coalesce(sum(a.taken),  0)::int                                          as taken_30d,
+       coalesce(sum(a.missed), 0)::int                                          as missed_30d,
+       max(a.day)                                                               as last_day
+  from users u
+  left join adherence_daily a
+    on a.user_email = u.email and a.day >= current_date - 29
+ group by u.email, u.name, u.condition, u.gp;
@@ -0,0 +1,45 @@
+-- ════════════════════════════════════════════════════════════════════════════
+-- DELIVERY STATUS — one row per Twilio message, advanced by delivery.py as
+-- status callbacks arrive. Run once in the Supabase SQL editor.
+-- ════════════════════════════════════════════════════════════════════════════
+create table if not exists message_status (
+    sid        text primary key,
+    to_number  text        not null,
+    status     text        not null,
+    error_code text,
+    created_at timestamptz not null default now(),
+    updated_at timestamptz not null default now()
+);
+create index if not exists message_status_to_created_idx on message_status (to_number, created_at);
+
+-- Callbacks can arrive out of order; never move a message back to an earlier state.
+create or replace function message_status_rank(s text) returns int
+immutable language sql as $$
+    select case s when 'queued' then 1 when 'sending' then 2 when 'sent' then 3
+                  when 'delivered' then 4 when 'read' then 5
+                  when 'undelivered' then 6 when 'failed' then 6 else 0 end
+$$;
+
+create or replace function apply_message_statuses(updates jsonb) returns void
+language sql as $$
+    insert into message_status (sid, to_number, status, error_code)
+    select u->>'sid', u->>'to_number', u->>'status', u->>'error_code'
+      from jsonb_array_elements(updates) u
+    on conflict (sid) do update
+       set status     = excluded.status,
+           error_code = coalesce(excluded.error_code, message_status.error_code),
+           updated_at = now()
+     where message_status_rank(excluded.status) >= message_status_rank(message_status.status)
+$$;
+
+-- Only messages with a final status count as attempts: a send still 'queued'
+-- (no callback yet, or callbacks not configured) says nothing about the number.
+create or replace view contact_delivery_stats as
+select to_number,
+       count(*) filter (where status in ('delivered', 'read', 'failed', 'undelivered'))::int as attempts,
+       count(*) filter (where status in ('delivered', 'read'))::int      as delivered,
+       count(*) filter (where status in ('failed', 'undelivered'))::int  as failed,
+       max(created_at)                                                   as last_sent_at
+  from message_status
+ where created_at > now() - interval '30 days'
+ group by to_number;
@@ -0,0 +1,21 @@
+-- ════════════════════════════════════════════════════════════════════════════
+-- HISTORY ARCHIVE — delete path used by archive.py once rows are safely in
+-- Parquet. The transaction-local flag tells the adherence_daily trigger that
+-- these doses were archived, not un-logged. Returns how many rows went, so the
+-- archiver can stop if nothing is deleted (RLS, missing grant). Run once in the
+-- Supabase SQL editor.
+-- ════════════════════════════════════════════════════════════════════════════
+create index if not exists history_date_time_idx on history (date_time);
+create index if not exists history_user_date_time_idx on history (user_email, date_time);
+
+drop function if exists archive_history_rows(bigint[]);
+create or replace function archive_history_rows(ids bigint[]) returns integer
+language plpgsql as $$
+declare
+    n integer;
+begin
+    perform set_config('medicare.archiving', 'on', true);
+    delete from history where id = any(ids);
+    get diagnostics n = row_count;
+    return n;
+end $$;
@@ -0,0 +1,9 @@
+-- ════════════════════════════════════════════════════════════════════════════
+-- DOSE JOURNAL — idempotency key for history rows written by journal.py.
+-- Batches are upserted with on_conflict=client_id / ignore duplicates, so a
+-- batch retried after a timeout cannot log the same dose twice. Rows written
+-- before this change keep a NULL client_id, which the unique index allows.
+-- Run once in the Supabase SQL editor.
+-- ════════════════════════════════════════════════════════════════════════════
+alter table history add column if not exists client_id text;
+create unique index if not exists history_client_id_key on history (client_id);
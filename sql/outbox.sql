@@ -0,0 +1,24 @@
+-- ════════════════════════════════════════════════════════════════════════════
+-- OUTBOX — messages queued by batch jobs (digest.py, refill.py) and sent later
+-- by outbox.py. One row
+-- per (kind, day, patient, recipient): rerunning a job for the same day
+-- upserts with ignore_duplicates and queues nothing twice.
+-- Run once in the Supabase SQL editor.
+-- ════════════════════════════════════════════════════════════════════════════
+create table if not exists outbox (
+    id         bigserial   primary key,
+    kind       text        not null,
+    day        date        not null,
+    user_email text        not null,
+    to_number  text        not null,
+    body       text        not null,
+    status     text        not null default 'queued',   -- queued / sending / sent / failed / dead
+    sid        text,
+    created_at timestamptz not null default now(),
+    sent_at    timestamptz
+);
+create unique index if not exists outbox_once_key on outbox (kind, day, user_email, to_number);
+create index if not exists outbox_queued_idx on outbox (id) where status = 'queued';
+
+-- The digest reads one day of history for every user at once.
+create index if not exists history_date_time_idx on history (date_time);
@@ -0,0 +1,11 @@
+-- ════════════════════════════════════════════════════════════════════════════
+-- SCHEDULE RULES — optional recurrence for a medicine on top of its HH:MM
+-- (weekdays, every N hours, course start/end, tapering doses). NULL keeps the
+-- old behaviour of firing every day. Format and evaluation: schedule.py.
+-- Run once in the Supabase SQL editor.
+-- ════════════════════════════════════════════════════════════════════════════
+alter table medicines add column if not exists rule jsonb;
+
+alter table medicines drop constraint if exists medicines_rule_is_object;
+alter table medicines add constraint medicines_rule_is_object
+    check (rule is null or jsonb_typeof(rule) = 'object');
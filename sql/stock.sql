@@ -0,0 +1,37 @@
+-- ════════════════════════════════════════════════════════════════════════════
+-- PILL STOCK — units left per medicine (NULL = not tracked) and units taken
+-- per dose. Every history row recorded as Taken takes one dose off each
+-- tracked medicine it names in that session, here in the database so doses
+-- from the app, the JSON API and the dose journal all count, and a journal
+-- batch replayed after a timeout (on conflict do nothing) counts once.
+-- refill.py reads the result.
+-- Run once in the Supabase SQL editor.
+-- ════════════════════════════════════════════════════════════════════════════
+alter table medicines add column if not exists stock    numeric;
+alter table medicines add column if not exists dose_qty numeric not null default 1;
+
+alter table medicines drop constraint if exists medicines_stock_not_negative;
+alter table medicines add constraint medicines_stock_not_negative
+    check ((stock is null or stock >= 0) and dose_qty > 0);
+
+-- history.medicines is the session's names joined with ', '.
+create or replace function history_take_stock() returns trigger
+language plpgsql as $$
+begin
+    if new.status = 'Taken' then
+        update medicines m
+           set stock = greatest(m.stock - m.dose_qty, 0)
+         where m.user_email = new.user_email
+           and m.session = new.session
+           and m.stock is not null
+           and lower(m.name) in (select lower(btrim(n)) from unnest(string_to_array(new.medicines, ',')) n);
+    end if;
+    return null;
+end $$;
+
+drop trigger if exists history_take_stock on history;
+create trigger history_take_stock
+    after insert on history
+    for each row execute function history_take_stock();
+
+create index if not exists medicines_user_email_idx on medicines (user_email);
@@ -0,0 +1,34 @@
+import json
+import math
+
+from config import setting
+from schedule import DAY, compile_rule
+
+# ══════════════════════════════════════════════════════════════════════════════
+# STOCK — days of supply left for a medicine with a pill count (sql/stock.sql):
+#   stock / (dose_qty × doses per day)
+# where doses per day comes from the schedule rule. Shared by the app, which
+# shows it per medicine, and the daily refill job (refill.py), which does the
+# same sum over every patient with pandas; kept apart so the app never loads it.
+# ══════════════════════════════════════════════════════════════════════════════
+REFILL_DAYS = int(setting("REFILL_DAYS", 7))
+
+def _rule_key(time_val, rule):
+    return str(time_val), json.dumps(rule, sort_keys=True) if isinstance(rule, dict) else rule or ""
+
+def _per_day(key):
+    # (doses per day on average, last day of the course as an ordinal)
+    hm, rule = key
+    try:
+        r = compile_rule({"time": hm, "rule": rule or None})
+    except (ValueError, TypeError):
+        return 0.0, 0
+    return (DAY / r.period if r.period else 1) * bin(r.mask).count("1") / 7, r.last // DAY
+
+def days_left(med):
+    # For one medicine on screen: days of supply left, or None if not tracked.
+    if med.get("stock") is None:
+        return None
+    per_day, _ = _per_day(_rule_key(med.get("time"), med.get("rule")))
+    daily      = per_day * float(med.get("dose_qty") or 1)
+    return float(med["stock"]) / daily if daily else math.inf
@@ -0,0 +1,131 @@
+import copy
+import itertools
+import threading
+
+# ══════════════════════════════════════════════════════════════════════════════
+# STUB BACKEND — an in-memory stand-in for the slice of the Supabase client the
+# app uses (table().select/insert/upsert/update/delete with eq/in_/range
+# filters, plus the app's RPCs and triggers). Enable with
+# MEDICARE_BACKEND=stub for local runs, load tests and benchmarks; data lives
+# for the life of the process.
+# ══════════════════════════════════════════════════════════════════════════════
+class Result:
+    def __init__(self, data):
+        self.data = data
+
+class Query:
+    def __init__(self, client, table):
+        self.client, self.table = client, table
+        self.op, self.payload, self.columns = "select", None, "*"
+        self.filters, self.order_by, self.max_rows, self.window = [], None, None, None
+        self.conflict, self.ignore = None, False
+
+    def select(self, columns="*", **_):
+        self.op, self.columns = "select", columns; return self
+    def insert(self, payload, **_):
+        self.op, self.payload = "insert", payload; return self
+    def upsert(self, payload, on_conflict=None, ignore_duplicates=False, **_):
+        self.op, self.payload, self.conflict, self.ignore = "upsert", payload, on_conflict, ignore_duplicates
+        return self
+    def update(self, payload):
+        self.op, self.payload = "update", payload; return self
+    def delete(self):
+        self.op = "delete"; return self
+
+    def _where(self, test):
+        self.filters.append(test); return self
+    def eq(self, col, val):   return self._where(lambda r: r.get(col) == val)
+    def neq(self, col, val):  return self._where(lambda r: r.get(col) != val)
+    def gt(self, col, val):   return self._where(lambda r: r.get(col) is not None and r[col] > val)
+    def gte(self, col, val):  return self._where(lambda r: r.get(col) is not None and r[col] >= val)
+    def lt(self, col, val):   return self._where(lambda r: r.get(col) is not None and r[col] < val)
+    def lte(self, col, val):  return self._where(lambda r: r.get(col) is not None and r[col] <= val)
+    def in_(self, col, vals):
+        vals = set(vals); return self._where(lambda r: r.get(col) in vals)
+    def order(self, col, desc=False):
+        self.order_by = (col, desc); return self
+    def limit(self, n):
+        self.max_rows = n; return self
+    def range(self, start, end):
+        self.window = (start, end); return self
+
+    def _project(self, row):
+        if self.columns.strip() == "*":
+            return dict(row)
+        return {c.strip(): row.get(c.strip()) for c in self.columns.split(",")}
+
+    def execute(self):
+        with self.client.lock:
+            rows = self.client.tables.setdefault(self.table, [])
+            if self.op in ("insert", "upsert"):
+                out  = []
+                keys = self.conflict.split(",") if self.conflict else None
+                for new in (self.payload if isinstance(self.payload, list) else [self.payload]):
+                    new = copy.deepcopy(new)
+                    hit = keys and next((r for r in rows if all(r.get(k) == new.get(k) for k in keys)), None)
+                    if hit:
+                        if not self.ignore:
+                            hit.update(new); out.append(dict(hit))
+                        continue
+                    new.setdefault("id", next(self.client.ids))
+                    rows.append(new); out.append(dict(new))
+                    if hasattr(self.client, f"_after_insert_{self.table}"):
+                        getattr(self.client, f"_after_insert_{self.table}")(new)
+                return Result(out)
+            hits = [r for r in rows if all(f(r) for f in self.filters)]
+            if self.op == "update":
+                for r in hits: r.update(copy.deepcopy(self.payload))
+                return Result([dict(r) for r in hits])
+            if self.op == "delete":
+                gone = {id(r) for r in hits}
+                self.client.tables[self.table] = [r for r in rows if id(r) not in gone]
+                return Result([dict(r) for r in hits])
+            if self.order_by:
+                col, desc = self.order_by
+                hits = sorted(hits, key=lambda r: (r.get(col) is None, r.get(col)), reverse=desc)
+            if self.window:
+                hits = hits[self.window[0]:self.window[1] + 1]
+            if self.max_rows is not None:
+                hits = hits[:self.max_rows]
+            return Result([self._project(r) for r in hits])
+
+class RpcCall:
+    def __init__(self, fn):
+        self.fn = fn
+    def execute(self):
+        return Result(self.fn())
+
+class StubClient:
+    def __init__(self):
+        self.tables = {}
+        self.ids    = itertools.count(1)
+        self.lock   = threading.RLock()
+
+    def table(self, name):
+        return Query(self, name)
+
+    def rpc(self, name, params):
+        return RpcCall(lambda: getattr(self, f"_rpc_{name}")(**params))
+
+    def _after_insert_history(self, row):
+        # sql/stock.sql: a Taken dose takes dose_qty off each tracked medicine it names in its session.
+        if row.get("status") != "Taken": return
+        names = {n.strip().lower() for n in (row.get("medicines") or "").split(",")}
+        for m in self.tables.get("medicines", []):
+            if (m.get("user_email"), m.get("session")) == (row.get("user_email"), row.get("session")) \
+                    and m.get("stock") is not None and (m.get("name") or "").lower() in names:
+                m["stock"] = max(m["stock"] - (m.get("dose_qty") or 1), 0)
+
+    def _rpc_archive_history_rows(self, ids):
+        ids = set(ids)
+        with self.lock:
+            before = len(self.tables.get("history", []))
+            self.tables["history"] = [r for r in self.tables.get("history", []) if r["id"] not in ids]
+            return before - len(self.tables["history"])
+
+    def _rpc_apply_message_statuses(self, updates):
+        with self.lock:
+            rows = {r["sid"]: r for r in self.tables.setdefault("message_status", [])}
+            for u in updates:
+                if u["sid"] in rows: rows[u["sid"]].update(u)
+                else: self.tables["message_status"].append(dict(u))
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+from broadcast import Broadcast, Checkpoint
+
+ROOT    = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MESSAGE = "The reminder number is changing."
+PAGE    = [{"email": f"u{i}@x.com", "phone": f"+9100000000{i}"} for i in range(8)]
+
+# Sends numbers in order and dies without cleanup inside the fourth send, like
+# a SIGKILL mid-page: three sends are logged, the fourth was in flight.
+KILLED_RUN = textwrap.dedent("""
+    import os, sys
+    from broadcast import Broadcast, Checkpoint
+    ckpt, sent, page = sys.argv[1], sys.argv[2], eval(sys.argv[3])
+    def send(number, skip=()):
+        with open(sent, "a") as f: f.write(number + "\\n")
+        if sum(1 for _ in open(sent)) == 4: os._exit(9)
+        return None, number, "sid"
+    Broadcast(send, Checkpoint(ckpt, sys.argv[4]), rate=0, concurrency=1, skip_dead=False,
+              record=lambda _: None, out=open(os.devnull, "w")).run([page])
+""")
+
+def test_resume_after_kill_does_not_resend(tmp_path):
+    ckpt, first = str(tmp_path / "ckpt.json"), tmp_path / "sent.txt"
+    run = subprocess.run([sys.executable, "-c", KILLED_RUN, ckpt, str(first), repr(PAGE), MESSAGE],
+                         cwd=ROOT, env={**os.environ, "PYTHONPATH": ROOT}, capture_output=True)
+    assert run.returncode == 9, run.stderr.decode()
+    killed = first.read_text().split()
+    assert len(killed) == 4
+
+    again = []
+    def send(number, skip=()):
+        again.append(number)
+        return None, number, "sid"
+    state = Broadcast(send, Checkpoint(ckpt, MESSAGE), rate=0, concurrency=1, skip_dead=False,
+                      record=lambda _: None, out=open(os.devnull, "w")).run([PAGE])
+    assert not set(again) & set(killed[:3])
+    assert set(again) | set(killed) == {u["phone"] for u in PAGE}
+    assert state["resumed"] == 3 and state["sent"] == len(PAGE) and state["duplicate"] == 0
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+import pytest
+
+from ledger import ReminderLedger
+from reminder_engine import reminder_loop, reminder_tick
+
+MEDS = [{"name": "Metformin", "time": "08:00", "session": "Morning"}]
+NOW  = datetime(2024, 3, 4, 8, 0, 10)
+
+@pytest.fixture
+def ledger(tmp_path):
+    return ReminderLedger(str(tmp_path / "ledger.sqlite3")).for_user("a@x.com")
+
+def failing(msg):
+    raise RuntimeError("No contacts added. Go to Family Contacts page.")
+
+def test_failed_send_releases_the_minute(ledger):
+    with pytest.raises(RuntimeError):
+        reminder_tick(MEDS, "Asha", NOW, ledger, failing)
+    sent = []
+    assert reminder_tick(MEDS, "Asha", NOW.replace(second=40), ledger, sent.append)
+    assert len(sent) == 1
+
+def test_sent_minute_is_not_sent_again(ledger):
+    sent = []
+    assert reminder_tick(MEDS, "Asha", NOW, ledger, sent.append)
+    assert not reminder_tick(MEDS, "Asha", NOW.replace(second=40), ledger, sent.append)
+    assert len(sent) == 1
+
+def test_failed_send_does_not_escalate(ledger):
+    armed = []
+    with pytest.raises(RuntimeError):
+        reminder_tick(MEDS, "Asha", NOW, ledger, failing, escalate=lambda *a: armed.append(a))
+    assert armed == []
+
+def test_loop_survives_a_failed_send(ledger):
+    ticks, sent = iter([NOW, NOW.replace(second=40)]), []
+    def send(msg):
+        if not sent:
+            sent.append(None)
+            raise RuntimeError("Twilio is down")
+        sent.append(msg)
+    active = iter([True, True, False])
+    reminder_loop(lambda: next(active), lambda: MEDS, lambda: "Asha", send, ledger,
+                  clock=lambda: next(ticks), sleep=lambda s: None)
+    assert len(sent) == 2 and "Metformin" in sent[1]
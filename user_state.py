@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import streamlit as st
+
+from config import setting
+from db import db_get_user, db_get_medicines, db_get_contacts, db_get_history
+from resilience import BackendUnavailable
+
+# ══════════════════════════════════════════════════════════════════════════════
+# USER STATE — one process-wide copy of each logged-in user's profile,
+# medicines, contacts and history, shared by all of that user's browser tabs.
+# Snapshots are immutable and replaced whole on change; entries are reference
+# counted by Streamlit session and evicted least-recently-used past capacity.
+# ══════════════════════════════════════════════════════════════════════════════
+CAPACITY = int(setting("USER_STATE_CAPACITY", 1000))
+MAX_AGE  = float(setting("USER_STATE_MAX_AGE", 60.0))   # re-read after this many seconds
+FIELDS   = ("user", "medicines", "contacts", "history")
+
+Snapshot = namedtuple("Snapshot", FIELDS + ("loaded_at",))
+
+def _get_user(email):
+    try:
+        return db_get_user(email)
+    except BackendUnavailable:
+        return None
+
+LOADERS = {
+    "user":           _get_user,
+    "medicines":      db_get_medicines,
+    "contacts":       db_get_contacts,
+    "history":        db_get_history,
+}
+
+def freeze(field, value):
+    # Rows are read-only models already (see models.py); lists become tuples.
+    if value is None or field == "user":
+        return value
+    return tuple(value)
+
+def session_id():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "bare"
+
+def _session_alive(sid):
+    try:
+        from streamlit import runtime
+        return runtime.get_instance().is_active_session(sid)
+    except Exception:
+        return True
+
+class _Entry:
+    __slots__ = ("snapshot", "refs", "lock", "derived")
+
+    def __init__(self):
+        self.snapshot = None
+        self.refs     = set()
+        self.lock     = threading.Lock()
+        self.derived  = {}
+
+class UserStateStore:
+    def __init__(self, loaders=LOADERS, capacity=CAPACITY, max_age=MAX_AGE):
+        self.loaders  = loaders
+        self.capacity = capacity
+        self.max_age  = max_age
+        self.entries  = OrderedDict()
+        self.lock     = threading.Lock()
+
+    def _entry(self, email):
+        with self.lock:
+            entry = self.entries.get(email)
+            if entry is None:
+                entry = self.entries[email] = _Entry()
+                self._evict(keep=email)
+            self.entries.move_to_end(email)
+            return entry
+
+    def _evict(self, keep):
+        # Prefer users no open tab points at; past that, drop the oldest anyway —
+        # it is only a cache and the next read reloads it.
+        while len(self.entries) > self.capacity:
+            victim = None
+            for email, entry in self.entries.items():
+                if email == keep: continue
+                entry.refs = {sid for sid in entry.refs if _session_alive(sid)}
+                if not entry.refs:
+                    victim = email; break
+            self.entries.pop(victim or next(iter(self.entries)))
+
+    def _load(self, email, prev, fields):
+        values = prev._asdict() if prev else dict.fromkeys(FIELDS)
+        for f in fields:
+            fresh = self.loaders[f](email)
+            if fresh is not None or prev is None:   # keep last good value when offline
+                values[f] = freeze(f, fresh)
+        values["loaded_at"] = time.monotonic()
+        return Snapshot(**values)
+
+    def acquire(self, email, sid):
+        self._entry(email).refs.add(sid)
+
+    def release(self, email, sid):
+        with self.lock:
+            entry = self.entries.get(email)
+            if entry: entry.refs.discard(sid)
+
+    def get(self, email):
+        entry = self._entry(email)
+        with entry.lock:
+            snap = entry.snapshot
+            if snap is None or time.monotonic() - snap.loaded_at > self.max_age:
+                entry.snapshot, entry.derived = self._load(email, snap, FIELDS), {}
+            return entry.snapshot
+
+    def refresh(self, email, *fields):
+        entry = self._entry(email)
+        with entry.lock:
+            entry.snapshot = self._load(email, entry.snapshot, fields or FIELDS)
+            entry.derived  = {}
+            return entry.snapshot
+
+    def update(self, email, **values):
+        # For writes that already succeeded: swap in the new value without a re-read.
+        entry = self._entry(email)
+        with entry.lock:
+            snap = entry.snapshot or self._load(email, None, FIELDS)
+            entry.snapshot = snap._replace(**{f: freeze(f, v) for f, v in values.items()})
+            entry.derived  = {}
+            return entry.snapshot
+
+    def derive(self, email, key, build):
+        # Per-user values computed from the current snapshot (e.g. a History
+        # DataFrame), shared by every tab until the snapshot changes.
+        entry = self._entry(email)
+        with entry.lock:
+            if key not in entry.derived:
+                entry.derived[key] = build()
+            return entry.derived[key]
+
+    def stats(self):
+        with self.lock:
+            return {"users": len(self.entries),
+                    "sessions": sum(len(e.refs) for e in self.entries.values())}
+
+@st.cache_resource(show_spinner=False)
+def get_user_store():
+    return UserStateStore()